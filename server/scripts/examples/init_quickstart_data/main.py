@@ -27,7 +27,6 @@ async def init_global_config():
             max_tokens_per_chunk=200_000,
             max_file_size_bytes=200_000,
         ),
-        processing_interval_sec=15,
     ))
     config.analysis.CopyFrom(AnalysisConfig(
         repo_analyzers=[Analyzer(
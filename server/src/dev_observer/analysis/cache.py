@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from abc import abstractmethod
+from typing import Protocol, Optional, List
+
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.log import s_
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.util import Clock, RealClock
+
+_log = logging.getLogger(__name__)
+
+
+def prompt_cache_key(prompt: FormattedPrompt) -> str:
+    """Fingerprint of everything that is sent to the model: system and user messages and model config."""
+    h = hashlib.sha256()
+    for part in (prompt.system, prompt.user, prompt.config):
+        data = part.SerializeToString(deterministic=True) if part is not None else b""
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+class AnalysisCache(Protocol):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    async def put(self, key: str, analysis: str):
+        ...
+
+
+class CachingAnalysisProvider(AnalysisProvider):
+    """Returns stored results for prompts that were already analyzed and stores results of new ones.
+
+    Cache failures are logged and never fail the analysis.
+    """
+    _delegate: AnalysisProvider
+    _cache: AnalysisCache
+
+    def __init__(self, delegate: AnalysisProvider, cache: AnalysisCache):
+        self._delegate = delegate
+        self._cache = cache
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        key = prompt_cache_key(prompt)
+        try:
+            cached = await self._cache.get(key)
+        except Exception as e:
+            _log.exception(s_("Failed to read analysis cache", key=key), exc_info=e)
+            cached = None
+        if cached is not None:
+            _log.debug(s_("Analysis cache hit", key=key, prompt_name=prompt.prompt_name))
+            return AnalysisResult(analysis=cached)
+
+        result = await self._delegate.analyze(prompt, session_id)
+        if len(result.analysis) > 0:
+            try:
+                await self._cache.put(key, result.analysis)
+            except Exception as e:
+                _log.exception(s_("Failed to store analysis in cache", key=key), exc_info=e)
+        return result
+
+
+class LocalAnalysisCache(AnalysisCache):
+    """Stores analysis results as files under `root_dir`.
+
+    Entries older than `ttl_sec` are not returned (0 keeps them forever). Least recently used entries are
+    evicted once the total size exceeds `max_size_bytes`.
+    """
+    _dir: str
+    _max_size_bytes: int
+    _ttl_sec: int
+    _clock: Clock
+    _size: Optional[int]
+
+    def __init__(self, root_dir: str, max_size_bytes: int, ttl_sec: int = 0, clock: Clock = RealClock()):
+        os.makedirs(root_dir, exist_ok=True)
+        self._dir = root_dir
+        self._max_size_bytes = max_size_bytes
+        self._ttl_sec = ttl_sec
+        self._clock = clock
+        self._size = None
+
+    async def get(self, key: str) -> Optional[str]:
+        path = self._entry_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            _log.warning(s_("Broken analysis cache entry, removing", key=key, error=str(e)))
+            self._remove(path)
+            return None
+        if self._expired(entry.get("created", 0)):
+            self._remove(path)
+            return None
+        # Modification time of the entry is used as the last access time for LRU eviction.
+        os.utime(path)
+        return entry.get("analysis")
+
+    async def put(self, key: str, analysis: str):
+        path = self._entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self._dir)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"created": self._clock.now().timestamp(), "analysis": analysis}, f)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self._size is None:
+            self._size = self._total_size()
+        else:
+            self._size += os.path.getsize(path) - previous
+        if self._size > self._max_size_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        for path in self._entry_paths():
+            try:
+                size = os.path.getsize(path)
+                entries.append((os.path.getmtime(path), path, size))
+            except OSError:
+                continue
+            total += size
+        entries.sort()
+        for _, path, size in entries:
+            if total <= self._max_size_bytes:
+                break
+            _log.debug(s_("Evicting analysis cache entry", path=path, size=size))
+            self._remove(path)
+            total -= size
+        self._size = total
+
+    def _expired(self, created: float) -> bool:
+        return self._ttl_sec > 0 and self._clock.now().timestamp() - created > self._ttl_sec
+
+    def _total_size(self) -> int:
+        return sum(os.path.getsize(p) for p in self._entry_paths())
+
+    def _entry_paths(self) -> List[str]:
+        return [os.path.join(self._dir, n) for n in os.listdir(self._dir) if n.endswith(".json")]
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self._dir, f"{key}.json")
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        if self._size is not None:
+            self._size -= size
@@ -20,7 +20,7 @@ from dev_observer.api.types.ai_pb2 import ModelConfig
 from dev_observer.log import s_
 from dev_observer.prompts.langfuse import LangfuseAuthProps
 from dev_observer.prompts.provider import FormattedPrompt
-from dev_observer.storage.provider import StorageProvider
+from dev_observer.storage.config_cache import GlobalConfigCache
 
 _log = logging.getLogger(__name__)
 
@@ -56,18 +56,18 @@ def _masking_function(data):
 class LanggraphAnalysisProvider(AnalysisProvider):
     _lf_auth: Optional[LangfuseAuthProps] = None
     _mask: bool
-    _storage: StorageProvider
+    _config: GlobalConfigCache
 
-    def __init__(self, storage: StorageProvider, langfuse_auth: Optional[LangfuseAuthProps] = None, mask: bool = True):
+    def __init__(self, config: GlobalConfigCache, langfuse_auth: Optional[LangfuseAuthProps] = None, mask: bool = True):
         self._lf_auth = langfuse_auth
         self._mask = mask
-        self._storage = storage
+        self._config = config
 
     async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
         g = await _get_graph()
         info = AnalysisInfo(prompt=prompt)
         config = info.append(ensure_config())
-        global_config = await self._storage.get_global_config()
+        global_config = await self._config.get()
         disable_masking = global_config.HasField("analysis") and global_config.analysis.disable_masking
         should_mask = self._mask and not disable_masking
         if self._lf_auth is not None:
@@ -87,10 +87,12 @@ class LanggraphAnalysisProvider(AnalysisProvider):
                 session_id=session_id,
             )]
             config["callbacks"] = callbacks
-        result = await g.ainvoke({}, config, output_keys=["response"])
+        result = await g.ainvoke({}, config, output_keys=["response", "input_tokens", "output_tokens"])
         analysis = result.get("response", "")
         _log.debug(s_("Content analyzed", anaysis_len=len(analysis)))
-        return AnalysisResult(analysis=analysis)
+        return AnalysisResult(
+            analysis=analysis, input_tokens=result.get("input_tokens"), output_tokens=result.get("output_tokens"),
+        )
 
 
 _in_memory_store = InMemoryStore()
@@ -118,6 +120,8 @@ async def _get_graph() -> CompiledStateGraph:
 
 class AnalysisState(BaseModel):
     response: Optional[str] = None
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
 
 
 class AnalysisNodes:
@@ -153,7 +157,12 @@ class AnalysisNodes:
             _log.debug(s_("Invoking model", prompt_config=prompt_config, prompt_name=prompt_name))
             response = await model.ainvoke(pv, config=config)
             _log.debug(s_("Model replied", prompt_config=prompt_config, prompt_name=prompt_name))
-            return {"response": f"{response.content}"}
+            usage = response.usage_metadata or {}
+            return {
+                "response": f"{response.content}",
+                "input_tokens": usage.get("input_tokens"),
+                "output_tokens": usage.get("output_tokens"),
+            }
         except BaseException as e:
             _log.exception(s_("Model failed", prompt_config=prompt_config, prompt_name=prompt_name, error=e))
             raise
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import random
+from collections import deque
+from typing import Callable, Awaitable, TypeVar, Optional, Deque
+
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.log import s_
+from dev_observer.prompts.provider import FormattedPrompt
+
+_log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 529 is returned by Anthropic when the API is overloaded.
+_RATE_LIMIT_STATUSES = {429, 503, 529}
+_RATE_LIMIT_NAMES = ("ratelimit", "overloaded", "resourceexhausted", "toomanyrequests")
+
+
+def is_rate_limit_error(e: BaseException) -> bool:
+    """Checks whether the error (or any of its explicit causes) is a provider rate limit or overload error.
+
+    Only `__cause__` is followed. `__context__` is set for any error raised while handling another one, e.g. a
+    failure in cleanup after a rate limit, which must not be retried as a rate limit.
+    """
+    seen = set()
+    current: Optional[BaseException] = e
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if _status_code(current) in _RATE_LIMIT_STATUSES:
+            return True
+        name = type(current).__name__.lower().replace("_", "")
+        if any(n in name for n in _RATE_LIMIT_NAMES):
+            return True
+        current = current.__cause__
+    return False
+
+
+def _status_code(e: BaseException) -> Optional[int]:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(e, attr, None)
+        if isinstance(value, int):
+            return int(value)
+    response = getattr(e, "response", None)
+    value = getattr(response, "status_code", None)
+    return int(value) if isinstance(value, int) else None
+
+
+class AdaptiveLimiter:
+    """Limits concurrent calls and adapts the limit to provider rate limits.
+
+    The limit is halved when a call fails with a rate limit error and the call is retried after a backoff.
+    Every `limit` successful calls raise the limit by one, up to `max_limit`.
+    """
+    _max_limit: int
+    _limit: int
+    _in_flight: int
+    _successes: int
+    _epoch: int
+    _max_retries: int
+    _backoff_sec: float
+    _max_backoff_sec: float
+    _waiters: Deque[asyncio.Future]
+
+    def __init__(
+            self,
+            max_limit: int,
+            max_retries: int = 5,
+            backoff_sec: float = 1.0,
+            max_backoff_sec: float = 60.0,
+    ):
+        self._max_limit = max(max_limit, 1)
+        self._limit = self._max_limit
+        self._in_flight = 0
+        self._successes = 0
+        self._epoch = 0
+        self._max_retries = max_retries
+        self._backoff_sec = backoff_sec
+        self._max_backoff_sec = max_backoff_sec
+        self._waiters = deque()
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    async def run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Runs `fn` once a slot is available, retrying it on rate limit errors.
+
+        `fn` is called for every attempt, so it must create a new awaitable each time.
+        """
+        attempt = 0
+        while True:
+            await self._acquire()
+            epoch = self._epoch
+            try:
+                result = await fn()
+            except Exception as e:
+                self._release()
+                if not is_rate_limit_error(e) or attempt >= self._max_retries:
+                    raise
+                self._on_rate_limited(epoch, e)
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release()
+            self._on_success()
+            return result
+
+    async def _acquire(self):
+        if self._in_flight < self._limit and len(self._waiters) == 0:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over before the cancellation, give it back.
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _release(self):
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while len(self._waiters) > 0 and self._in_flight < self._limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    def _on_success(self):
+        if self._limit >= self._max_limit:
+            return
+        self._successes += 1
+        if self._successes >= self._limit:
+            self._successes = 0
+            self._limit += 1
+            _log.debug(s_("Raising concurrency limit", limit=self._limit))
+            self._wake()
+
+    def _on_rate_limited(self, epoch: int, e: Exception):
+        # Calls started before the limit was lowered tend to fail together, lower the limit once for them.
+        if epoch == self._epoch:
+            self._epoch += 1
+            self._limit = max(1, self._limit // 2)
+            self._successes = 0
+        _log.warning(s_("Rate limited by provider, lowering concurrency", limit=self._limit, error=str(e)))
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self._backoff_sec * (2 ** (attempt - 1)), self._max_backoff_sec)
+        return delay * random.uniform(0.5, 1.0)
+
+
+class LimitingAnalysisProvider(AnalysisProvider):
+    """Runs all requests of the wrapped provider through one adaptive limiter.
+
+    A single instance is shared by all analyses using the provider, so a rate limit lowers the concurrency of all
+    of them instead of only the analyzer that hit it.
+    """
+    _provider: AnalysisProvider
+    limiter: AdaptiveLimiter
+
+    def __init__(self, provider: AnalysisProvider, max_concurrency: int):
+        self._provider = provider
+        self.limiter = AdaptiveLimiter(max_concurrency)
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        return await self.limiter.run(lambda: self._provider.analyze(prompt, session_id))
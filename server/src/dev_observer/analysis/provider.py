@@ -8,6 +8,9 @@ from dev_observer.prompts.provider import FormattedPrompt
 @dataclasses.dataclass
 class AnalysisResult:
     analysis: str
+    # Token usage reported by the model, None if unknown.
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
 
 
 class AnalysisProvider(Protocol):
@@ -17,14 +17,22 @@ class GlobalConfig(_message.Message):
     def __init__(self, analysis: _Optional[_Union[AnalysisConfig, _Mapping]] = ..., repo_analysis: _Optional[_Union[RepoAnalysisConfig, _Mapping]] = ..., website_crawling: _Optional[_Union[WebsiteCrawlingConfig, _Mapping]] = ...) -> None: ...
 
 class AnalysisConfig(_message.Message):
-    __slots__ = ("repo_analyzers", "site_analyzers", "disable_masking")
+    __slots__ = ("repo_analyzers", "site_analyzers", "disable_masking", "max_combine_tokens", "max_concurrent_requests", "max_concurrent_analyzers", "chunk_digest_prompt")
     REPO_ANALYZERS_FIELD_NUMBER: _ClassVar[int]
     SITE_ANALYZERS_FIELD_NUMBER: _ClassVar[int]
     DISABLE_MASKING_FIELD_NUMBER: _ClassVar[int]
+    MAX_COMBINE_TOKENS_FIELD_NUMBER: _ClassVar[int]
+    MAX_CONCURRENT_REQUESTS_FIELD_NUMBER: _ClassVar[int]
+    MAX_CONCURRENT_ANALYZERS_FIELD_NUMBER: _ClassVar[int]
+    CHUNK_DIGEST_PROMPT_FIELD_NUMBER: _ClassVar[int]
     repo_analyzers: _containers.RepeatedCompositeFieldContainer[_observations_pb2.Analyzer]
     site_analyzers: _containers.RepeatedCompositeFieldContainer[_observations_pb2.Analyzer]
     disable_masking: bool
-    def __init__(self, repo_analyzers: _Optional[_Iterable[_Union[_observations_pb2.Analyzer, _Mapping]]] = ..., site_analyzers: _Optional[_Iterable[_Union[_observations_pb2.Analyzer, _Mapping]]] = ..., disable_masking: bool = ...) -> None: ...
+    max_combine_tokens: int
+    max_concurrent_requests: int
+    max_concurrent_analyzers: int
+    chunk_digest_prompt: str
+    def __init__(self, repo_analyzers: _Optional[_Iterable[_Union[_observations_pb2.Analyzer, _Mapping]]] = ..., site_analyzers: _Optional[_Iterable[_Union[_observations_pb2.Analyzer, _Mapping]]] = ..., disable_masking: bool = ..., max_combine_tokens: _Optional[int] = ..., max_concurrent_requests: _Optional[int] = ..., max_concurrent_analyzers: _Optional[int] = ..., chunk_digest_prompt: _Optional[str] = ...) -> None: ...
 
 class UserManagementStatus(_message.Message):
     __slots__ = ("enabled", "public_api_key")
@@ -35,9 +43,9 @@ class UserManagementStatus(_message.Message):
     def __init__(self, enabled: bool = ..., public_api_key: _Optional[str] = ...) -> None: ...
 
 class RepoAnalysisConfig(_message.Message):
-    __slots__ = ("flatten", "processing_interval_sec", "disabled")
+    __slots__ = ("flatten", "processing_interval_sec", "disabled", "incremental", "incremental_max_diff_tokens")
     class Flatten(_message.Message):
-        __slots__ = ("compress", "remove_empty_lines", "out_style", "max_tokens_per_chunk", "max_repo_size_mb", "ignore_pattern", "large_repo_threshold_mb", "large_repo_ignore_pattern", "compress_large", "max_file_size_bytes")
+        __slots__ = ("compress", "remove_empty_lines", "out_style", "max_tokens_per_chunk", "max_repo_size_mb", "ignore_pattern", "large_repo_threshold_mb", "large_repo_ignore_pattern", "compress_large", "max_file_size_bytes", "flattener", "partial_clone")
         COMPRESS_FIELD_NUMBER: _ClassVar[int]
         REMOVE_EMPTY_LINES_FIELD_NUMBER: _ClassVar[int]
         OUT_STYLE_FIELD_NUMBER: _ClassVar[int]
@@ -48,6 +56,8 @@ class RepoAnalysisConfig(_message.Message):
         LARGE_REPO_IGNORE_PATTERN_FIELD_NUMBER: _ClassVar[int]
         COMPRESS_LARGE_FIELD_NUMBER: _ClassVar[int]
         MAX_FILE_SIZE_BYTES_FIELD_NUMBER: _ClassVar[int]
+        FLATTENER_FIELD_NUMBER: _ClassVar[int]
+        PARTIAL_CLONE_FIELD_NUMBER: _ClassVar[int]
         compress: bool
         remove_empty_lines: bool
         out_style: str
@@ -58,23 +68,31 @@ class RepoAnalysisConfig(_message.Message):
         large_repo_ignore_pattern: str
         compress_large: bool
         max_file_size_bytes: int
-        def __init__(self, compress: bool = ..., remove_empty_lines: bool = ..., out_style: _Optional[str] = ..., max_tokens_per_chunk: _Optional[int] = ..., max_repo_size_mb: _Optional[int] = ..., ignore_pattern: _Optional[str] = ..., large_repo_threshold_mb: _Optional[int] = ..., large_repo_ignore_pattern: _Optional[str] = ..., compress_large: bool = ..., max_file_size_bytes: _Optional[int] = ...) -> None: ...
+        flattener: str
+        partial_clone: bool
+        def __init__(self, compress: bool = ..., remove_empty_lines: bool = ..., out_style: _Optional[str] = ..., max_tokens_per_chunk: _Optional[int] = ..., max_repo_size_mb: _Optional[int] = ..., ignore_pattern: _Optional[str] = ..., large_repo_threshold_mb: _Optional[int] = ..., large_repo_ignore_pattern: _Optional[str] = ..., compress_large: bool = ..., max_file_size_bytes: _Optional[int] = ..., flattener: _Optional[str] = ..., partial_clone: bool = ...) -> None: ...
     FLATTEN_FIELD_NUMBER: _ClassVar[int]
     PROCESSING_INTERVAL_SEC_FIELD_NUMBER: _ClassVar[int]
     DISABLED_FIELD_NUMBER: _ClassVar[int]
+    INCREMENTAL_FIELD_NUMBER: _ClassVar[int]
+    INCREMENTAL_MAX_DIFF_TOKENS_FIELD_NUMBER: _ClassVar[int]
     flatten: RepoAnalysisConfig.Flatten
     processing_interval_sec: int
     disabled: bool
-    def __init__(self, flatten: _Optional[_Union[RepoAnalysisConfig.Flatten, _Mapping]] = ..., processing_interval_sec: _Optional[int] = ..., disabled: bool = ...) -> None: ...
+    incremental: bool
+    incremental_max_diff_tokens: int
+    def __init__(self, flatten: _Optional[_Union[RepoAnalysisConfig.Flatten, _Mapping]] = ..., processing_interval_sec: _Optional[int] = ..., disabled: bool = ..., incremental: bool = ..., incremental_max_diff_tokens: _Optional[int] = ...) -> None: ...
 
 class WebsiteCrawlingConfig(_message.Message):
-    __slots__ = ("website_scan_timeout_seconds", "scrapy_response_timeout_seconds", "crawl_depth", "timeout_without_data_seconds")
+    __slots__ = ("website_scan_timeout_seconds", "scrapy_response_timeout_seconds", "crawl_depth", "timeout_without_data_seconds", "processing_interval_sec")
     WEBSITE_SCAN_TIMEOUT_SECONDS_FIELD_NUMBER: _ClassVar[int]
     SCRAPY_RESPONSE_TIMEOUT_SECONDS_FIELD_NUMBER: _ClassVar[int]
     CRAWL_DEPTH_FIELD_NUMBER: _ClassVar[int]
     TIMEOUT_WITHOUT_DATA_SECONDS_FIELD_NUMBER: _ClassVar[int]
+    PROCESSING_INTERVAL_SEC_FIELD_NUMBER: _ClassVar[int]
     website_scan_timeout_seconds: int
     scrapy_response_timeout_seconds: int
     crawl_depth: int
     timeout_without_data_seconds: int
-    def __init__(self, website_scan_timeout_seconds: _Optional[int] = ..., scrapy_response_timeout_seconds: _Optional[int] = ..., crawl_depth: _Optional[int] = ..., timeout_without_data_seconds: _Optional[int] = ...) -> None: ...
+    processing_interval_sec: int
+    def __init__(self, website_scan_timeout_seconds: _Optional[int] = ..., scrapy_response_timeout_seconds: _Optional[int] = ..., crawl_depth: _Optional[int] = ..., timeout_without_data_seconds: _Optional[int] = ..., processing_interval_sec: _Optional[int] = ...) -> None: ...
@@ -25,15 +25,19 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import timestamp_pb2 as google_dot_protobuf_dot_timestamp__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\'dev_observer/api/types/processing.proto\x12!dev_observer.api.types.processing\x1a\x1fgoogle/protobuf/timestamp.proto\"N\n\x11ProcessingItemKey\x12\x18\n\x0egithub_repo_id\x18\x64 \x01(\tH\x00\x12\x15\n\x0bwebsite_url\x18\x65 \x01(\tH\x00\x42\x08\n\x06\x65ntity\"\xac\x02\n\x0eProcessingItem\x12\x41\n\x03key\x18\x01 \x01(\x0b\x32\x34.dev_observer.api.types.processing.ProcessingItemKey\x12\x38\n\x0fnext_processing\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x00\x88\x01\x01\x12\x37\n\x0elast_processed\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x17\n\nlast_error\x18\x04 \x01(\tH\x02\x88\x01\x01\x12\x15\n\rno_processing\x18\x05 \x01(\x08\x42\x12\n\x10_next_processingB\x11\n\x0f_last_processedB\r\n\x0b_last_errorb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\'dev_observer/api/types/processing.proto\x12!dev_observer.api.types.processing\x1a\x1fgoogle/protobuf/timestamp.proto\"N\n\x11ProcessingItemKey\x12\x18\n\x0egithub_repo_id\x18\x64 \x01(\tH\x00\x12\x15\n\x0bwebsite_url\x18\x65 \x01(\tH\x00\x42\x08\n\x06\x65ntity\"\xfb\x03\n\x0eProcessingItem\x12\x41\n\x03key\x18\x01 \x01(\x0b\x32\x34.dev_observer.api.types.processing.ProcessingItemKey\x12\x38\n\x0fnext_processing\x18\x02 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x00\x88\x01\x01\x12\x37\n\x0elast_processed\x18\x03 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x01\x88\x01\x01\x12\x17\n\nlast_error\x18\x04 \x01(\tH\x02\x88\x01\x01\x12\x15\n\rno_processing\x18\x05 \x01(\x08\x12\x18\n\x0blease_owner\x18\x06 \x01(\tH\x03\x88\x01\x01\x12\x36\n\rlease_expires\x18\x07 \x01(\x0b\x32\x1a.google.protobuf.TimestampH\x04\x88\x01\x01\x12\x10\n\x08\x66\x61ilures\x18\x08 \x01(\x05\x12G\n\x08priority\x18\t \x01(\x0e\x32\x35.dev_observer.api.types.processing.ProcessingPriorityB\x12\n\x10_next_processingB\x11\n\x0f_last_processedB\r\n\x0b_last_errorB\x0e\n\x0c_lease_ownerB\x10\n\x0e_lease_expires\"z\n\x14ProcessingLaneStatus\x12\x0c\n\x04name\x18\x01 \x01(\t\x12\x0f\n\x07workers\x18\x02 \x01(\x05\x12\x43\n\x05items\x18\x03 \x03(\x0b\x32\x34.dev_observer.api.types.processing.ProcessingItemKey*~\n\x12ProcessingPriority\x12!\n\x1dPROCESSING_PRIORITY_SCHEDULED\x10\x00\x12#\n\x1fPROCESSING_PRIORITY_INTERACTIVE\x10\x01\x12 \n\x1cPROCESSING_PRIORITY_BACKFILL\x10\x02\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'dev_observer.api.types.processing_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
+  _globals['_PROCESSINGPRIORITY']._serialized_start=825
+  _globals['_PROCESSINGPRIORITY']._serialized_end=951
   _globals['_PROCESSINGITEMKEY']._serialized_start=111
   _globals['_PROCESSINGITEMKEY']._serialized_end=189
   _globals['_PROCESSINGITEM']._serialized_start=192
-  _globals['_PROCESSINGITEM']._serialized_end=492
+  _globals['_PROCESSINGITEM']._serialized_end=699
+  _globals['_PROCESSINGLANESTATUS']._serialized_start=701
+  _globals['_PROCESSINGLANESTATUS']._serialized_end=823
 # @@protoc_insertion_point(module_scope)
@@ -1,10 +1,21 @@
 from google.protobuf import timestamp_pb2 as _timestamp_pb2
+from google.protobuf.internal import containers as _containers
+from google.protobuf.internal import enum_type_wrapper as _enum_type_wrapper
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
-from typing import ClassVar as _ClassVar, Mapping as _Mapping, Optional as _Optional, Union as _Union
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
+class ProcessingPriority(int, metaclass=_enum_type_wrapper.EnumTypeWrapper):
+    __slots__ = ()
+    PROCESSING_PRIORITY_SCHEDULED: _ClassVar[ProcessingPriority]
+    PROCESSING_PRIORITY_INTERACTIVE: _ClassVar[ProcessingPriority]
+    PROCESSING_PRIORITY_BACKFILL: _ClassVar[ProcessingPriority]
+PROCESSING_PRIORITY_SCHEDULED: ProcessingPriority
+PROCESSING_PRIORITY_INTERACTIVE: ProcessingPriority
+PROCESSING_PRIORITY_BACKFILL: ProcessingPriority
+
 class ProcessingItemKey(_message.Message):
     __slots__ = ("github_repo_id", "website_url")
     GITHUB_REPO_ID_FIELD_NUMBER: _ClassVar[int]
@@ -14,15 +25,33 @@ class ProcessingItemKey(_message.Message):
     def __init__(self, github_repo_id: _Optional[str] = ..., website_url: _Optional[str] = ...) -> None: ...
 
 class ProcessingItem(_message.Message):
-    __slots__ = ("key", "next_processing", "last_processed", "last_error", "no_processing")
+    __slots__ = ("key", "next_processing", "last_processed", "last_error", "no_processing", "lease_owner", "lease_expires", "failures", "priority")
     KEY_FIELD_NUMBER: _ClassVar[int]
     NEXT_PROCESSING_FIELD_NUMBER: _ClassVar[int]
     LAST_PROCESSED_FIELD_NUMBER: _ClassVar[int]
     LAST_ERROR_FIELD_NUMBER: _ClassVar[int]
     NO_PROCESSING_FIELD_NUMBER: _ClassVar[int]
+    LEASE_OWNER_FIELD_NUMBER: _ClassVar[int]
+    LEASE_EXPIRES_FIELD_NUMBER: _ClassVar[int]
+    FAILURES_FIELD_NUMBER: _ClassVar[int]
+    PRIORITY_FIELD_NUMBER: _ClassVar[int]
     key: ProcessingItemKey
     next_processing: _timestamp_pb2.Timestamp
     last_processed: _timestamp_pb2.Timestamp
     last_error: str
     no_processing: bool
-    def __init__(self, key: _Optional[_Union[ProcessingItemKey, _Mapping]] = ..., next_processing: _Optional[_Union[_timestamp_pb2.Timestamp, _Mapping]] = ..., last_processed: _Optional[_Union[_timestamp_pb2.Timestamp, _Mapping]] = ..., last_error: _Optional[str] = ..., no_processing: bool = ...) -> None: ...
+    lease_owner: str
+    lease_expires: _timestamp_pb2.Timestamp
+    failures: int
+    priority: ProcessingPriority
+    def __init__(self, key: _Optional[_Union[ProcessingItemKey, _Mapping]] = ..., next_processing: _Optional[_Union[_timestamp_pb2.Timestamp, _Mapping]] = ..., last_processed: _Optional[_Union[_timestamp_pb2.Timestamp, _Mapping]] = ..., last_error: _Optional[str] = ..., no_processing: bool = ..., lease_owner: _Optional[str] = ..., lease_expires: _Optional[_Union[_timestamp_pb2.Timestamp, _Mapping]] = ..., failures: _Optional[int] = ..., priority: _Optional[_Union[ProcessingPriority, str]] = ...) -> None: ...
+
+class ProcessingLaneStatus(_message.Message):
+    __slots__ = ("name", "workers", "items")
+    NAME_FIELD_NUMBER: _ClassVar[int]
+    WORKERS_FIELD_NUMBER: _ClassVar[int]
+    ITEMS_FIELD_NUMBER: _ClassVar[int]
+    name: str
+    workers: int
+    items: _containers.RepeatedCompositeFieldContainer[ProcessingItemKey]
+    def __init__(self, name: _Optional[str] = ..., workers: _Optional[int] = ..., items: _Optional[_Iterable[_Union[ProcessingItemKey, _Mapping]]] = ...) -> None: ...
@@ -1,7 +1,8 @@
 from google.protobuf import timestamp_pb2 as _timestamp_pb2
+from google.protobuf.internal import containers as _containers
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
-from typing import ClassVar as _ClassVar, Mapping as _Mapping, Optional as _Optional, Union as _Union
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
 
 DESCRIPTOR: _descriptor.FileDescriptor
 
@@ -22,12 +23,24 @@ class GitHubRepository(_message.Message):
     def __init__(self, id: _Optional[str] = ..., name: _Optional[str] = ..., full_name: _Optional[str] = ..., url: _Optional[str] = ..., description: _Optional[str] = ..., properties: _Optional[_Union[GitProperties, _Mapping]] = ...) -> None: ...
 
 class GitProperties(_message.Message):
-    __slots__ = ("app_info", "meta")
+    __slots__ = ("app_info", "meta", "observed_commits")
     APP_INFO_FIELD_NUMBER: _ClassVar[int]
     META_FIELD_NUMBER: _ClassVar[int]
+    OBSERVED_COMMITS_FIELD_NUMBER: _ClassVar[int]
     app_info: GitAppInfo
     meta: GitMeta
-    def __init__(self, app_info: _Optional[_Union[GitAppInfo, _Mapping]] = ..., meta: _Optional[_Union[GitMeta, _Mapping]] = ...) -> None: ...
+    observed_commits: _containers.RepeatedCompositeFieldContainer[ObservedCommit]
+    def __init__(self, app_info: _Optional[_Union[GitAppInfo, _Mapping]] = ..., meta: _Optional[_Union[GitMeta, _Mapping]] = ..., observed_commits: _Optional[_Iterable[_Union[ObservedCommit, _Mapping]]] = ...) -> None: ...
+
+class ObservedCommit(_message.Message):
+    __slots__ = ("observation_key", "commit", "analyzer_fingerprint")
+    OBSERVATION_KEY_FIELD_NUMBER: _ClassVar[int]
+    COMMIT_FIELD_NUMBER: _ClassVar[int]
+    ANALYZER_FINGERPRINT_FIELD_NUMBER: _ClassVar[int]
+    observation_key: str
+    commit: str
+    analyzer_fingerprint: str
+    def __init__(self, observation_key: _Optional[str] = ..., commit: _Optional[str] = ..., analyzer_fingerprint: _Optional[str] = ...) -> None: ...
 
 class GitMeta(_message.Message):
     __slots__ = ("last_refresh", "clone_url", "size_kb")
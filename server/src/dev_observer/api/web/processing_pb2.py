@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# NO CHECKED-IN PROTOBUF GENCODE
+# source: dev_observer/api/web/processing.proto
+# Protobuf Python Version: 5.29.0
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import descriptor_pool as _descriptor_pool
+from google.protobuf import runtime_version as _runtime_version
+from google.protobuf import symbol_database as _symbol_database
+from google.protobuf.internal import builder as _builder
+_runtime_version.ValidateProtobufRuntimeVersion(
+    _runtime_version.Domain.PUBLIC,
+    5,
+    29,
+    0,
+    '',
+    'dev_observer/api/web/processing.proto'
+)
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+from dev_observer.api.types import processing_pb2 as dev__observer_dot_api_dot_types_dot_processing__pb2
+
+
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n%dev_observer/api/web/processing.proto\x12\x1f\x64\x65v_observer.api.web.processing\x1a\'dev_observer/api/types/processing.proto\"w\n\x1bGetProcessingStatusResponse\x12\x46\n\x05lanes\x18\x01 \x03(\x0b\x32\x37.dev_observer.api.types.processing.ProcessingLaneStatus\x12\x10\n\x08\x65mbedded\x18\x02 \x01(\x08\x62\x06proto3')
+
+_globals = globals()
+_builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
+_builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'dev_observer.api.web.processing_pb2', _globals)
+if not _descriptor._USE_C_DESCRIPTORS:
+  DESCRIPTOR._loaded_options = None
+  _globals['_GETPROCESSINGSTATUSRESPONSE']._serialized_start=115
+  _globals['_GETPROCESSINGSTATUSRESPONSE']._serialized_end=234
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,15 @@
+from dev_observer.api.types import processing_pb2 as _processing_pb2
+from google.protobuf.internal import containers as _containers
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from typing import ClassVar as _ClassVar, Iterable as _Iterable, Mapping as _Mapping, Optional as _Optional, Union as _Union
+
+DESCRIPTOR: _descriptor.FileDescriptor
+
+class GetProcessingStatusResponse(_message.Message):
+    __slots__ = ("lanes", "embedded")
+    LANES_FIELD_NUMBER: _ClassVar[int]
+    EMBEDDED_FIELD_NUMBER: _ClassVar[int]
+    lanes: _containers.RepeatedCompositeFieldContainer[_processing_pb2.ProcessingLaneStatus]
+    embedded: bool
+    def __init__(self, lanes: _Optional[_Iterable[_Union[_processing_pb2.ProcessingLaneStatus, _Mapping]]] = ..., embedded: bool = ...) -> None: ...
@@ -1,13 +1,17 @@
 import logging
 from typing import Optional, Tuple
 
+from dev_observer.analysis.cache import AnalysisCache, CachingAnalysisProvider, LocalAnalysisCache
 from dev_observer.analysis.langgraph_provider import LanggraphAnalysisProvider
+from dev_observer.analysis.limiter import LimitingAnalysisProvider
 from dev_observer.analysis.provider import AnalysisProvider
 from dev_observer.analysis.stub import StubAnalysisProvider
+from dev_observer.flatten.cache import FlattenCache
 from dev_observer.log import s_
 from dev_observer.observations.local import LocalObservationsProvider
 from dev_observer.observations.provider import ObservationsProvider
 from dev_observer.observations.s3 import S3ObservationsProvider
+from dev_observer.process import configure_processes
 from dev_observer.processors.periodic import PeriodicProcessor
 from dev_observer.processors.repos import ReposProcessor
 from dev_observer.processors.websites import WebsitesProcessor
@@ -19,12 +23,16 @@ from dev_observer.repository.auth.github_token import GithubTokenAuthProvider
 from dev_observer.repository.copying import CopyingGitRepositoryProvider
 from dev_observer.repository.delegating import DelegatingGitRepositoryProvider
 from dev_observer.repository.github import GithubProvider, GithubAuthProvider
+from dev_observer.repository.mirror import RepoMirrorStore
 from dev_observer.repository.provider import GitRepositoryProvider
 from dev_observer.server.env import ServerEnv
-from dev_observer.settings import Settings, LocalPrompts, Github, LangfusePrompts, LanggraphAnalysis
+from dev_observer.settings import Settings, LocalPrompts, Github, LangfusePrompts, LanggraphAnalysis, Git, \
+    Processing
 from dev_observer.storage.local import LocalStorageProvider
 from dev_observer.storage.memory import MemoryStorageProvider
+from dev_observer.storage.postgresql.analysis_cache import PostgresqlAnalysisCache
 from dev_observer.storage.postgresql.provider import PostgresqlStorageProvider
+from dev_observer.storage.config_cache import GlobalConfigCache
 from dev_observer.storage.provider import StorageProvider
 from dev_observer.tokenizer.provider import TokenizerProvider
 from dev_observer.tokenizer.stub import StubTokenizerProvider
@@ -44,7 +52,7 @@ def detect_git_provider(settings: Settings, storage: StorageProvider) -> GitRepo
         raise ValueError("Git settings are not provided")
     match git_sett.provider:
         case "github":
-            return GithubProvider(detect_github_auth(git_sett.github, storage), storage)
+            return GithubProvider(detect_github_auth(git_sett.github, storage), storage, detect_repo_mirror(git_sett))
         case "copying":
             return CopyingGitRepositoryProvider()
         case "delegating":
@@ -52,6 +60,13 @@ def detect_git_provider(settings: Settings, storage: StorageProvider) -> GitRepo
     raise ValueError(f"Unsupported git provider: {git_sett.provider}")
 
 
+def detect_repo_mirror(git_sett: Git) -> Optional[RepoMirrorStore]:
+    m = git_sett.mirror
+    if m is None:
+        return None
+    return RepoMirrorStore(m.dir, m.max_size_mb * 1024 * 1024)
+
+
 def detect_github_auth(gh: Optional[Github], storage: StorageProvider) -> GithubAuthProvider:
     if gh is None:
         raise ValueError(f"Github settings are not defined")
@@ -67,22 +82,52 @@ def detect_github_auth(gh: Optional[Github], storage: StorageProvider) -> Github
     raise ValueError(f"Unsupported auth type: {gh.auth_type}")
 
 
-def detect_analysis_provider(settings: Settings, storage: StorageProvider) -> AnalysisProvider:
+def detect_analysis_provider(
+        settings: Settings, config: GlobalConfigCache, storage: StorageProvider,
+) -> AnalysisProvider:
     a = settings.analysis
     if a is None:
         raise ValueError("Analysis settings are not defined")
+    # One limiter per provider, so rate limits throttle all analyses together. Cache hits don't take a slot.
+    provider = LimitingAnalysisProvider(_detect_base_analysis_provider(settings, config), a.max_concurrent_llm_requests)
+    cache = detect_analysis_cache(settings, storage)
+    if cache is None:
+        return provider
+    return CachingAnalysisProvider(provider, cache)
+
+
+def _detect_base_analysis_provider(settings: Settings, config: GlobalConfigCache) -> AnalysisProvider:
+    a = settings.analysis
     match a.provider:
         case "langgraph":
             lg = a.langgrpah if a.langgrpah is not None else LanggraphAnalysis()
             lf_auth: Optional[LangfuseAuthProps] = None
             if settings.prompts is not None and settings.prompts.langfuse is not None:
                 lf_auth = _get_lf_auth(settings.prompts.langfuse)
-            return LanggraphAnalysisProvider(storage, lf_auth, mask=lg.mask_traces)
+            return LanggraphAnalysisProvider(config, lf_auth, mask=lg.mask_traces)
         case "stub":
             return StubAnalysisProvider()
     raise ValueError(f"Unsupported analysis provider: {a.provider}")
 
 
+def detect_analysis_cache(settings: Settings, storage: StorageProvider) -> Optional[AnalysisCache]:
+    c = settings.analysis.cache if settings.analysis is not None else None
+    if c is None:
+        return None
+    max_size_bytes = c.max_size_mb * 1024 * 1024
+    match c.provider:
+        case "local":
+            if c.dir is None:
+                raise ValueError("Missing dir for local analysis cache")
+            return LocalAnalysisCache(c.dir, max_size_bytes, c.ttl_sec)
+        case "postgresql":
+            if not isinstance(storage, PostgresqlStorageProvider):
+                raise ValueError("Postgresql analysis cache requires postgresql storage")
+            # Engines are bound to the event loop, so the cache uses the engine of the storage of the same loop.
+            return PostgresqlAnalysisCache(storage.engine, max_size_bytes, c.ttl_sec, c.evict_interval_sec)
+    raise ValueError(f"Unsupported analysis cache provider: {c.provider}")
+
+
 def detect_prompts_provider(settings: Settings) -> PromptsProvider:
     p = settings.prompts
     if p is None:
@@ -188,15 +233,57 @@ def detect_web_scraping(settings: Settings) -> WebsiteCrawlerProvider:
     raise ValueError(f"Unsupported web scraping provider: {ws.provider}")
 
 
+def detect_flatten_cache(settings: Settings) -> Optional[FlattenCache]:
+    fc = settings.flatten_cache
+    if fc is None:
+        return None
+    return FlattenCache(fc.dir, fc.max_size_mb * 1024 * 1024)
+
+
+def detect_processes(settings: Settings):
+    p = settings.processes
+    if p is None:
+        return
+    configure_processes(p.max_concurrent, p.timeout_sec)
+
+
+def detect_periodic_processor(
+        settings: Settings,
+        storage: StorageProvider,
+        config: GlobalConfigCache,
+        repos_processor: ReposProcessor,
+        sites_processor: WebsitesProcessor,
+) -> PeriodicProcessor:
+    p = settings.processing if settings.processing is not None else Processing()
+    return PeriodicProcessor(
+        storage,
+        repos_processor,
+        websites_processor=sites_processor,
+        repo_workers=p.repo_workers,
+        website_workers=p.website_workers,
+        lease_sec=p.lease_sec,
+        interval_jitter=p.interval_jitter,
+        retry_backoff_sec=p.retry_backoff_sec,
+        max_retry_backoff_sec=p.max_retry_backoff_sec,
+        max_failures=p.max_failures,
+        config=config,
+        prefetch=p.prefetch,
+    )
+
+
 def detect_server_env(settings: Settings) -> ServerEnv:
+    detect_processes(settings)
     prompts = detect_prompts_provider(settings)
     observations = detect_observer(settings)
     tokenizer = detect_tokenizer(settings)
     storage = detect_storage_provider(settings)
     bg_storage = detect_storage_provider(settings)
-    bg_analysis = detect_analysis_provider(settings, bg_storage)
+    bg_config = GlobalConfigCache(bg_storage)
+    bg_analysis = detect_analysis_provider(settings, bg_config, bg_storage)
     bg_repository = detect_git_provider(settings, bg_storage)
-    bg_repos_processor = ReposProcessor(bg_analysis, bg_repository, prompts, observations, tokenizer)
+    bg_repos_processor = ReposProcessor(
+        bg_analysis, bg_repository, prompts, observations, tokenizer, detect_flatten_cache(settings), bg_storage,
+    )
     bg_web_scraping = detect_web_scraping(settings)
     bg_sites_processor = WebsitesProcessor(bg_analysis, bg_web_scraping, prompts, observations, tokenizer)
     users = detect_users_provider(settings)
@@ -212,9 +299,12 @@ def detect_server_env(settings: Settings) -> ServerEnv:
         observations=observations,
         storage=storage,
         repos_processor=bg_repos_processor,
-        periodic_processor=PeriodicProcessor(bg_storage, bg_repos_processor, websites_processor=bg_sites_processor),
+        periodic_processor=detect_periodic_processor(
+            settings, bg_storage, bg_config, bg_repos_processor, bg_sites_processor,
+        ),
         users=users,
         api_keys=api_keys or [],
+        embedded_processing=settings.processing is None or settings.processing.embedded,
     )
     _log.debug(s_("Detected environment",
                   bg_repository=bg_repository,
@@ -0,0 +1,210 @@
+import contextlib
+import dataclasses
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Dict
+
+from dev_observer.api.types.config_pb2 import RepoAnalysisConfig
+from dev_observer.log import s_
+from dev_observer.util import dir_size
+
+_log = logging.getLogger(__name__)
+
+_META_FILE = "meta.json"
+_FULL_FILE = "full.md"
+_PIN_FILE = "pin.lock"
+
+
+@dataclasses.dataclass
+class CachedFlatten:
+    key: str
+    full_file_path: str
+    file_paths: List[str]
+    total_tokens: int
+
+
+def flatten_cache_key(
+        commit_sha: str, flatten_config: RepoAnalysisConfig.Flatten, is_large: bool, tokenizer_name: str,
+) -> str:
+    """Returns the key of flatten artifacts, covering every input that changes them besides the content.
+
+    Large repos are flattened with extra ignore patterns and compression, the tokenizer decides chunk boundaries.
+    """
+    h = hashlib.sha256(flatten_config.SerializeToString(deterministic=True))
+    h.update(f"|large={is_large}|tokenizer={tokenizer_name}".encode("utf-8"))
+    return f"{commit_sha}-{h.hexdigest()[:16]}"
+
+
+class FlattenCache:
+    """Content-addressed local cache of flatten artifacts (combined file and chunk files).
+
+    Entries are directories under `root_dir` named by key. Least recently used entries are evicted once the
+    total size exceeds `max_size_bytes`; entries that are in use by a running analysis are never evicted.
+
+    The root may be shared by several worker processes. An entry in use is pinned with a shared lock on its pin
+    file, eviction takes an exclusive lock and skips entries it can't lock. Locks are released by the OS when a
+    process dies, so a crashed worker never pins an entry forever.
+    """
+    _dir: str
+    _max_size_bytes: int
+    # Open pin files of this instance by key, one per `get` or `put` not released yet.
+    _pins: Dict[str, List[int]]
+
+    def __init__(self, root_dir: str, max_size_bytes: int):
+        os.makedirs(root_dir, exist_ok=True)
+        self._dir = root_dir
+        self._max_size_bytes = max_size_bytes
+        self._pins = {}
+
+    def get(self, key: str) -> Optional[CachedFlatten]:
+        """Returns the cached entry and marks it as in use until `release` is called."""
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, _META_FILE)
+        if not self._pin(key):
+            return None
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError) as e:
+            _log.warning(s_("Broken flatten cache entry, removing", key=key, error=e))
+            self.release(key)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+        # Modification time of the meta file is used as the last access time for LRU eviction.
+        os.utime(meta_path)
+        return self._to_cached(key, meta)
+
+    def put(self, key: str, full_file_path: str, file_paths: List[str], total_tokens: int) -> CachedFlatten:
+        """Copies flatten artifacts into the cache and returns the entry, marked as in use."""
+        tmp_dir = tempfile.mkdtemp(prefix=f".tmp-{key}-", dir=self._dir)
+        pin: Optional[int] = None
+        try:
+            # Pinned before the entry becomes visible, so it can't be evicted before it is returned.
+            pin = _lock_shared(os.path.join(tmp_dir, _PIN_FILE))
+            shutil.copyfile(full_file_path, os.path.join(tmp_dir, _FULL_FILE))
+            size_bytes = os.path.getsize(full_file_path)
+            names: List[str] = []
+            for i, p in enumerate(file_paths):
+                name = f"chunk_{i}.md"
+                shutil.copyfile(p, os.path.join(tmp_dir, name))
+                size_bytes += os.path.getsize(p)
+                names.append(name)
+            # Recorded, so eviction doesn't walk every entry to sum up the cache size.
+            meta = {"file_paths": names, "total_tokens": total_tokens, "size_bytes": size_bytes}
+            with open(os.path.join(tmp_dir, _META_FILE), 'w') as f:
+                json.dump(meta, f)
+            entry_dir = self._entry_dir(key)
+            if os.path.exists(entry_dir):
+                # Stored concurrently by someone else, same key means same content.
+                shutil.rmtree(tmp_dir)
+                os.close(pin)
+                pin = None
+                if not self._pin(key):
+                    raise RuntimeError(f"Flatten cache entry [{key}] was evicted while being stored")
+            else:
+                os.rename(tmp_dir, entry_dir)
+                self._pins.setdefault(key, []).append(pin)
+        except BaseException:
+            if pin is not None:
+                os.close(pin)
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.evict()
+        return self._to_cached(key, meta)
+
+    def release(self, key: str):
+        pins = self._pins.get(key)
+        if not pins:
+            return
+        os.close(pins.pop())
+        if len(pins) == 0:
+            self._pins.pop(key, None)
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self._dir):
+            path = os.path.join(self._dir, name)
+            meta_path = os.path.join(path, _META_FILE)
+            if name.startswith(".tmp-") or not os.path.exists(meta_path):
+                continue
+            try:
+                size = _entry_size(path, meta_path)
+                last_used = os.path.getmtime(meta_path)
+            except (OSError, ValueError):
+                # Evicted by another process meanwhile, or broken and removed on the next `get`.
+                continue
+            total += size
+            entries.append((last_used, name, size))
+        if total <= self._max_size_bytes:
+            return
+        entries.sort()
+        for _, name, size in entries:
+            if total <= self._max_size_bytes:
+                break
+            path = os.path.join(self._dir, name)
+            try:
+                fd = os.open(os.path.join(path, _PIN_FILE), os.O_RDWR | os.O_CREAT)
+            except FileNotFoundError:
+                # Evicted by another process.
+                continue
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+                _log.debug(s_("Evicting flatten cache entry", key=name, size=size))
+                # Meta goes first, so readers that were waiting for the lock see the entry as missing.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(path, _META_FILE))
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+            finally:
+                os.close(fd)
+
+    def _pin(self, key: str) -> bool:
+        entry_dir = self._entry_dir(key)
+        try:
+            fd = _lock_shared(os.path.join(entry_dir, _PIN_FILE))
+        except FileNotFoundError:
+            return False
+        # The entry could have been evicted while waiting for the lock.
+        if not os.path.exists(os.path.join(entry_dir, _META_FILE)):
+            os.close(fd)
+            return False
+        self._pins.setdefault(key, []).append(fd)
+        return True
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self._dir, key)
+
+    def _to_cached(self, key: str, meta: dict) -> CachedFlatten:
+        entry_dir = self._entry_dir(key)
+        return CachedFlatten(
+            key=key,
+            full_file_path=os.path.join(entry_dir, _FULL_FILE),
+            file_paths=[os.path.join(entry_dir, n) for n in meta.get("file_paths", [])],
+            total_tokens=meta.get("total_tokens", 0),
+        )
+
+
+def _entry_size(path: str, meta_path: str) -> int:
+    with open(meta_path, 'r') as f:
+        size = json.load(f).get("size_bytes")
+    # Entries stored before sizes were recorded.
+    return size if size is not None else dir_size(path)
+
+
+def _lock_shared(path: str) -> int:
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
@@ -1,23 +1,39 @@
+import asyncio
 import dataclasses
 import logging
 import os
 import random
 import shutil
 import string
-import subprocess
-from typing import List, Callable, Optional
+import tempfile
+from array import array
+from collections import OrderedDict
+from typing import List, Callable, Optional, Iterator, TextIO, Dict, TypeVar
 
 from pydantic import BaseModel
 
 from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.flatten.cache import FlattenCache, CachedFlatten, flatten_cache_key
+from dev_observer.flatten.ignore import split_patterns, is_large_repo, repo_ignore_pattern, DEFAULT_MAX_FILE_SIZE
+from dev_observer.flatten.native import flatten_native, NativeFlattenOptions
+from dev_observer.flatten.packing import Section, iter_section_bounds, pack_sections, supports_sections, \
+    section_file_path
 from dev_observer.log import s_
+from dev_observer.metrics import STAGE_DURATION, STAGE_BYTES, STAGE_TOKENS
+from dev_observer.process import run_process
 from dev_observer.repository.cloner import clone_repository
 from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
 from dev_observer.repository.types import ObservedRepo
-from dev_observer.tokenizer.provider import TokenizerProvider
+from dev_observer.tokenizer.provider import TokenizerProvider, TOKEN_TYPECODE
+from dev_observer.util import dir_size
 
 _log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Roughly a few chunks of the default size.
+_DEFAULT_MAX_CACHED_CHARS = 16 * 1024 * 1024
+
 
 @dataclasses.dataclass
 class CombineResult:
@@ -25,6 +41,8 @@ class CombineResult:
     file_path: str
     size_bytes: int
     output_dir: str
+    # Tokens of the section of each included file, only reported by the native flattener.
+    file_tokens: Dict[str, int] = dataclasses.field(default_factory=dict)
 
 
 @dataclasses.dataclass
@@ -34,6 +52,42 @@ class FlattenResult:
     file_paths: List[str]
     total_tokens: int
     clean_up: Callable[[], bool]
+    # Commit the content was produced from, if known.
+    commit: Optional[str] = None
+    # Budget for contents kept in memory by `read`, least recently read files are dropped first.
+    max_cached_chars: int = _DEFAULT_MAX_CACHED_CHARS
+
+    def __post_init__(self):
+        # Not a dataclass field, so contents never end up in logged or copied results.
+        self._contents: OrderedDict[str, str] = OrderedDict()
+        self._cached_chars = 0
+
+    def read(self, path: str) -> str:
+        """Returns the content of the full file or of a chunk.
+
+        Analyzers of a result read the same chunks at about the same time, so recently read files are kept in
+        memory and shared by them until `close` is called.
+        """
+        content = self._contents.get(path)
+        if content is not None:
+            self._contents.move_to_end(path)
+            return content
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if len(content) > self.max_cached_chars:
+            return content
+        self._contents[path] = content
+        self._cached_chars += len(content)
+        while self._cached_chars > self.max_cached_chars:
+            _, dropped = self._contents.popitem(last=False)
+            self._cached_chars -= len(dropped)
+        return content
+
+    def close(self) -> bool:
+        """Drops cached contents and cleans up the files, returns whether anything was removed."""
+        self._contents.clear()
+        self._cached_chars = 0
+        return self.clean_up()
 
 
 class RepomixInput(BaseModel):
@@ -88,7 +142,12 @@ class RepomixConfig(BaseModel):
 
 
 
-def combine_repository(repo_path: str, info: RepositoryInfo, config: GlobalConfig) -> CombineResult:
+async def combine_repository(
+        repo_path: str,
+        info: RepositoryInfo,
+        config: GlobalConfig,
+        tokenizer: Optional[TokenizerProvider] = None,
+) -> CombineResult:
     flatten_config = config.repo_analysis.flatten if config.repo_analysis.HasField("flatten") \
         else RepoAnalysisConfig.Flatten()
     suffix = ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
@@ -96,16 +155,39 @@ def combine_repository(repo_path: str, info: RepositoryInfo, config: GlobalConfi
     os.makedirs(folder_path)
     output_file = os.path.join(folder_path, "full.md")
 
-    large_threshold_kb = (flatten_config.large_repo_threshold_mb or 500) * 1024
-    is_large = info.size_kb > large_threshold_kb
+    is_large = is_large_repo(flatten_config, info.size_kb)
     _log.info(s_("Starting repo flatten", is_large=is_large))
 
     compress = flatten_config.compress or (is_large and flatten_config.compress_large)
-    ignore = flatten_config.ignore_pattern
-    max_file_size = flatten_config.max_file_size_bytes or 50_000
-    if is_large and len(flatten_config.large_repo_ignore_pattern) > 0:
-        ignore = ",".join([ignore, flatten_config.large_repo_ignore_pattern])
-        
+    ignore = repo_ignore_pattern(flatten_config, is_large)
+    max_file_size = flatten_config.max_file_size_bytes or DEFAULT_MAX_FILE_SIZE
+
+    flattener = flatten_config.flattener or "repomix"
+    if flattener == "native":
+        style = flatten_config.out_style or "markdown"
+        if style != "markdown":
+            raise ValueError(f"Native flattener does not support [{style}] output style")
+        if compress:
+            _log.warning(s_("Native flattener does not support compression, ignoring"))
+        options = NativeFlattenOptions(
+            ignore_patterns=split_patterns(ignore),
+            max_file_size=max_file_size,
+            remove_empty_lines=flatten_config.remove_empty_lines,
+        )
+        # Reading and tokenizing files is blocking, keep it off the event loop.
+        with STAGE_DURATION.timer(stage="native_flatten"):
+            file_tokens = await asyncio.to_thread(flatten_native, repo_path, output_file, options, tokenizer)
+        size_bytes = os.path.getsize(output_file)
+        STAGE_BYTES.observe(size_bytes, stage="native_flatten")
+        return CombineResult(
+            file_path=output_file,
+            size_bytes=size_bytes,
+            output_dir=folder_path,
+            file_tokens=file_tokens,
+        )
+    if flattener != "repomix":
+        raise ValueError(f"Unsupported flattener: {flattener}")
+
     config = RepomixConfig(
         input=RepomixInput(maxFileSize=max_file_size),
         output=RepomixOutput(
@@ -124,12 +206,8 @@ def combine_repository(repo_path: str, info: RepositoryInfo, config: GlobalConfi
     cmd = ["repomix", "--config", config_file, repo_path]
 
     _log.debug(s_("Executing repomix...", output_file=output_file, cmd=cmd))
-    result = subprocess.run(
-        cmd,
-        capture_output=True,
-        text=True,
-        check=False
-    )
+    with STAGE_DURATION.timer(stage="repomix"):
+        result = await run_process(cmd)
 
     if result.returncode != 0:
         _log.error(s_("Failed to repomix repository.", out=result.stderr, code=result.returncode))
@@ -143,6 +221,7 @@ def combine_repository(repo_path: str, info: RepositoryInfo, config: GlobalConfi
 
     # Get the size of the combined file
     size_bytes = os.path.getsize(output_file)
+    STAGE_BYTES.observe(size_bytes, stage="repomix")
 
     return CombineResult(file_path=output_file, size_bytes=size_bytes, output_dir=folder_path)
 
@@ -154,41 +233,143 @@ class TokenizeResult:
     total_tokens: int
 
 
+# Number of characters read from the combined file per tokenizer call.
+_READ_BLOCK_CHARS = 1_000_000
+
+
+def _read_blocks(f: TextIO, block_chars: int = _READ_BLOCK_CHARS) -> Iterator[str]:
+    """Yields blocks of roughly `block_chars` characters, extended to the end of the current line.
+
+    Ending blocks on a line boundary keeps the tokenization of each block close to the tokenization of the
+    whole file, since tokens practically never span a newline.
+    """
+    while True:
+        block = f.read(block_chars)
+        if not block:
+            return
+        if not block.endswith("\n"):
+            block += f.readline()
+        yield block
+
+
 def _tokenize_file(
         file_path: str,
         out_dir: str,
         tokenizer: TokenizerProvider,
         config: GlobalConfig,
+        file_tokens: Optional[Dict[str, int]] = None,
 ) -> TokenizeResult:
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
     max_tokens_per_file = 100_000
+    style = "markdown"
     if config.repo_analysis.HasField("flatten"):
-        max_tokens_per_file = config.repo_analysis.flatten.max_tokens_per_chunk
+        flatten_config = config.repo_analysis.flatten
+        max_tokens_per_file = flatten_config.max_tokens_per_chunk
+        if len(flatten_config.out_style) > 0:
+            style = flatten_config.out_style
     if max_tokens_per_file <= 0:
         raise ValueError("max_tokens_per_file must be greater than 0")
 
-    # Read the input file
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    if supports_sections(style):
+        return _tokenize_sections(file_path, out_dir, tokenizer, max_tokens_per_file, style, file_tokens)
+    _log.debug(s_("Style does not support sections, splitting by tokens", style=style))
+    return _tokenize_stream(file_path, out_dir, tokenizer, max_tokens_per_file)
 
-    # Tokenize the content
-    tokens = tokenizer.encode(content)
-    total_tokens = len(tokens)
-    if total_tokens <= max_tokens_per_file:
-        return TokenizeResult(file_paths=[], total_tokens=total_tokens)
 
-    # Create output files
-    output_files = []
-    for i in range(0, total_tokens, max_tokens_per_file):
-        chunk_tokens = tokens[i:i + max_tokens_per_file]
-        chunk_text = tokenizer.decode(chunk_tokens)
-        out_file = os.path.join(out_dir, f"chunk_{i}.md")
-        with open(out_file, 'w', encoding='utf-8') as f:
-            f.write(chunk_text)
+def _tokenize_sections(
+        file_path: str,
+        out_dir: str,
+        tokenizer: TokenizerProvider,
+        max_tokens_per_file: int,
+        style: str,
+        file_tokens: Optional[Dict[str, int]] = None,
+) -> TokenizeResult:
+    """Splits the combined file on file boundaries and packs whole files into as few chunks as possible.
+
+    Only files that do not fit into a single chunk are split by tokens. Sections of files in `file_tokens`,
+    counted by the flattener, are not tokenized again unless they have to be split.
+    """
+    sections: List[Section] = []
+    total_tokens = 0
+    # Pieces of oversized files can't be re-read from the combined file, their decoded text is spilled to disk.
+    with open(file_path, 'rb') as f, tempfile.TemporaryFile(dir=out_dir) as spill:
+        for start, end in list(iter_section_bounds(f, style)):
+            f.seek(start)
+            known = (file_tokens or {}).get(section_file_path(f.readline(), style))
+            if known is not None and known <= max_tokens_per_file:
+                total_tokens += known
+                sections.append(Section(index=len(sections), tokens=known, start=start, end=end))
+                continue
+            f.seek(start)
+            tokens = tokenizer.encode_buffer(f.read(end - start).decode("utf-8"))
+            total_tokens += len(tokens)
+            if len(tokens) <= max_tokens_per_file:
+                sections.append(Section(index=len(sections), tokens=len(tokens), start=start, end=end))
+                continue
+            view = memoryview(tokens)
+            for i in range(0, len(tokens), max_tokens_per_file):
+                piece = view[i:i + max_tokens_per_file]
+                piece_start = spill.tell()
+                spill.write(tokenizer.decode_buffer(piece).encode("utf-8"))
+                sections.append(Section(
+                    index=len(sections), tokens=len(piece), start=piece_start, end=spill.tell(), spilled=True,
+                ))
+
+        if total_tokens <= max_tokens_per_file:
+            return TokenizeResult(file_paths=[], total_tokens=total_tokens)
+
+        output_files: List[str] = []
+        for i, chunk in enumerate(pack_sections(sections, max_tokens_per_file)):
+            out_file = os.path.join(out_dir, f"chunk_{i}.md")
+            with open(out_file, 'w', encoding='utf-8') as out:
+                for section in chunk:
+                    out.write(section.read(f, spill))
+            output_files.append(out_file)
+
+    _log.debug(s_("Sections tokenized", sections=len(sections), chunks=len(output_files), total_tokens=total_tokens))
+    return TokenizeResult(file_paths=output_files, total_tokens=total_tokens)
 
+
+def _tokenize_stream(
+        file_path: str,
+        out_dir: str,
+        tokenizer: TokenizerProvider,
+        max_tokens_per_file: int,
+) -> TokenizeResult:
+    output_files: List[str] = []
+    # Tokens that are not written to a chunk file yet. Never holds much more than one chunk plus one block.
+    pending = array(TOKEN_TYPECODE)
+    total_tokens = 0
+
+    def write_chunk(chunk_tokens: memoryview):
+        out_file = os.path.join(out_dir, f"chunk_{len(output_files)}.md")
+        with open(out_file, 'w', encoding='utf-8') as out:
+            out.write(tokenizer.decode_buffer(chunk_tokens))
         output_files.append(out_file)
 
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for block in _read_blocks(f):
+            tokens = tokenizer.encode_buffer(block)
+            total_tokens += len(tokens)
+            # Appended as raw bytes, iterating the buffer would box every token.
+            pending.frombytes(memoryview(tokens).cast("B"))
+            # Only flush while strictly above the limit: a file with exactly max tokens is not chunked.
+            flushed = 0
+            while len(pending) - flushed > max_tokens_per_file:
+                with memoryview(pending) as view:
+                    write_chunk(view[flushed:flushed + max_tokens_per_file])
+                flushed += max_tokens_per_file
+            # The buffer can't be resized while exported to a memoryview, so flushed tokens are dropped after.
+            del pending[:flushed]
+
+    if len(output_files) == 0:
+        return TokenizeResult(file_paths=[], total_tokens=total_tokens)
+
+    if len(pending) > 0:
+        with memoryview(pending) as view:
+            write_chunk(view)
+
     return TokenizeResult(file_paths=output_files, total_tokens=total_tokens)
 
 
@@ -203,8 +384,26 @@ async def flatten_repository(
         provider: GitRepositoryProvider,
         tokenizer: TokenizerProvider,
         config: GlobalConfig,
+        cache: Optional[FlattenCache] = None,
 ) -> FlattenRepoResult:
-    clone_result = await clone_repository(repo, provider, config)
+    info = await provider.get_repo(repo)
+    # Resolved before cloning, so the recorded commit is never newer than the analyzed content.
+    commit = await _get_head_commit(repo, info, provider)
+    cache_key: Optional[str] = None
+    if cache is not None and commit is not None:
+        flatten_config = config.repo_analysis.flatten
+        cache_key = flatten_cache_key(
+            commit, flatten_config, is_large_repo(flatten_config, info.size_kb), tokenizer.name,
+        )
+        cached = await _in_thread_pinned(cache, cache_key, cache.get, cache_key)
+        if cached is not None:
+            _log.debug(s_("Flatten cache hit, skipping clone", key=cache_key))
+            return FlattenRepoResult(flatten_result=_cached_flatten_result(cache, cached, commit), repo=info)
+
+    with STAGE_DURATION.timer(stage="clone"):
+        clone_result = await clone_repository(repo, provider, config)
+    # Measured on disk, the size reported by the provider is approximate.
+    STAGE_BYTES.observe(await asyncio.to_thread(dir_size, clone_result.path), stage="clone")
     repo_path = clone_result.path
     combined_file_path: Optional[str] = None
 
@@ -218,19 +417,83 @@ async def flatten_repository(
             cleaned = True
         return cleaned
 
-    combine_result = combine_repository(repo_path, clone_result.repo, config)
+    combine_result = await combine_repository(repo_path, clone_result.repo, config, tokenizer)
     combined_file_path = combine_result.file_path
     out_dir = combine_result.output_dir
     _log.debug(s_("Tokenizing..."))
-    tokenize_result = _tokenize_file(combined_file_path, out_dir, tokenizer, config)
+    # Tokenizing a large repo takes longer than a processing lease, off the event loop leases keep being renewed.
+    with STAGE_DURATION.timer(stage="tokenize"):
+        tokenize_result = await asyncio.to_thread(
+            _tokenize_file, combined_file_path, out_dir, tokenizer, config, combine_result.file_tokens,
+        )
+    STAGE_TOKENS.observe(tokenize_result.total_tokens, stage="tokenize")
     _log.debug(s_("File tokenized"))
     flatten_result = FlattenResult(
         full_file_path=combined_file_path,
         file_paths=tokenize_result.file_paths,
         total_tokens=tokenize_result.total_tokens,
         clean_up=clean_up,
+        commit=commit,
     )
+    if cache_key is not None:
+        try:
+            # Copies the artifacts and evicts old entries, both blocking.
+            cached = await _in_thread_pinned(
+                cache, cache_key, cache.put,
+                cache_key, combined_file_path, tokenize_result.file_paths, tokenize_result.total_tokens,
+            )
+            # Analysis reads from the cache entry, so the clone can be removed right away.
+            await asyncio.to_thread(clean_up)
+            flatten_result = _cached_flatten_result(cache, cached, commit)
+        except Exception as e:
+            _log.warning(s_("Failed to store flatten result in cache", key=cache_key, error=e))
     return FlattenRepoResult(
         flatten_result=flatten_result,
         repo=clone_result.repo,
     )
+
+
+async def _get_head_commit(
+        repo: ObservedRepo,
+        info: RepositoryInfo,
+        provider: GitRepositoryProvider,
+) -> Optional[str]:
+    try:
+        commit = await provider.get_head_commit(repo, info)
+    except Exception as e:
+        _log.warning(s_("Failed to resolve head commit", repo=repo.url, error=e))
+        return None
+    if commit is None or len(commit) == 0:
+        return None
+    return commit
+
+
+async def _in_thread_pinned(cache: FlattenCache, key: str, call: Callable[..., T], *args) -> T:
+    """Runs a cache call that pins the entry in a thread, the entry is released if the caller is cancelled."""
+    future = asyncio.ensure_future(asyncio.to_thread(call, *args))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        # The call can't be interrupted, its pin is dropped once it is done.
+        future.add_done_callback(lambda f: _release_pinned(cache, key, f))
+        raise
+
+
+def _release_pinned(cache: FlattenCache, key: str, future: asyncio.Future):
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        cache.release(key)
+
+
+def _cached_flatten_result(cache: FlattenCache, cached: CachedFlatten, commit: Optional[str]) -> FlattenResult:
+    def clean_up():
+        # Cached files are kept for future runs, only the entry is unpinned.
+        cache.release(cached.key)
+        return False
+
+    return FlattenResult(
+        full_file_path=cached.full_file_path,
+        file_paths=cached.file_paths,
+        total_tokens=cached.total_tokens,
+        clean_up=clean_up,
+        commit=commit,
+    )
@@ -0,0 +1,160 @@
+import dataclasses
+import os
+import re
+from typing import List, Optional
+
+from dev_observer.api.types.config_pb2 import RepoAnalysisConfig
+
+# Subset of repomix default ignore patterns that matter for source analysis.
+DEFAULT_IGNORE_PATTERNS: List[str] = [
+    ".git",
+    ".hg",
+    ".svn",
+    "node_modules",
+    "bower_components",
+    ".venv",
+    "venv",
+    "__pycache__",
+    "*.pyc",
+    ".idea",
+    ".vscode",
+    ".DS_Store",
+    "*.log",
+    "*.min.js",
+    "*.min.css",
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "bun.lockb",
+    "poetry.lock",
+    "uv.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "composer.lock",
+    "Gemfile.lock",
+    "go.sum",
+]
+
+DEFAULT_MAX_FILE_SIZE = 50_000
+
+
+@dataclasses.dataclass
+class IgnorePattern:
+    pattern: str
+    regex: re.Pattern
+    negate: bool
+    dir_only: bool
+
+
+def split_patterns(patterns: str) -> List[str]:
+    """Splits a comma separated list of patterns, as used in `RepoAnalysisConfig.Flatten.ignore_pattern`."""
+    return [p.strip() for p in patterns.split(",") if len(p.strip()) > 0]
+
+
+def is_large_repo(flatten_config: RepoAnalysisConfig.Flatten, size_kb: int) -> bool:
+    large_threshold_kb = (flatten_config.large_repo_threshold_mb or 500) * 1024
+    return size_kb > large_threshold_kb
+
+
+def repo_ignore_pattern(flatten_config: RepoAnalysisConfig.Flatten, is_large: bool) -> str:
+    """Returns comma separated custom ignore patterns, including the large repo ones if applicable."""
+    ignore = flatten_config.ignore_pattern
+    if is_large and len(flatten_config.large_repo_ignore_pattern) > 0:
+        ignore = ",".join([ignore, flatten_config.large_repo_ignore_pattern])
+    return ignore
+
+
+def parse_pattern(pattern: str, base: str = "") -> Optional[IgnorePattern]:
+    """Parses a single gitignore-style pattern relative to `base` (a directory relative to the repo root)."""
+    raw = pattern
+    pattern = pattern.rstrip()
+    if len(pattern) == 0 or pattern.startswith("#"):
+        return None
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if len(pattern) == 0:
+        return None
+    # Patterns with a slash (other than a trailing one) are relative to the base, others match at any level.
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    prefix = re.escape(f"{base}/") if len(base) > 0 else ""
+    if not anchored:
+        prefix += "(?:.*/)?"
+    regex = re.compile(f"^{prefix}{_translate(pattern)}$")
+    return IgnorePattern(pattern=raw, regex=regex, negate=negate, dir_only=dir_only)
+
+
+def _translate(pattern: str) -> str:
+    out: List[str] = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                body = body.replace("\\", "\\\\")
+                out.append(f"[{body}]")
+                i = end + 1
+                continue
+        elif c == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """Ordered list of gitignore-style patterns, the last matching pattern wins."""
+    _patterns: List[IgnorePattern]
+
+    def __init__(self, patterns: Optional[List[IgnorePattern]] = None):
+        self._patterns = patterns or []
+
+    def add(self, pattern: str, base: str = ""):
+        parsed = parse_pattern(pattern, base)
+        if parsed is not None:
+            self._patterns.append(parsed)
+
+    def add_all(self, patterns: List[str], base: str = ""):
+        for p in patterns:
+            self.add(p, base)
+
+    def add_file(self, path: str, base: str = ""):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            self.add_all(f.read().splitlines(), base)
+
+    def copy(self) -> "IgnoreRules":
+        return IgnoreRules(list(self._patterns))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        rel_path = rel_path.replace(os.sep, "/")
+        ignored = False
+        for p in self._patterns:
+            if p.dir_only and not is_dir:
+                continue
+            if p.regex.match(rel_path):
+                ignored = not p.negate
+        return ignored
@@ -0,0 +1,227 @@
+import dataclasses
+import logging
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, TextIO
+
+from dev_observer.flatten.ignore import IgnoreRules, DEFAULT_IGNORE_PATTERNS
+from dev_observer.flatten.packing import MD_FILE_HEADER
+from dev_observer.log import s_
+from dev_observer.tokenizer.provider import TokenizerProvider
+
+_log = logging.getLogger(__name__)
+
+# Number of files read concurrently before they are written out, bounds memory used for file contents.
+_BATCH_SIZE = 256
+_BINARY_CHECK_BYTES = 8000
+
+_languages: Dict[str, str] = {
+    ".py": "python",
+    ".js": "javascript",
+    ".jsx": "javascript",
+    ".ts": "typescript",
+    ".tsx": "typescript",
+    ".go": "go",
+    ".java": "java",
+    ".kt": "kotlin",
+    ".rb": "ruby",
+    ".rs": "rust",
+    ".c": "c",
+    ".h": "c",
+    ".cpp": "cpp",
+    ".cs": "csharp",
+    ".php": "php",
+    ".swift": "swift",
+    ".scala": "scala",
+    ".sh": "bash",
+    ".sql": "sql",
+    ".md": "markdown",
+    ".json": "json",
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".toml": "toml",
+    ".xml": "xml",
+    ".html": "html",
+    ".css": "css",
+    ".proto": "protobuf",
+}
+
+
+@dataclasses.dataclass
+class NativeFlattenOptions:
+    ignore_patterns: List[str]
+    max_file_size: int
+    remove_empty_lines: bool = False
+    use_gitignore: bool = True
+    use_default_patterns: bool = True
+    max_workers: Optional[int] = None
+
+
+@dataclasses.dataclass
+class _FileContent:
+    path: str
+    # Section of the file in the combined output, None if the file is excluded.
+    section: Optional[str]
+    tokens: int = 0
+
+
+def list_files(repo_path: str, options: NativeFlattenOptions, exclude_dirs: Optional[List[str]] = None) -> List[str]:
+    """Lists files of the repository relative to `repo_path`, honoring ignore patterns and `.gitignore` files."""
+    root_rules = IgnoreRules()
+    if options.use_default_patterns:
+        root_rules.add_all(DEFAULT_IGNORE_PATTERNS)
+    root_rules.add_all(options.ignore_patterns)
+    excluded = set(os.path.abspath(d) for d in (exclude_dirs or []))
+
+    rules_by_dir: Dict[str, IgnoreRules] = {}
+    result: List[str] = []
+    for dirpath, dirnames, filenames in os.walk(repo_path):
+        rel_dir = os.path.relpath(dirpath, repo_path)
+        rel_dir = "" if rel_dir == "." else rel_dir.replace(os.sep, "/")
+        rules = rules_by_dir.get(posixpath.dirname(rel_dir), root_rules) if len(rel_dir) > 0 else root_rules
+        gitignore = os.path.join(dirpath, ".gitignore")
+        if options.use_gitignore and os.path.isfile(gitignore):
+            rules = rules.copy()
+            rules.add_file(gitignore, rel_dir)
+        rules_by_dir[rel_dir] = rules
+
+        kept_dirs = []
+        for d in sorted(dirnames):
+            rel = f"{rel_dir}/{d}" if len(rel_dir) > 0 else d
+            if os.path.abspath(os.path.join(dirpath, d)) in excluded or rules.is_ignored(rel, True):
+                continue
+            kept_dirs.append(d)
+        dirnames[:] = kept_dirs
+
+        for f in sorted(filenames):
+            rel = f"{rel_dir}/{f}" if len(rel_dir) > 0 else f
+            if not rules.is_ignored(rel, False):
+                result.append(rel)
+    return result
+
+
+def flatten_native(
+        repo_path: str,
+        output_file: str,
+        options: NativeFlattenOptions,
+        tokenizer: Optional[TokenizerProvider] = None,
+) -> Dict[str, int]:
+    """Combines repository files into a single markdown file with the same layout as repomix markdown output.
+
+    Files are read and tokenized in parallel. Returns the number of tokens of the section of each included file,
+    so the combined file can be split without tokenizing it again, or an empty dict if no tokenizer is given.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    paths = list_files(repo_path, options, exclude_dirs=[output_dir])
+    _log.debug(s_("Listed repository files", count=len(paths)))
+
+    def load(rel_path: str) -> _FileContent:
+        content = _read_text(os.path.join(repo_path, rel_path), options.max_file_size)
+        if content is None:
+            return _FileContent(path=rel_path, section=None)
+        if options.remove_empty_lines:
+            content = "\n".join(line for line in content.splitlines() if len(line.strip()) > 0)
+        section = _file_section(rel_path, content)
+        tokens = tokenizer.count_tokens(section) if tokenizer is not None else 0
+        return _FileContent(path=rel_path, section=section, tokens=tokens)
+
+    file_tokens: Dict[str, int] = {}
+    included: List[str] = []
+    with open(output_file, 'w', encoding='utf-8') as out, ThreadPoolExecutor(options.max_workers) as executor:
+        body_path = f"{output_file}.files"
+        # Files are written to a separate file first, since the directory structure goes before them.
+        with open(body_path, 'w', encoding='utf-8') as body:
+            for i in range(0, len(paths), _BATCH_SIZE):
+                for fc in executor.map(load, paths[i:i + _BATCH_SIZE]):
+                    if fc.section is None:
+                        continue
+                    included.append(fc.path)
+                    if tokenizer is not None:
+                        file_tokens[fc.path] = fc.tokens
+                    body.write(fc.section)
+        _write_header(out, included, options)
+        with open(body_path, 'r', encoding='utf-8') as body:
+            while True:
+                block = body.read(1 << 20)
+                if not block:
+                    break
+                out.write(block)
+        os.remove(body_path)
+
+    if len(file_tokens) > 0:
+        top = sorted(file_tokens.items(), key=lambda kv: kv[1], reverse=True)[:5]
+        _log.debug(s_("Top files by tokens", top=top))
+    _log.debug(s_("Repository flattened natively", files=len(included), skipped=len(paths) - len(included)))
+    return file_tokens
+
+
+def _read_text(path: str, max_file_size: int) -> Optional[str]:
+    try:
+        if os.path.islink(path) or os.path.getsize(path) > max_file_size:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        _log.warning(s_("Failed to read file", path=path, error=e))
+        return None
+    if b"\0" in data[:_BINARY_CHECK_BYTES]:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+
+
+def _write_header(out: TextIO, paths: List[str], options: NativeFlattenOptions):
+    out.write("This file is a merged representation of the entire codebase, combined into a single document.\n\n")
+    out.write("# File Summary\n\n")
+    out.write("## Purpose\n")
+    out.write("This file contains a packed representation of the entire repository's contents.\n\n")
+    out.write("## File Format\n")
+    out.write("The content is organized as follows:\n")
+    out.write("1. This summary section\n")
+    out.write("2. Repository structure\n")
+    out.write("3. Repository files, each consisting of:\n")
+    out.write("  a. A header with the file path (## File: path/to/file)\n")
+    out.write("  b. The full contents of the file in a code block\n\n")
+    out.write("## Notes\n")
+    out.write("- Files matching .gitignore, default and custom ignore patterns are excluded\n")
+    out.write(f"- Binary files and files larger than {options.max_file_size} bytes are excluded\n")
+    if options.remove_empty_lines:
+        out.write("- Empty lines have been removed from all files\n")
+    out.write("\n# Directory Structure\n```\n")
+    out.write(_directory_structure(paths))
+    out.write("```\n\n# Files\n\n")
+
+
+def _directory_structure(paths: List[str]) -> str:
+    tree: Dict = {}
+    for p in paths:
+        node = tree
+        for part in p.split("/"):
+            node = node.setdefault(part, {})
+
+    lines: List[str] = []
+
+    def walk(node: Dict, depth: int):
+        # Directories first, like repomix does.
+        for name in sorted(node.keys(), key=lambda n: (len(node[n]) == 0, n)):
+            children = node[name]
+            lines.append(f"{'  ' * depth}{name}{'/' if len(children) > 0 else ''}")
+            walk(children, depth + 1)
+
+    walk(tree, 0)
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _file_section(path: str, content: str) -> str:
+    fence = "```"
+    # The fence must be longer than any backtick run that starts a line in the content.
+    for line in content.splitlines():
+        if line.startswith(fence):
+            run = len(line) - len(line.lstrip("`"))
+            fence = "`" * (run + 1)
+    lang = _languages.get(os.path.splitext(path)[1].lower(), "")
+    newline = "" if content.endswith("\n") else "\n"
+    return f"{MD_FILE_HEADER}{path}\n{fence}{lang}\n{content}{newline}{fence}\n\n"
@@ -0,0 +1,99 @@
+import dataclasses
+import logging
+import re
+from typing import List, Iterator, Optional, BinaryIO, Tuple
+
+from dev_observer.log import s_
+
+_log = logging.getLogger(__name__)
+
+_md_fence_re = re.compile(rb"^(`{3,})[^`]*$")
+MD_FILE_HEADER = "## File: "
+_md_file_header = MD_FILE_HEADER.encode("utf-8")
+_xml_file_header = b"<file path="
+
+
+@dataclasses.dataclass
+class Section:
+    """A contiguous part of the combined file. Except for the leading summary, each section is a single file."""
+    index: int
+    tokens: int
+    start: int = 0
+    end: int = 0
+    # Set for pieces of split sections. Their decoded text is written to a spill file and the offsets point there.
+    spilled: bool = False
+
+    def read(self, f: BinaryIO, spill: Optional[BinaryIO] = None) -> str:
+        if self.spilled:
+            if spill is None:
+                raise ValueError(f"Section [{self.index}] is spilled, but no spill file is provided")
+            f = spill
+        f.seek(self.start)
+        return f.read(self.end - self.start).decode("utf-8")
+
+
+def supports_sections(style: str) -> bool:
+    return style in ("markdown", "xml")
+
+
+def section_file_path(header: bytes, style: str) -> Optional[str]:
+    """Returns the path of the file of a section from its first line, None for sections that are not a file."""
+    if style != "markdown" or not header.startswith(_md_file_header):
+        return None
+    return header[len(_md_file_header):].rstrip(b"\r\n").decode("utf-8")
+
+
+def iter_section_bounds(f: BinaryIO, style: str) -> Iterator[Tuple[int, int]]:
+    """Yields (start, end) byte offsets of the per-file sections of a repomix output file.
+
+    Everything before the first file (file summary, directory structure) is yielded as the first section.
+    """
+    if not supports_sections(style):
+        raise ValueError(f"Unsupported style for section parsing: {style}")
+    start = 0
+    pos = 0
+    fence: Optional[bytes] = None
+    for line in f:
+        is_header = False
+        if style == "markdown":
+            if fence is not None:
+                if line.rstrip() == fence:
+                    fence = None
+            else:
+                m = _md_fence_re.match(line.rstrip())
+                if m is not None:
+                    fence = m.group(1)
+                else:
+                    is_header = line.startswith(_md_file_header)
+        else:
+            is_header = line.startswith(_xml_file_header)
+        if is_header and pos > start:
+            yield start, pos
+            start = pos
+        pos += len(line)
+    if pos > start:
+        yield start, pos
+
+
+def pack_sections(sections: List[Section], max_tokens: int) -> List[List[Section]]:
+    """Packs sections into as few bins of at most `max_tokens` as possible using first-fit decreasing.
+
+    Sections within a bin keep their original order. Every section must fit into a single bin.
+    """
+    bins: List[List[Section]] = []
+    free: List[int] = []
+    for s in sorted(sections, key=lambda sec: sec.tokens, reverse=True):
+        if s.tokens > max_tokens:
+            raise ValueError(f"Section [{s.index}] has {s.tokens} tokens, more than max {max_tokens}")
+        for i, capacity in enumerate(free):
+            if s.tokens <= capacity:
+                bins[i].append(s)
+                free[i] -= s.tokens
+                break
+        else:
+            bins.append([s])
+            free.append(max_tokens - s.tokens)
+    for b in bins:
+        b.sort(key=lambda sec: sec.index)
+    _log.debug(s_("Sections packed", sections=len(sections), bins=len(bins)))
+    return bins
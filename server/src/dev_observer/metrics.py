@@ -0,0 +1,251 @@
+import contextlib
+import math
+import threading
+import time
+from typing import Dict, List, Tuple, Sequence, Optional, Callable, Iterator
+
+# Durations of stages range from milliseconds (store) to tens of minutes (clone of a large repo).
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+SIZE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(11))  # 1KB to 1GB
+TOKEN_BUCKETS = tuple(float(1000 * 4 ** i) for i in range(9))  # 1K to 65M
+
+_LabelValues = Tuple[str, ...]
+
+
+class Registry:
+    """Keeps metrics of the process and renders them in the Prometheus text format.
+
+    Collectors are called right before rendering, to update gauges that are cheaper to read on demand.
+    """
+    _metrics: List["_Metric"]
+    _collectors: List[Callable[[], None]]
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: "_Metric"):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Metric [{metric.name}] is already registered")
+            self._metrics.append(metric)
+
+    def add_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], None]):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors)
+            metrics = list(self._metrics)
+        for collector in collectors:
+            collector()
+        lines: List[str] = []
+        for m in metrics:
+            lines.append(f"# HELP {m.name} {_escape_help(m.help)}")
+            lines.append(f"# TYPE {m.name} {m.type}")
+            lines.extend(m.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type: str
+    name: str
+    help: str
+    label_names: Tuple[str, ...]
+    _lock: threading.Lock
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), registry: Optional[Registry] = None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(label_names)
+        # Metrics are updated from the processing thread and rendered from the API thread.
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def samples(self) -> List[str]:
+        ...
+
+    def _label_values(self, labels: Dict[str, object]) -> _LabelValues:
+        if len(labels) != len(self.label_names) or any(n not in labels for n in self.label_names):
+            raise ValueError(f"Metric [{self.name}] expects labels {list(self.label_names)}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def _sample(self, suffix: str, values: _LabelValues, value: float, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+        pairs = list(zip(self.label_names, values)) + list(extra)
+        labels = ",".join(f'{n}="{_escape_label(v)}"' for n, v in pairs)
+        return f"{self.name}{suffix}{{{labels}}} {_format_value(value)}" if labels \
+            else f"{self.name}{suffix} {_format_value(value)}"
+
+
+class Counter(_Metric):
+    type = "counter"
+    _values: Dict[_LabelValues, float]
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), registry: Optional[Registry] = None):
+        super().__init__(name, help_text, label_names, registry)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError(f"Counter [{self.name}] can't be decreased")
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [self._sample("", k, v) for k, v in values]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+    _values: Dict[_LabelValues, float]
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (), registry: Optional[Registry] = None):
+        super().__init__(name, help_text, label_names, registry)
+        self._values = {}
+
+    def set(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [self._sample("", k, v) for k, v in values]
+
+
+class _HistogramValues:
+    buckets: List[int]
+    sum: float
+    count: int
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.sum = 0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    type = "histogram"
+    bounds: Tuple[float, ...]
+    _values: Dict[_LabelValues, _HistogramValues]
+
+    def __init__(
+            self,
+            name: str,
+            help_text: str,
+            label_names: Sequence[str] = (),
+            buckets: Sequence[float] = DURATION_BUCKETS,
+            registry: Optional[Registry] = None,
+    ):
+        super().__init__(name, help_text, label_names, registry)
+        self.bounds = tuple(sorted(float(b) for b in buckets if not math.isinf(b))) + (math.inf,)
+        self._values = {}
+
+    def observe(self, value: float, **labels):
+        key = self._label_values(labels)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = _HistogramValues(len(self.bounds))
+                self._values[key] = values
+            for i, bound in enumerate(self.bounds):
+                if value <= bound:
+                    values.buckets[i] += 1
+                    break
+            values.sum += value
+            values.count += 1
+
+    @contextlib.contextmanager
+    def timer(self, **labels) -> Iterator[None]:
+        """Observes the duration of the block in seconds, also when it fails."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted((k, list(v.buckets), v.sum, v.count) for k, v in self._values.items())
+        samples: List[str] = []
+        for key, buckets, total, count in values:
+            cumulative = 0
+            for bound, n in zip(self.bounds, buckets):
+                cumulative += n
+                samples.append(self._sample("_bucket", key, cumulative, (("le", _format_value(bound)),)))
+            samples.append(self._sample("_sum", key, total))
+            samples.append(self._sample("_count", key, count))
+        return samples
+
+
+def observe_llm_tokens(stage: str, input_tokens: Optional[int], output_tokens: Optional[int]):
+    """Observes tokens of one LLM call, usage not reported by the provider, e.g. for cached results, is skipped."""
+    if input_tokens is not None:
+        LLM_TOKENS.observe(input_tokens, stage=stage, type="input")
+    if output_tokens is not None:
+        LLM_TOKENS.observe(output_tokens, stage=stage, type="output")
+
+
+def _format_value(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if isinstance(v, int) or float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape_label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+# Stages: clone, repomix, native_flatten, tokenize, crawl, website_flatten, llm_chunk, llm_full, llm_combine,
+# llm_update, llm_digest, store.
+STAGE_DURATION = Histogram(
+    "dev_observer_stage_duration_seconds", "Duration of processing stages.", ["stage"], DURATION_BUCKETS,
+)
+STAGE_BYTES = Histogram(
+    "dev_observer_stage_bytes", "Size of content produced or sent by processing stages.", ["stage"], SIZE_BUCKETS,
+)
+STAGE_TOKENS = Histogram(
+    "dev_observer_stage_tokens", "Tokens produced by processing stages.", ["stage"], TOKEN_BUCKETS,
+)
+ITEMS_PROCESSED = Counter(
+    "dev_observer_processed_items_total", "Processed items by outcome, success or failure.",
+    ["entity_type", "outcome"],
+)
+LLM_TOKENS = Histogram(
+    "dev_observer_llm_tokens", "Tokens of a single LLM call by stage and type, input or output.", ["stage", "type"],
+    TOKEN_BUCKETS,
+)
+QUEUE_DEPTH = Gauge(
+    "dev_observer_processing_queue_depth", "Items due for processing and not claimed by any worker.", ["entity_type"],
+)
+QUEUE_LAG = Gauge(
+    "dev_observer_processing_lag_seconds", "How long the oldest due item waits past its next processing time.",
+    ["entity_type"],
+)
+BUSY_WORKERS = Gauge(
+    "dev_observer_busy_workers", "Workers of this process processing an item.", ["lane"],
+)
+PREFETCHED_ITEMS = Gauge(
+    "dev_observer_prefetched_items", "Items of this process flattened ahead and waiting for a worker.", ["lane"],
+)
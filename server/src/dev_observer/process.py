@@ -0,0 +1,124 @@
+import asyncio
+import dataclasses
+import logging
+import weakref
+from typing import List, Optional
+
+from dev_observer.log import s_
+
+_log = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class ProcessResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class ProcessRunner:
+    """Runs external processes without blocking the event loop.
+
+    At most `max_concurrent` processes per event loop run at the same time, others wait for a slot. Stderr of a
+    running process is streamed to debug logs line by line. Processes are killed on timeout and on cancellation.
+    """
+    _max_concurrent: int
+    _default_timeout: Optional[float]
+    # Semaphores are bound to the event loop they are used in, the server and the processor run separate loops.
+    _semaphores: weakref.WeakKeyDictionary
+
+    def __init__(self, max_concurrent: int = 4, default_timeout: Optional[float] = None):
+        if max_concurrent <= 0:
+            raise ValueError(f"Max concurrent processes must be positive, got {max_concurrent}")
+        self._max_concurrent = max_concurrent
+        self._default_timeout = default_timeout
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    async def run(
+            self,
+            args: List[str],
+            cwd: Optional[str] = None,
+            timeout: Optional[float] = None,
+    ) -> ProcessResult:
+        """Runs the process and returns its result, non-zero exit codes are not treated as errors.
+
+        Raises RuntimeError if the process does not finish within the timeout.
+        """
+        timeout = timeout if timeout is not None else self._default_timeout
+        name = args[0] if len(args) > 0 else ""
+        async with self._get_semaphore():
+            process = await asyncio.create_subprocess_exec(
+                *args,
+                cwd=cwd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+            stdout_chunks: List[bytes] = []
+            stderr_lines: List[str] = []
+
+            async def read_stdout():
+                while True:
+                    chunk = await process.stdout.read(1 << 16)
+                    if not chunk:
+                        break
+                    stdout_chunks.append(chunk)
+
+            async def read_stderr():
+                while True:
+                    line = await process.stderr.readline()
+                    if not line:
+                        break
+                    decoded = line.decode(errors="replace").rstrip()
+                    stderr_lines.append(decoded)
+                    _log.debug(s_("Process stderr", process=name, pid=process.pid, line=decoded))
+
+            async def communicate() -> int:
+                await asyncio.gather(read_stdout(), read_stderr())
+                return await process.wait()
+
+            try:
+                code = await asyncio.wait_for(communicate(), timeout=timeout)
+            except asyncio.TimeoutError:
+                _kill(process)
+                await process.wait()
+                _log.error(s_("Process timed out", process=name, timeout=timeout))
+                raise RuntimeError(f"Process [{name}] timed out after {timeout} seconds")
+            except asyncio.CancelledError:
+                _kill(process)
+                # Reaped before the slot is released, so cancelled processes never outnumber the limit.
+                await process.wait()
+                _log.warning(s_("Process cancelled", process=name))
+                raise
+        return ProcessResult(
+            returncode=code,
+            stdout=b"".join(stdout_chunks).decode(errors="replace"),
+            stderr="\n".join(stderr_lines),
+        )
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self._max_concurrent)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+
+def _kill(process: asyncio.subprocess.Process):
+    try:
+        process.kill()
+    except ProcessLookupError:
+        pass
+
+
+_runner = ProcessRunner()
+
+
+def configure_processes(max_concurrent: int, default_timeout: Optional[float] = None):
+    global _runner
+    _runner = ProcessRunner(max_concurrent, default_timeout)
+
+
+async def run_process(args: List[str], cwd: Optional[str] = None, timeout: Optional[float] = None) -> ProcessResult:
+    """Runs the process with the shared runner, see `ProcessRunner.run`."""
+    return await _runner.run(args, cwd, timeout)
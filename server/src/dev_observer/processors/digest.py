@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+from datetime import date
+
+from dev_observer.analysis.provider import AnalysisProvider
+from dev_observer.flatten.flatten import FlattenResult
+from dev_observer.log import s_
+from dev_observer.metrics import STAGE_DURATION, observe_llm_tokens
+from dev_observer.prompts.provider import PromptsProvider
+
+_log = logging.getLogger(__name__)
+
+
+class ChunkDigester:
+    """Condenses chunks of a flatten result into analyzer-neutral digests.
+
+    Digests are produced once per chunk and shared by all analyzers of the flatten result, so each analyzer
+    reads digests instead of the raw content.
+    """
+    analysis: AnalysisProvider
+    prompts: PromptsProvider
+    prompt_name: str
+    _semaphore: asyncio.Semaphore
+
+    def __init__(self, analysis: AnalysisProvider, prompts: PromptsProvider, prompt_name: str, max_concurrency: int):
+        self.analysis = analysis
+        self.prompts = prompts
+        self.prompt_name = prompt_name
+        self._semaphore = asyncio.Semaphore(max(max_concurrency, 1))
+
+    async def digest(self, res: FlattenResult) -> FlattenResult:
+        """Returns a flatten result with digests in place of chunks.
+
+        Cleaning up the returned result removes the digests only, the original result is cleaned up separately.
+        """
+        session_id = f"{date.today().strftime("%Y-%m-%d")}.{res.full_file_path}"
+        folder = tempfile.mkdtemp(prefix="chunk_digests_")
+        try:
+            paths = await asyncio.gather(
+                *[self._digest_file(res, p, os.path.join(folder, f"digest_{i}.md"), session_id)
+                  for i, p in enumerate(res.file_paths)]
+            )
+        except BaseException:
+            shutil.rmtree(folder, ignore_errors=True)
+            raise
+
+        def clean_up() -> bool:
+            if not os.path.exists(folder):
+                return False
+            shutil.rmtree(folder, ignore_errors=True)
+            return True
+
+        _log.debug(s_("Chunks digested", chunks=len(paths), folder=folder))
+        return FlattenResult(
+            full_file_path=res.full_file_path,
+            file_paths=list(paths),
+            total_tokens=res.total_tokens,
+            clean_up=clean_up,
+            commit=res.commit,
+        )
+
+    async def _digest_file(self, res: FlattenResult, path: str, out_path: str, session_id: str) -> str:
+        async with self._semaphore:
+            content = res.read(path)
+            prompt = await self.prompts.get_formatted(self.prompt_name, {
+                "content": content,
+            })
+            with STAGE_DURATION.timer(stage="llm_digest"):
+                result = await self.analysis.analyze(prompt, session_id)
+        observe_llm_tokens("llm_digest", result.input_tokens, result.output_tokens)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(result.analysis)
+        return out_path
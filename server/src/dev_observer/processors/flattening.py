@@ -2,21 +2,28 @@ import abc
 import dataclasses
 import logging
 from abc import abstractmethod
-from typing import TypeVar, Generic, List
+from typing import TypeVar, Generic, List, Optional
 
 from dev_observer.analysis.provider import AnalysisProvider
 from dev_observer.api.types.config_pb2 import GlobalConfig
 from dev_observer.api.types.observations_pb2 import ObservationKey, Observation
 from dev_observer.flatten.flatten import FlattenResult
 from dev_observer.log import s_
+from dev_observer.metrics import STAGE_DURATION, STAGE_BYTES
 from dev_observer.observations.provider import ObservationsProvider
+from dev_observer.processors.digest import ChunkDigester
 from dev_observer.processors.tokenized import TokenizedAnalyzer
 from dev_observer.prompts.provider import PromptsProvider
+from dev_observer.tokenizer.provider import TokenizerProvider
+from dev_observer.util import gather_limited
 
 E = TypeVar("E")
 
 _log = logging.getLogger(__name__)
 
+_DEFAULT_MAX_CONCURRENT_REQUESTS = 5
+_DEFAULT_MAX_CONCURRENT_ANALYZERS = 3
+
 
 @dataclasses.dataclass
 class ObservationRequest:
@@ -24,38 +31,139 @@ class ObservationRequest:
     key: ObservationKey
 
 
+@dataclasses.dataclass
+class PreparedAnalysis(Generic[E]):
+    """Entity flattened for the requests that still need a full analysis."""
+    entity: E
+    requests: List[ObservationRequest]
+    config: GlobalConfig
+    flatten: FlattenResult
+
+    def clean_up(self):
+        self.flatten.close()
+
+
 class FlatteningProcessor(abc.ABC, Generic[E]):
     analysis: AnalysisProvider
     prompts: PromptsProvider
     observations: ObservationsProvider
+    tokenizer: Optional[TokenizerProvider]
 
     def __init__(
             self,
             analysis: AnalysisProvider,
             prompts: PromptsProvider,
             observations: ObservationsProvider,
+            tokenizer: Optional[TokenizerProvider] = None,
     ):
         self.analysis = analysis
         self.prompts = prompts
         self.observations = observations
+        self.tokenizer = tokenizer
 
     async def process(self, entity: E, requests: List[ObservationRequest], config: GlobalConfig, clean: bool = True):
+        prepared = await self.prepare(entity, requests, config)
+        if prepared is not None:
+            await self.analyze_prepared(prepared, clean)
+
+    async def prepare(
+            self, entity: E, requests: List[ObservationRequest], config: GlobalConfig,
+    ) -> Optional[PreparedAnalysis[E]]:
+        """Runs incremental updates and flattens the entity for the remaining requests.
+
+        Doesn't call the analysis for full analyses, so the entity can be flattened ahead while other entities
+        are analyzed. Returns None when all observations are up to date.
+        """
+        try:
+            requests = await self.process_incremental(entity, requests, config)
+        except Exception as e:
+            _log.exception(s_("Incremental analysis failed, running full analysis."), exc_info=e)
+        if len(requests) == 0:
+            _log.debug(s_("All observations are up to date"))
+            return None
         res = await self.get_flatten(entity, config)
         _log.debug(s_("Got flatten result", result=res))
+        return PreparedAnalysis(entity=entity, requests=requests, config=config, flatten=res)
+
+    async def analyze_prepared(self, prepared: PreparedAnalysis[E], clean: bool = True):
+        """Analyzes a prepared entity and stores the observations, cleans up the flatten result unless told not to."""
+        entity, requests, config, res = prepared.entity, prepared.requests, prepared.config, prepared.flatten
+        analysis_res = res
+        try:
+            analysis_res = await self.get_digests(res, requests, config)
+        except Exception as e:
+            _log.exception(s_("Chunk digests failed, analyzing raw chunks."), exc_info=e)
+
+        async def analyze(request: ObservationRequest) -> bool:
+            try:
+                prompts_prefix = request.prompt_prefix
+                key = request.key
+                analyzer = self.get_analyzer(prompts_prefix, config)
+                content = await analyzer.analyze_flatten(analysis_res)
+                await self.store_observation(Observation(key=key, content=content))
+                return True
+            except Exception as e:
+                _log.exception(s_("Analysis failed.", request=request), exc_info=e)
+                return False
+
         try:
-            for request in requests:
-                try:
-                    prompts_prefix = request.prompt_prefix
-                    key = request.key
-                    analyzer = TokenizedAnalyzer(prompts_prefix=prompts_prefix, analysis=self.analysis, prompts=self.prompts)
-                    content = await analyzer.analyze_flatten(res)
-                    await self.observations.store(Observation(key=key, content=content))
-                except Exception as e:
-                    _log.exception(s_("Analysis failed.", request=request), exc_info=e)
+            # Analyzers only read the flatten result, so they can share it.
+            max_analyzers = config.analysis.max_concurrent_analyzers or _DEFAULT_MAX_CONCURRENT_ANALYZERS
+            succeeded = await gather_limited([analyze(r) for r in requests], max_analyzers)
+            processed = [r for r, ok in zip(requests, succeeded) if ok]
+            if len(processed) > 0:
+                await self.on_processed(entity, processed, res, config)
         finally:
+            if analysis_res is not res:
+                analysis_res.close()
             if clean:
-                res.clean_up()
+                res.close()
+
+    async def store_observation(self, observation: Observation):
+        STAGE_BYTES.observe(len(observation.content.encode("utf-8")), stage="store")
+        with STAGE_DURATION.timer(stage="store"):
+            await self.observations.store(observation)
 
     @abstractmethod
     async def get_flatten(self, entity: E, config: GlobalConfig) -> FlattenResult:
         pass
+
+    async def get_digests(
+            self, res: FlattenResult, requests: List[ObservationRequest], config: GlobalConfig,
+    ) -> FlattenResult:
+        """Replaces chunks with shared digests when enabled and more than one analyzer reads them."""
+        prompt_name = config.analysis.chunk_digest_prompt
+        if len(prompt_name) == 0 or len(res.file_paths) == 0 or len(requests) < 2:
+            return res
+        digester = ChunkDigester(
+            analysis=self.analysis,
+            prompts=self.prompts,
+            prompt_name=prompt_name,
+            max_concurrency=config.analysis.max_concurrent_requests or _DEFAULT_MAX_CONCURRENT_REQUESTS,
+        )
+        return await digester.digest(res)
+
+    def get_analyzer(self, prompts_prefix: str, config: GlobalConfig) -> TokenizedAnalyzer:
+        return TokenizedAnalyzer(
+            prompts_prefix=prompts_prefix,
+            analysis=self.analysis,
+            prompts=self.prompts,
+            tokenizer=self.tokenizer,
+            max_combine_tokens=config.analysis.max_combine_tokens,
+            max_concurrency=config.analysis.max_concurrent_requests or _DEFAULT_MAX_CONCURRENT_REQUESTS,
+        )
+
+    async def process_incremental(
+            self, entity: E, requests: List[ObservationRequest], config: GlobalConfig,
+    ) -> List[ObservationRequest]:
+        """Updates observations without a full analysis where possible.
+
+        Returns requests that still need a full analysis.
+        """
+        return requests
+
+    async def on_processed(
+            self, entity: E, requests: List[ObservationRequest], res: FlattenResult, config: GlobalConfig,
+    ):
+        """Called with requests whose observations were stored from the flatten result."""
+        pass
@@ -1,77 +1,469 @@
 import asyncio
+import dataclasses
 import logging
-from datetime import timedelta
-from typing import List, Optional
+import os
+import random
+import socket
+import uuid
+from datetime import timedelta, datetime
+from typing import List, Optional, Dict, Awaitable, TypeVar
 
 from dev_observer.api.types.observations_pb2 import ObservationKey
-from dev_observer.api.types.processing_pb2 import ProcessingItem
+from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey, ProcessingLaneStatus
 from dev_observer.log import s_
-from dev_observer.processors.flattening import ObservationRequest
+from dev_observer.metrics import REGISTRY, ITEMS_PROCESSED, BUSY_WORKERS, PREFETCHED_ITEMS
+from dev_observer.processors.flattening import ObservationRequest, FlatteningProcessor, PreparedAnalysis
 from dev_observer.processors.repos import ReposProcessor
 from dev_observer.repository.types import ObservedRepo
 from dev_observer.processors.websites import WebsitesProcessor, ObservedWebsite
+from dev_observer.storage.config_cache import GlobalConfigCache
 from dev_observer.storage.provider import StorageProvider
 from dev_observer.util import Clock, RealClock
 from dev_observer.website.cloner import normalize_domain, normalize_name
 
 _log = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Lane name to the entity type of items it processes.
+_LANES: Dict[str, str] = {
+    "repos": "github_repo_id",
+    "websites": "website_url",
+}
+
+# Longer failure reasons are truncated before they are stored.
+_MAX_ERROR_LEN = 2000
+# Shortest wait of an idle worker, keeps workers from spinning on items that are due but can't be claimed yet.
+_MIN_IDLE_SEC = 0.1
+
+
+@dataclasses.dataclass
+class _Worker:
+    lane: str
+    # Key of the item being processed, None while idle.
+    item: Optional[ProcessingItemKey] = None
+
+
+@dataclasses.dataclass
+class PreparedItem:
+    """Item flattened by `PeriodicProcessor._prepare_item`, waiting for `_analyze_item`."""
+    processor: FlatteningProcessor
+    analysis: PreparedAnalysis
+
+
+@dataclasses.dataclass
+class _Claim:
+    item: ProcessingItem
+    heartbeat: Optional[asyncio.Task] = None
+    # Stage running for the item, cancelled when the lease is lost.
+    stage: Optional[asyncio.Task] = None
+    lost: bool = False
+    prepared: Optional[PreparedItem] = None
+
+
+@dataclasses.dataclass
+class _Lane:
+    # Claimed items flattened ahead, waiting for a free worker.
+    ready: asyncio.Queue
+    # Bounds items claimed ahead of workers, taken before claiming and returned once a worker takes the item.
+    slots: asyncio.Semaphore
+
+
+class _LeaseLost(Exception):
+    pass
+
+
 class PeriodicProcessor:
+    """Processes due items with a pool of workers.
+
+    Repos and websites are processed in separate lanes, each with its own workers, so slow website crawls
+    don't hold up repo analysis and the other way round.
+
+    Items are claimed with a lease that is renewed while the item is processed, so processors on several
+    nodes can share the storage without processing the same item twice. Items of a crashed processor are
+    picked up again once their lease expires.
+
+    Idle workers sleep until the next item is due and are woken up right away when items are scheduled.
+
+    Processed items are scheduled again after the processing interval from the global config. Each next time is
+    shifted randomly by up to `interval_jitter / 2` of the interval, so items scanned at the same time, e.g. by a
+    bulk rescan, spread out over the following scans.
+
+    Failed items are retried with exponential backoff and quarantined after `max_failures` failures in a row,
+    until they are scheduled again explicitly.
+
+    With `prefetch` above 0, items are cloned and flattened ahead by separate tasks while workers wait on the
+    analysis of previous items. Up to `prefetch` items per lane are claimed ahead, their leases are renewed
+    while they wait for a worker.
+
+    `stop` drains the processor: no new items are claimed, items being processed are finished and items
+    flattened ahead are given up for other processors.
+    """
     _storage: StorageProvider
+    _config: GlobalConfigCache
     _repos_processor: ReposProcessor
     _websites_processor: Optional[WebsitesProcessor]
     _clock: Clock
+    _workers: List[_Worker]
+    _max_idle_sec: float
+    _owner: str
+    _lease: timedelta
+    _wake: asyncio.Event
+    _interval_jitter: float
+    _retry_backoff_sec: float
+    _max_retry_backoff_sec: float
+    _max_failures: int
+    _prefetch: int
+    _lanes: Dict[str, _Lane]
+    _stopping: bool
 
     def __init__(self,
                  storage: StorageProvider,
                  repos_processor: ReposProcessor,
                  websites_processor: Optional[WebsitesProcessor] = None,
                  clock: Clock = RealClock(),
+                 repo_workers: int = 1,
+                 website_workers: int = 1,
+                 max_idle_sec: float = 60,
+                 lease_sec: float = 120,
+                 interval_jitter: float = 0.2,
+                 retry_backoff_sec: float = 300,
+                 max_retry_backoff_sec: float = 24 * 3600,
+                 max_failures: int = 5,
+                 config: Optional[GlobalConfigCache] = None,
+                 prefetch: int = 0,
                  ):
         self._storage = storage
+        self._config = config if config is not None else GlobalConfigCache(storage, clock=clock)
         self._repos_processor = repos_processor
         self._websites_processor = websites_processor
         self._clock = clock
+        self._workers = [_Worker(lane="repos") for _ in range(max(repo_workers, 1))]
+        self._workers.extend(_Worker(lane="websites") for _ in range(max(website_workers, 1)))
+        self._max_idle_sec = max_idle_sec
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lease = timedelta(seconds=lease_sec)
+        self._wake = asyncio.Event()
+        self._interval_jitter = min(max(interval_jitter, 0.0), 1.0)
+        self._retry_backoff_sec = retry_backoff_sec
+        self._max_retry_backoff_sec = max_retry_backoff_sec
+        self._max_failures = max_failures
+        self._prefetch = max(prefetch, 0)
+        self._lanes = {}
+        self._stopping = False
 
     async def run(self):
-        # TODO: add proper background processing
-        _log.info("Starting periodic processor")
+        """Processes items until cancelled, or until stopped and items being processed are done."""
+        _log.info(s_(
+            "Starting periodic processor", workers=len(self._workers), prefetch=self._prefetch, owner=self._owner,
+        ))
+        listeners = [asyncio.create_task(self._listen()), asyncio.create_task(self._config.listen())]
+        prefetchers: List[asyncio.Task] = []
+        REGISTRY.add_collector(self._collect_metrics)
+        try:
+            if self._prefetch == 0:
+                await asyncio.gather(*[self._run_worker(w) for w in self._workers])
+                return
+            self._lanes = {w.lane: _Lane(ready=asyncio.Queue(), slots=asyncio.Semaphore(self._prefetch))
+                           for w in self._workers}
+            for name, lane in self._lanes.items():
+                prefetchers.extend(asyncio.create_task(self._run_prefetcher(name, lane)) for _ in range(self._prefetch))
+            await asyncio.gather(*[self._run_analyzer(w, self._lanes[w.lane]) for w in self._workers])
+        finally:
+            REGISTRY.remove_collector(self._collect_metrics)
+            for task in listeners + prefetchers:
+                task.cancel()
+            for lane in self._lanes.values():
+                while not lane.ready.empty():
+                    claim = lane.ready.get_nowait()
+                    if claim is not None:
+                        await self._abandon(claim)
+        _log.info(s_("Periodic processor stopped", owner=self._owner))
+
+    def stop(self):
+        """Stops claiming new items, `run` returns once items being processed are done.
+
+        Must be called from the event loop `run` runs in.
+        """
+        if self._stopping:
+            return
+        _log.info(s_("Stopping periodic processor", owner=self._owner))
+        self._stopping = True
+        self._wake_up()
+        for w in self._workers:
+            lane = self._lanes.get(w.lane)
+            if lane is not None:
+                # Tells one worker of the lane to exit once items queued before are given up.
+                lane.ready.put_nowait(None)
+
+    async def process_next(self, entity_type: Optional[str] = None) -> Optional[ProcessingItem]:
+        item = await self._claim_next(entity_type)
+        if item is None:
+            return None
+        await self._process_claimed(item)
+        return item
+
+    def get_status(self) -> List[ProcessingLaneStatus]:
+        """Returns occupancy of workers per lane."""
+        lanes: Dict[str, ProcessingLaneStatus] = {}
+        for w in self._workers:
+            status = lanes.setdefault(w.lane, ProcessingLaneStatus(name=w.lane))
+            status.workers += 1
+            # Read once, the worker may finish the item concurrently.
+            item = w.item
+            if item is not None:
+                status.items.append(item)
+        return list(lanes.values())
+
+    async def _run_worker(self, worker: _Worker):
+        entity_type = _LANES[worker.lane]
+        while not self._stopping:
+            # Taken before claiming, so items scheduled after an empty claim still wake the worker.
+            wake = self._wake
+            item: Optional[ProcessingItem] = None
+            try:
+                item = await self._claim_next(entity_type)
+                if item is not None:
+                    worker.item = item.key
+                    await self._process_claimed(item)
+            except Exception as e:
+                _log.error(s_("Failed to process next item", lane=worker.lane), exc_info=e)
+            finally:
+                worker.item = None
+            if item is None:
+                await self._wait(wake, entity_type)
+
+    async def _run_prefetcher(self, lane_name: str, lane: _Lane):
+        entity_type = _LANES[lane_name]
+        while not self._stopping:
+            await lane.slots.acquire()
+            if self._stopping:
+                return
+            wake = self._wake
+            item: Optional[ProcessingItem] = None
+            claim: Optional[_Claim] = None
+            try:
+                item = await self._claim_next(entity_type)
+                if item is not None:
+                    claim = await self._prefetch_claimed(item)
+            except Exception as e:
+                _log.error(s_("Failed to prefetch next item", lane=lane_name), exc_info=e)
+            if claim is not None:
+                lane.ready.put_nowait(claim)
+                continue
+            lane.slots.release()
+            if item is None:
+                await self._wait(wake, entity_type)
+
+    async def _run_analyzer(self, worker: _Worker, lane: _Lane):
         while True:
+            claim: Optional[_Claim] = await lane.ready.get()
+            if claim is None:
+                return
+            lane.slots.release()
+            if self._stopping:
+                await self._abandon(claim)
+                continue
+            worker.item = claim.item.key
             try:
-                await self.process_next()
+                await self._analyze_claimed(claim)
             except Exception as e:
-                _log.error(s_("Failed to process next item"), exc_info=e)
-            await asyncio.sleep(5)
+                _log.error(s_("Failed to analyze prefetched item", lane=worker.lane), exc_info=e)
+            finally:
+                worker.item = None
 
-    async def process_next(self) -> Optional[ProcessingItem]:
-        item = await self._storage.next_processing_item()
-        if item is None:
-            return None
-        _log.info(s_("Processing item", item=item))
-        retry_time = self._clock.now() + timedelta(minutes=30)
-        # prevent from running again right away.
-        await self._storage.set_next_processing_time(item.key, retry_time)
-        await self._process_item(item)
+    async def _wait(self, wake: asyncio.Event, entity_type: str):
+        timeout = self._max_idle_sec
+        try:
+            due = await self._storage.next_processing_due(entity_type)
+            if due is not None:
+                timeout = min(timeout, (due - self._clock.now()).total_seconds())
+        except Exception as e:
+            _log.warning(s_("Failed to get next processing time", entity_type=entity_type, error=str(e)))
+        try:
+            await asyncio.wait_for(wake.wait(), max(timeout, _MIN_IDLE_SEC))
+        except asyncio.TimeoutError:
+            pass
+
+    async def _listen(self):
+        loop = asyncio.get_running_loop()
+
+        def on_change():
+            # Changes made through other storage instances are reported from their threads.
+            loop.call_soon_threadsafe(self._wake_up)
+
+        try:
+            await self._storage.listen_processing_changes(on_change)
+        except Exception as e:
+            _log.error(s_("Stopped listening for processing changes, workers wake up on schedule only"), exc_info=e)
+
+    def _collect_metrics(self):
+        # Called from the thread rendering metrics, reads are racy but each value is consistent on its own.
+        for status in self.get_status():
+            BUSY_WORKERS.set(len(status.items), lane=status.name)
+        for name, lane in list(self._lanes.items()):
+            PREFETCHED_ITEMS.set(lane.ready.qsize(), lane=name)
+
+    def _wake_up(self):
+        # Wakes up all workers waiting on the current event, the next waits use a new one.
+        self._wake.set()
+        self._wake = asyncio.Event()
+
+    async def _claim_next(self, entity_type: Optional[str]) -> Optional[ProcessingItem]:
+        item = await self._storage.claim_processing_item(self._owner, self._lease, entity_type)
+        if item is not None:
+            _log.info(s_("Processing item", item=item))
         return item
 
+    async def _process_claimed(self, item: ProcessingItem):
+        claim = self._hold(item)
+        try:
+            await self._run_stage(claim, self._process_item(item))
+        except _LeaseLost:
+            return
+        except Exception as e:
+            await self._release_failed(item, e)
+            raise
+        finally:
+            claim.heartbeat.cancel()
+        await self._release_processed(item)
+
+    async def _prefetch_claimed(self, item: ProcessingItem) -> Optional[_Claim]:
+        """Prepares a claimed item for analysis, returns None if there is nothing to analyze."""
+        claim = self._hold(item)
+        try:
+            claim.prepared = await self._run_stage(claim, self._prepare_item(item))
+        except _LeaseLost:
+            return None
+        except Exception as e:
+            claim.heartbeat.cancel()
+            await self._release_failed(item, e)
+            raise
+        except BaseException:
+            claim.heartbeat.cancel()
+            raise
+        if claim.prepared is None:
+            claim.heartbeat.cancel()
+            await self._release_processed(item)
+            return None
+        return claim
+
+    async def _analyze_claimed(self, claim: _Claim):
+        try:
+            if claim.lost:
+                _log.warning(s_("Processing lease lost while waiting for analysis", key=claim.item.key))
+                claim.prepared.analysis.clean_up()
+                return
+            await self._run_stage(claim, self._analyze_item(claim.prepared))
+        except _LeaseLost:
+            return
+        except Exception as e:
+            await self._release_failed(claim.item, e)
+            raise
+        finally:
+            claim.heartbeat.cancel()
+        await self._release_processed(claim.item)
+
+    def _hold(self, item: ProcessingItem) -> _Claim:
+        claim = _Claim(item=item)
+        claim.heartbeat = asyncio.create_task(self._heartbeat(claim))
+        return claim
+
+    async def _abandon(self, claim: _Claim):
+        """Gives up a claimed item without processing it, so other processors can claim it right away."""
+        claim.heartbeat.cancel()
+        if claim.prepared is not None:
+            claim.prepared.analysis.clean_up()
+        try:
+            await self._storage.renew_processing_lease(claim.item.key, self._owner, timedelta(0))
+        except Exception as e:
+            # The item is picked up again once the lease expires.
+            _log.warning(s_("Failed to give up processing lease", key=claim.item.key, error=str(e)))
+
+    @staticmethod
+    async def _run_stage(claim: _Claim, stage: Awaitable[T]) -> T:
+        claim.stage = asyncio.ensure_future(stage)
+        try:
+            return await claim.stage
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling() > 0 or not claim.lost:
+                raise
+            # Stopped by the heartbeat, the item may be processed by another owner already.
+            raise _LeaseLost()
+        finally:
+            claim.stage = None
+
+    async def _release_processed(self, item: ProcessingItem):
+        ITEMS_PROCESSED.inc(entity_type=item.key.WhichOneof("entity"), outcome="success")
+        await self._storage.release_processing_item(item.key, self._owner, await self._next_scan_time(item.key))
+
+    async def _release_failed(self, item: ProcessingItem, e: Exception):
+        ITEMS_PROCESSED.inc(entity_type=item.key.WhichOneof("entity"), outcome="failure")
+        failures = item.failures + 1
+        error = f"{type(e).__name__}: {e}"[:_MAX_ERROR_LEN]
+        if 0 < self._max_failures <= failures:
+            _log.error(s_("Item keeps failing, quarantining", key=item.key, failures=failures, error=error))
+            await self._storage.release_processing_item(item.key, self._owner, None, error=error, quarantine=True)
+            return
+        delay = min(self._retry_backoff_sec * (2 ** (failures - 1)), self._max_retry_backoff_sec)
+        _log.warning(s_("Item failed, retrying later", key=item.key, failures=failures, delay_sec=delay))
+        next_time = self._clock.now() + timedelta(seconds=delay)
+        await self._storage.release_processing_item(item.key, self._owner, next_time, error=error)
+
+    async def _next_scan_time(self, key: ProcessingItemKey) -> Optional[datetime]:
+        config = await self._config.get()
+        if key.WhichOneof("entity") == "website_url":
+            interval = config.website_crawling.processing_interval_sec
+        else:
+            interval = config.repo_analysis.processing_interval_sec
+        if interval <= 0:
+            return None
+        delay = interval * (1 + self._interval_jitter * (random.random() - 0.5))
+        return self._clock.now() + timedelta(seconds=delay)
+
+    async def _heartbeat(self, claim: _Claim):
+        key = claim.item.key
+        while True:
+            await asyncio.sleep(self._lease.total_seconds() / 3)
+            try:
+                renewed = await self._storage.renew_processing_lease(key, self._owner, self._lease)
+            except Exception as e:
+                # The lease is still valid for a while, try again on the next beat.
+                _log.warning(s_("Failed to renew processing lease", key=key, error=str(e)))
+                continue
+            if not renewed:
+                _log.warning(s_("Processing lease lost, stopping", key=key, owner=self._owner))
+                claim.lost = True
+                if claim.stage is not None:
+                    claim.stage.cancel()
+                return
+
     async def _process_item(self, item: ProcessingItem):
+        prepared = await self._prepare_item(item)
+        if prepared is not None:
+            await self._analyze_item(prepared)
+
+    async def _prepare_item(self, item: ProcessingItem) -> Optional[PreparedItem]:
         ent_type = item.key.WhichOneof("entity")
         if ent_type == "github_repo_id":
-            await self._process_github_repo(item.key.github_repo_id)
+            return await self._prepare_github_repo(item.key.github_repo_id)
         elif ent_type == "website_url":
             if self._websites_processor is None:
                 _log.error(s_("Website processor is not configured", url=item.key.website_url))
                 raise ValueError(f"Website processor is not configured")
-            await self._process_website(item.key.website_url)
+            return await self._prepare_website(item.key.website_url)
         else:
             raise ValueError(f"[{ent_type}] is not supported")
-        await self._storage.set_next_processing_time(item.key, None)
 
-    async def _process_github_repo(self, repo_id: str):
-        config = await self._storage.get_global_config()
+    async def _analyze_item(self, prepared: PreparedItem):
+        await prepared.processor.analyze_prepared(prepared.analysis)
+        _log.debug(s_("Item processed", entity=prepared.analysis.entity))
+
+    async def _prepare_github_repo(self, repo_id: str) -> Optional[PreparedItem]:
+        config = await self._config.get()
         if config.HasField("repo_analysis") and config.repo_analysis.disabled:
             _log.warning(s_("Repo analysis disabled"))
-            return
+            return None
 
         repo = await self._storage.get_github_repo(repo_id)
         if repo is None:
@@ -87,14 +479,14 @@ class PeriodicProcessor:
             ))
         if len(requests) == 0:
             _log.debug(s_("No analyzers configured, skipping", repo=repo))
-            return
-        await self._repos_processor.process(ObservedRepo(url=repo.url, github_repo=repo), requests, config)
-        _log.debug(s_("Github repo processed", repo=repo))
+            return None
+        analysis = await self._repos_processor.prepare(ObservedRepo(url=repo.url, github_repo=repo), requests, config)
+        return PreparedItem(processor=self._repos_processor, analysis=analysis) if analysis is not None else None
 
-    async def _process_website(self, website_url: str):
+    async def _prepare_website(self, website_url: str) -> Optional[PreparedItem]:
         _log.debug(s_("Processing website", url=website_url))
         requests: List[ObservationRequest] = []
-        config = await self._storage.get_global_config()
+        config = await self._config.get()
 
         for analyzer in config.analysis.site_analyzers:
             domain = normalize_domain(website_url)
@@ -108,7 +500,7 @@ class PeriodicProcessor:
 
         if len(requests) == 0:
             _log.debug(s_("No analyzers configured, skipping", url=website_url))
-            return
+            return None
 
-        await self._websites_processor.process(ObservedWebsite(url=website_url), requests, config)
-        _log.debug(s_("Website processed", url=website_url))
+        analysis = await self._websites_processor.prepare(ObservedWebsite(url=website_url), requests, config)
+        return PreparedItem(processor=self._websites_processor, analysis=analysis) if analysis is not None else None
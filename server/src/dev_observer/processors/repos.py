@@ -1,17 +1,38 @@
+import hashlib
+import logging
+import re
+from typing import Optional, List, Dict
+
 from dev_observer.analysis.provider import AnalysisProvider
 from dev_observer.api.types.config_pb2 import GlobalConfig
+from dev_observer.api.types.observations_pb2 import Observation
+from dev_observer.api.types.repo_pb2 import GitProperties, ObservedCommit
+from dev_observer.flatten.cache import FlattenCache
 from dev_observer.flatten.flatten import flatten_repository, FlattenResult
+from dev_observer.flatten.ignore import IgnoreRules, DEFAULT_IGNORE_PATTERNS, split_patterns, repo_ignore_pattern, \
+    is_large_repo
+from dev_observer.log import s_
 from dev_observer.observations.provider import ObservationsProvider
-from dev_observer.processors.flattening import FlatteningProcessor
+from dev_observer.processors.flattening import FlatteningProcessor, ObservationRequest
 from dev_observer.prompts.provider import PromptsProvider
-from dev_observer.repository.provider import GitRepositoryProvider
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
 from dev_observer.repository.types import ObservedRepo
+from dev_observer.storage.provider import StorageProvider
 from dev_observer.tokenizer.provider import TokenizerProvider
 
+_log = logging.getLogger(__name__)
+
+_DEFAULT_MAX_DIFF_TOKENS = 20_000
+# Prompts that shape the result of a full analysis. The update prompt is left out, it only applies changes.
+_FINGERPRINT_PROMPTS = ("analyze_full", "analyze_chunk", "analyze_combined_chunks")
+_DIFF_HEADER = re.compile(r"^diff --git a/(.*) b/(.*)$", re.MULTILINE)
+
 
 class ReposProcessor(FlatteningProcessor[ObservedRepo]):
     repository: GitRepositoryProvider
     tokenizer: TokenizerProvider
+    flatten_cache: Optional[FlattenCache]
+    storage: Optional[StorageProvider]
 
     def __init__(
             self,
@@ -20,11 +41,192 @@ class ReposProcessor(FlatteningProcessor[ObservedRepo]):
             prompts: PromptsProvider,
             observations: ObservationsProvider,
             tokenizer: TokenizerProvider,
+            flatten_cache: Optional[FlattenCache] = None,
+            storage: Optional[StorageProvider] = None,
     ):
-        super().__init__(analysis, prompts, observations)
+        super().__init__(analysis, prompts, observations, tokenizer)
         self.repository = repository
-        self.tokenizer = tokenizer
+        self.flatten_cache = flatten_cache
+        self.storage = storage
 
     async def get_flatten(self, repo: ObservedRepo, config: GlobalConfig) -> FlattenResult:
-        res = await flatten_repository(repo, self.repository, self.tokenizer, config)
+        res = await flatten_repository(repo, self.repository, self.tokenizer, config, self.flatten_cache)
         return res.flatten_result
+
+    async def process_incremental(
+            self, repo: ObservedRepo, requests: List[ObservationRequest], config: GlobalConfig,
+    ) -> List[ObservationRequest]:
+        if not config.repo_analysis.incremental or self.storage is None:
+            return requests
+        observed = _observed_commits(repo)
+        if not any(r.key.key in observed for r in requests):
+            return requests
+        info = await self.repository.get_repo(repo)
+        head = await self.repository.get_head_commit(repo, info)
+        if head is None or len(head) == 0:
+            return requests
+
+        max_tokens = config.repo_analysis.incremental_max_diff_tokens
+        if max_tokens <= 0:
+            max_tokens = _DEFAULT_MAX_DIFF_TOKENS
+        diffs: Dict[str, Optional[str]] = {}
+        fingerprints: Dict[str, str] = {}
+        can_update: Dict[str, bool] = {}
+        full: List[ObservationRequest] = []
+        updated: Dict[str, ObservedCommit] = {}
+        for request in requests:
+            base = observed.get(request.key.key)
+            if base is None:
+                full.append(request)
+                continue
+            prefix = request.prompt_prefix
+            if prefix not in fingerprints:
+                fingerprints[prefix] = await self._analyzer_fingerprint(prefix, config)
+            if base.analyzer_fingerprint != fingerprints[prefix]:
+                _log.debug(s_("Prompts or flatten config changed since the last analysis", key=request.key))
+                full.append(request)
+                continue
+            if base.commit == head:
+                _log.debug(s_("Observation is up to date", key=request.key, commit=head))
+                continue
+            if prefix not in can_update:
+                can_update[prefix] = await self._has_update_prompt(prefix)
+            if not can_update[prefix]:
+                full.append(request)
+                continue
+            try:
+                if base.commit not in diffs:
+                    diffs[base.commit] = await self._get_diff(repo, info, base.commit, head, max_tokens, config)
+                diff = diffs[base.commit]
+                if diff is None:
+                    full.append(request)
+                    continue
+                if len(diff.strip()) == 0:
+                    # Only ignored files changed, the observation still describes the repository.
+                    _log.debug(s_("No relevant changes", key=request.key, commit=head))
+                    updated[request.key.key] = ObservedCommit(
+                        observation_key=request.key.key, commit=head, analyzer_fingerprint=fingerprints[prefix],
+                    )
+                    continue
+                previous = await self.observations.get(request.key)
+                analyzer = self.get_analyzer(prefix, config)
+                content = await analyzer.analyze_update(previous.content, diff, repo.url)
+                await self.store_observation(Observation(key=request.key, content=content))
+                updated[request.key.key] = ObservedCommit(
+                    observation_key=request.key.key, commit=head, analyzer_fingerprint=fingerprints[prefix],
+                )
+            except Exception as e:
+                _log.exception(s_("Incremental analysis failed, running full analysis.", request=request), exc_info=e)
+                full.append(request)
+        if len(updated) > 0:
+            await self._record_commits(repo, updated)
+        _log.debug(s_("Incremental analysis done", repo=repo.url, updated=len(updated), full=len(full)))
+        return full
+
+    async def on_processed(
+            self, repo: ObservedRepo, requests: List[ObservationRequest], res: FlattenResult, config: GlobalConfig,
+    ):
+        if self.storage is None or res.commit is None:
+            return
+        try:
+            fingerprints: Dict[str, str] = {}
+            commits: Dict[str, ObservedCommit] = {}
+            for r in requests:
+                if r.prompt_prefix not in fingerprints:
+                    fingerprints[r.prompt_prefix] = await self._analyzer_fingerprint(r.prompt_prefix, config)
+                commits[r.key.key] = ObservedCommit(
+                    observation_key=r.key.key, commit=res.commit, analyzer_fingerprint=fingerprints[r.prompt_prefix],
+                )
+            await self._record_commits(repo, commits)
+        except Exception as e:
+            _log.exception(s_("Failed to record observed commits", repo=repo.url), exc_info=e)
+
+    async def _analyzer_fingerprint(self, prompt_prefix: str, config: GlobalConfig) -> str:
+        """Identifies what a full analysis with the prefix would be produced from, besides the content."""
+        h = hashlib.sha256()
+        h.update(config.repo_analysis.flatten.SerializeToString(deterministic=True))
+        h.update(config.analysis.chunk_digest_prompt.encode("utf-8"))
+        for suffix in _FINGERPRINT_PROMPTS:
+            try:
+                prompt = await self.prompts.get_formatted(f"{prompt_prefix}_{suffix}")
+            except Exception as e:
+                # Chunk prompts are optional for repos that always fit into a single chunk.
+                _log.debug(s_("Prompt is not available", prompt=f"{prompt_prefix}_{suffix}", error=e))
+                h.update(b"\0")
+                continue
+            for part in (prompt.system, prompt.user, prompt.config):
+                h.update(b"\0")
+                if part is not None:
+                    h.update(part.SerializeToString(deterministic=True))
+        return h.hexdigest()[:16]
+
+    async def _has_update_prompt(self, prompt_prefix: str) -> bool:
+        try:
+            await self.prompts.get_formatted(f"{prompt_prefix}_analyze_update")
+            return True
+        except Exception as e:
+            _log.debug(s_("No update prompt, running full analysis", prefix=prompt_prefix, error=e))
+            return False
+
+    async def _get_diff(
+            self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str, max_tokens: int,
+            config: GlobalConfig,
+    ) -> Optional[str]:
+        diff = await self.repository.get_diff(repo, info, base, head)
+        if diff is None:
+            _log.debug(s_("Diff is not available", repo=repo.url, base=base, head=head))
+            return None
+        # Files left out of the flattened repository are left out of the diff too.
+        flatten_config = config.repo_analysis.flatten
+        rules = IgnoreRules()
+        rules.add_all(DEFAULT_IGNORE_PATTERNS)
+        rules.add_all(split_patterns(repo_ignore_pattern(flatten_config, is_large_repo(flatten_config, info.size_kb))))
+        diff = filter_diff(diff, rules)
+        tokens = self.tokenizer.count_tokens(diff)
+        if tokens > max_tokens:
+            _log.debug(s_("Diff is too large", repo=repo.url, tokens=tokens, max_tokens=max_tokens))
+            return None
+        return diff
+
+    async def _record_commits(self, repo: ObservedRepo, commits: Dict[str, ObservedCommit]):
+        # Re-read the repo, properties could have been updated since processing started.
+        stored = await self.storage.get_github_repo(repo.github_repo.id)
+        if stored is None:
+            return
+        properties = GitProperties()
+        properties.CopyFrom(stored.properties)
+        remaining = dict(commits)
+        for oc in properties.observed_commits:
+            if oc.observation_key in remaining:
+                oc.CopyFrom(remaining.pop(oc.observation_key))
+        properties.observed_commits.extend(remaining.values())
+        repo.github_repo = await self.storage.update_repo_properties(stored.id, properties)
+
+
+def filter_diff(diff: str, rules: IgnoreRules) -> str:
+    """Removes sections of a unified git diff for files ignored by the rules."""
+    headers = list(_DIFF_HEADER.finditer(diff))
+    if len(headers) == 0:
+        return diff
+    parts: List[str] = [diff[:headers[0].start()]]
+    for i, header in enumerate(headers):
+        end = headers[i + 1].start() if i + 1 < len(headers) else len(diff)
+        old_path, new_path = header.group(1), header.group(2)
+        if _is_path_ignored(new_path, rules) and _is_path_ignored(old_path, rules):
+            continue
+        parts.append(diff[header.start():end])
+    return "".join(parts)
+
+
+
+def _is_path_ignored(path: str, rules: IgnoreRules) -> bool:
+    # Like the flattener walking the tree, a file in an ignored directory is ignored.
+    parts = path.split("/")
+    for i in range(1, len(parts)):
+        if rules.is_ignored("/".join(parts[:i]), True):
+            return True
+    return rules.is_ignored(path, False)
+
+
+def _observed_commits(repo: ObservedRepo) -> Dict[str, ObservedCommit]:
+    return {oc.observation_key: oc for oc in repo.github_repo.properties.observed_commits}
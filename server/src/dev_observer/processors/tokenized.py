@@ -1,59 +1,151 @@
+import asyncio
 import logging
 from datetime import date
-from typing import List
+from typing import List, Optional, TypeVar
 
-from dev_observer.analysis.provider import AnalysisProvider
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
 from dev_observer.flatten.flatten import FlattenResult
 from dev_observer.log import s_
-from dev_observer.prompts.provider import PromptsProvider
+from dev_observer.metrics import STAGE_DURATION, STAGE_BYTES, observe_llm_tokens
+from dev_observer.prompts.provider import PromptsProvider, FormattedPrompt
+from dev_observer.tokenizer.provider import TokenizerProvider
 
 _log = logging.getLogger(__name__)
 
+_SUMMARIES_SEPARATOR = "\n\n-------\n\n"
+
+T = TypeVar("T")
+
+
 class TokenizedAnalyzer:
     prompts_prefix: str
     analysis: AnalysisProvider
     prompts: PromptsProvider
+    tokenizer: Optional[TokenizerProvider]
+    max_combine_tokens: int
+    max_concurrency: int
+    _semaphore: asyncio.Semaphore
 
     def __init__(
             self,
             prompts_prefix: str,
             analysis: AnalysisProvider,
             prompts: PromptsProvider,
+            tokenizer: Optional[TokenizerProvider] = None,
+            max_combine_tokens: int = 0,
+            max_concurrency: int = 1,
     ):
+        """
+        Args:
+            max_combine_tokens: Budget for chunk summaries combined in one prompt, summaries that don't fit are
+                combined in groups first. Requires a tokenizer, 0 combines all summaries at once.
+            max_concurrency: Max LLM requests of this analyzer running at the same time. Rate limits of the provider
+                are handled by the provider, see `LimitingAnalysisProvider`.
+        """
         self.prompts_prefix = prompts_prefix
         self.analysis = analysis
         self.prompts = prompts
+        self.tokenizer = tokenizer
+        self.max_combine_tokens = max_combine_tokens
+        self.max_concurrency = max(max_concurrency, 1)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
 
     async def analyze_flatten(self, flatten_result: FlattenResult) -> str:
         session_id = f"{date.today().strftime("%Y-%m-%d")}.{flatten_result.full_file_path}"
         if len(flatten_result.file_paths) > 0:
             _log.debug(s_("Analyzing flatten (multiple)", files=flatten_result.file_paths))
-            return await self._analyze_tokenized(
-                flatten_result.file_paths, session_id)
+            return await self._analyze_tokenized(flatten_result, session_id)
         else:
             _log.debug(s_("Analyzing flatten (single)", file=flatten_result.full_file_path))
             return await self._analyze_file(
-                flatten_result.full_file_path, f"{self.prompts_prefix}_analyze_full", session_id)
-
-    async def _analyze_tokenized(self, paths: List[str], session_id: str) -> str:
-        summaries: List[str] = []
-        for p in paths:
-            s = await self._analyze_file(p, f"{self.prompts_prefix}_analyze_chunk", session_id)
-            summaries.append(s)
+                flatten_result, flatten_result.full_file_path, f"{self.prompts_prefix}_analyze_full", session_id)
 
-        summary = "\n\n-------\n\n".join(summaries)
-        prompt = await self.prompts.get_formatted(f"{self.prompts_prefix}_analyze_combined_chunks", {
-            "content": summary,
+    async def analyze_update(self, previous: str, diff: str, name: str) -> str:
+        """Updates a previous analysis result with the changes described by the diff."""
+        session_id = f"{date.today().strftime("%Y-%m-%d")}.{name}"
+        prompt = await self.prompts.get_formatted(f"{self.prompts_prefix}_analyze_update", {
+            "content": diff,
+            "previous": previous,
         })
-        result = await self.analysis.analyze(prompt, session_id)
+        _log.debug(s_("Analyzing update", name=name, previous_len=len(previous), diff_len=len(diff)))
+        async with self._semaphore:
+            result = await _timed_analyze(self.analysis, prompt, session_id, "llm_update")
         return result.analysis
 
-    async def _analyze_file(self, path: str, prompt_name: str, session_id: str) -> str:
-        with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
-        prompt = await self.prompts.get_formatted(prompt_name, {
-            "content": content,
+    async def _analyze_tokenized(self, flatten_result: FlattenResult, session_id: str) -> str:
+        # Summaries keep the order of chunks, so groups combined below stay contiguous.
+        summaries: List[str] = list(await asyncio.gather(
+            *[self._analyze_file(flatten_result, p, f"{self.prompts_prefix}_analyze_chunk", session_id)
+              for p in flatten_result.file_paths]
+        ))
+
+        level = 0
+        while True:
+            groups = self._group_summaries(summaries)
+            if len(groups) <= 1:
+                break
+            if len(groups) == len(summaries):
+                _log.warning(s_("Chunk summaries can't be reduced further, combining all", summaries=len(summaries)))
+                break
+            level += 1
+            _log.debug(s_("Combining summaries in groups", level=level, summaries=len(summaries), groups=len(groups)))
+            summaries = list(await asyncio.gather(
+                *[self._combine(g, session_id) if len(g) > 1 else _value(g[0]) for g in groups]
+            ))
+        return await self._combine(summaries, session_id)
+
+    async def _combine(self, summaries: List[str], session_id: str) -> str:
+        prompt = await self.prompts.get_formatted(f"{self.prompts_prefix}_analyze_combined_chunks", {
+            "content": _SUMMARIES_SEPARATOR.join(summaries),
         })
-        _log.debug(s_("Analyzing file", path=path, content_len=len(content)))
-        result = await self.analysis.analyze(prompt, session_id)
+        async with self._semaphore:
+            result = await _timed_analyze(self.analysis, prompt, session_id, "llm_combine")
         return result.analysis
+
+    def _group_summaries(self, summaries: List[str]) -> List[List[str]]:
+        """Splits summaries into consecutive groups that fit into the combine token budget."""
+        if self.tokenizer is None or self.max_combine_tokens <= 0:
+            return [summaries]
+        separator_tokens = self.tokenizer.count_tokens(_SUMMARIES_SEPARATOR)
+        groups: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for s in summaries:
+            tokens = self.tokenizer.count_tokens(s) + separator_tokens
+            if len(current) > 0 and current_tokens + tokens > self.max_combine_tokens:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(s)
+            current_tokens += tokens
+        if len(current) > 0:
+            groups.append(current)
+        return groups
+
+    async def _analyze_file(self, flatten_result: FlattenResult, path: str, prompt_name: str, session_id: str) -> str:
+        stage = "llm_full" if path == flatten_result.full_file_path else "llm_chunk"
+
+        # Content is read once a slot is free, so at most `max_concurrency` chunks are formatted at a time.
+        async with self._semaphore:
+            content = flatten_result.read(path)
+            prompt = await self.prompts.get_formatted(prompt_name, {
+                "content": content,
+            })
+            _log.debug(s_("Analyzing file", path=path, content_len=len(content)))
+            STAGE_BYTES.observe(len(content.encode("utf-8")), stage=stage)
+            result = await _timed_analyze(self.analysis, prompt, session_id, stage)
+            return result.analysis
+
+
+async def _value(v: T) -> T:
+    return v
+
+
+async def _timed_analyze(
+        analysis: AnalysisProvider, prompt: FormattedPrompt, session_id: str, stage: str,
+) -> AnalysisResult:
+    # Timed inside the analyzer's slot. Waits and retries of a rate limited provider are included.
+    with STAGE_DURATION.timer(stage=stage):
+        result = await analysis.analyze(prompt, session_id)
+    observe_llm_tokens(stage, result.input_tokens, result.output_tokens)
+    return result
@@ -30,9 +30,8 @@ class WebsitesProcessor(FlatteningProcessor[ObservedWebsite]):
             observations: ObservationsProvider,
             tokenizer: TokenizerProvider,
     ):
-        super().__init__(analysis, prompts, observations)
+        super().__init__(analysis, prompts, observations, tokenizer)
         self.website_crawler = website_crawler
-        self.tokenizer = tokenizer
     
     async def get_flatten(self, website: ObservedWebsite, config: GlobalConfig):
         result = await flatten_website(website.url, self.website_crawler, self.tokenizer, config.website_crawling)
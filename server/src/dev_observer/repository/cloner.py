@@ -1,11 +1,14 @@
 import dataclasses
 import logging
 import tempfile
+from typing import Optional
 
 from dev_observer.api.types.config_pb2 import GlobalConfig
+from dev_observer.flatten.ignore import DEFAULT_IGNORE_PATTERNS, DEFAULT_MAX_FILE_SIZE, is_large_repo, \
+    repo_ignore_pattern, split_patterns
 from dev_observer.log import s_
 from dev_observer.repository.types import ObservedRepo
-from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
 
 _log = logging.getLogger(__name__)
 
@@ -34,6 +37,17 @@ async def clone_repository(
     temp_dir = tempfile.mkdtemp(prefix=f"git_repo_{info.name}")
     extra = {"repo": repo, "info": info, "dest": temp_dir}
     _log.debug(s_("Cloning...", **extra))
-    await provider.clone(repo, info, temp_dir)
+    await provider.clone(repo, info, temp_dir, _clone_options(config, info))
     _log.debug(s_("Cloned.", **extra))
     return CloneResult(path=temp_dir, repo=info)
+
+
+def _clone_options(config: GlobalConfig, info: RepositoryInfo) -> Optional[CloneOptions]:
+    flatten_config = config.repo_analysis.flatten
+    if not flatten_config.partial_clone:
+        return None
+    ignore = repo_ignore_pattern(flatten_config, is_large_repo(flatten_config, info.size_kb))
+    return CloneOptions(
+        max_blob_size=flatten_config.max_file_size_bytes or DEFAULT_MAX_FILE_SIZE,
+        exclude_patterns=DEFAULT_IGNORE_PATTERNS + split_patterns(ignore),
+    )
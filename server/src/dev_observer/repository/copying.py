@@ -1,9 +1,11 @@
 import os.path
-import subprocess
+from typing import Optional
 
 from dev_observer.repository.types import ObservedRepo
+from dev_observer.process import run_process
+from dev_observer.repository.local_git import get_head_commit, get_diff, get_git_root, has_uncommitted_changes
 from dev_observer.repository.parser import parse_github_url
-from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
 
 
 class CopyingGitRepositoryProvider(GitRepositoryProvider):
@@ -23,39 +25,22 @@ class CopyingGitRepositoryProvider(GitRepositoryProvider):
             size_kb=500,
         )
 
-    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str):
-        repo_root = _get_git_root()
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        repo_root = await get_git_root()
         if self._shallow:
-            subprocess.run(
-                ["cp", "-r", os.path.join(repo_root, ".git"), os.path.join(dest, ".git")],
-                capture_output=True,
-                text=True,
-                check=False
-            )
-            result = subprocess.run(
-                ["cp", os.path.join(repo_root, "README.md"), dest],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            await run_process(["cp", "-r", os.path.join(repo_root, ".git"), os.path.join(dest, ".git")])
+            result = await run_process(["cp", os.path.join(repo_root, "README.md"), dest])
         else:
-            result = subprocess.run(
-                ["cp", "-r", repo_root, dest],
-                capture_output=True,
-                text=True,
-                check=False
-            )
+            result = await run_process(["cp", "-r", repo_root, dest])
 
         if result.returncode != 0:
             raise RuntimeError(f"Failed to copy repository: {result.stderr}")
 
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        # Uncommitted changes are copied as well, so HEAD does not identify the content of a dirty working tree.
+        if await has_uncommitted_changes():
+            return None
+        return await get_head_commit()
 
-def _get_git_root() -> str:
-    result = subprocess.run(
-        ["git", "rev-parse", "--show-toplevel"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=True
-    )
-    return result.stdout.strip()
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        return await get_diff(base, head)
@@ -1,7 +1,9 @@
-import subprocess
+from typing import Optional
 
+from dev_observer.process import run_process
+from dev_observer.repository.local_git import get_head_commit, get_diff, get_git_root
 from dev_observer.repository.parser import parse_github_url
-from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
 from dev_observer.repository.types import ObservedRepo
 
 
@@ -16,25 +18,15 @@ class DelegatingGitRepositoryProvider(GitRepositoryProvider):
             size_kb=500,
         )
 
-    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str):
-        repo_root = _get_git_root()
-        result = subprocess.run(
-            ["git", "clone", repo_root, dest],
-            capture_output=True,
-            text=True,
-            check=False
-        )
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        repo_root = await get_git_root()
+        result = await run_process(["git", "clone", repo_root, dest])
 
         if result.returncode != 0:
             raise RuntimeError(f"Failed to clone repository: {result.stderr}")
 
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        return await get_head_commit()
 
-def _get_git_root() -> str:
-    result = subprocess.run(
-        ["git", "rev-parse", "--show-toplevel"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        check=True
-    )
-    return result.stdout.strip()
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        return await get_diff(base, head)
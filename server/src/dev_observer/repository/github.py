@@ -1,21 +1,29 @@
+import asyncio
 import logging
-import subprocess
 from abc import abstractmethod
 from datetime import datetime
-from typing import Protocol
+from typing import Protocol, Optional, List, Tuple
 
 from github import Auth
 from github import Github
+from github.File import File
 
 from dev_observer.api.types.repo_pb2 import GitProperties, GitMeta
+from dev_observer.log import s_
+from dev_observer.process import run_process
 from dev_observer.repository.types import ObservedRepo
 from dev_observer.repository.parser import parse_github_url
-from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo
+from dev_observer.repository.partial import partial_clone
+from dev_observer.repository.mirror import RepoMirrorStore
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
 from dev_observer.repository.util import get_valid_repo_meta
 from dev_observer.storage.provider import StorageProvider
 
 _log = logging.getLogger(__name__)
 
+# GitHub compare API does not return more files than this.
+_MAX_COMPARE_FILES = 300
+
 
 class GithubAuthProvider(Protocol):
     @abstractmethod
@@ -30,10 +38,17 @@ class GithubAuthProvider(Protocol):
 class GithubProvider(GitRepositoryProvider):
     _auth_provider: GithubAuthProvider
     _storage: StorageProvider
+    _mirror: Optional[RepoMirrorStore]
 
-    def __init__(self, auth_provider: GithubAuthProvider, storage: StorageProvider):
+    def __init__(
+            self,
+            auth_provider: GithubAuthProvider,
+            storage: StorageProvider,
+            mirror: Optional[RepoMirrorStore] = None,
+    ):
         self._auth_provider = auth_provider
         self._storage = storage
+        self._mirror = mirror
 
     async def get_repo(self, repo: ObservedRepo) -> RepositoryInfo:
         full_name = repo.github_repo.full_name
@@ -62,15 +77,55 @@ class GithubProvider(GitRepositoryProvider):
             size_kb=meta.size_kb,
         )
 
-    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str):
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
         token = await self._auth_provider.get_cli_token_prefix(repo)
         clone_url = info.clone_url.replace("https://", f"https://{token}@")
-        result = subprocess.run(
-            ["git", "clone", "--depth=1", clone_url, dest],
-            capture_output=True,
-            text=True,
-            check=False
-        )
+        if self._mirror is not None:
+            await self._mirror.checkout(repo.github_repo.full_name, clone_url, dest)
+            return
+        if options is not None and options.max_blob_size > 0:
+            await partial_clone(clone_url, dest, options)
+            return
+        result = await run_process(["git", "clone", "--depth=1", clone_url, dest])
 
         if result.returncode != 0:
             raise RuntimeError(f"Failed to clone repository: {result.stderr}")
+
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        token = await self._auth_provider.get_cli_token_prefix(repo)
+        clone_url = info.clone_url.replace("https://", f"https://{token}@")
+        result = await run_process(["git", "ls-remote", clone_url, "HEAD"])
+
+        if result.returncode != 0:
+            raise RuntimeError(f"Failed to resolve repository HEAD: {result.stderr}")
+        parts = result.stdout.split()
+        return parts[0] if len(parts) > 0 else None
+
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        auth = await self._auth_provider.get_auth(repo)
+        # PyGithub is blocking, fetching the comparison and its file pages is done off the event loop.
+        status, files = await asyncio.to_thread(_compare, auth, repo.github_repo.full_name, base, head)
+        if status not in ("ahead", "identical"):
+            # History was rewritten, diff does not describe the change.
+            _log.debug(s_("Base is not an ancestor of head", repo=repo.url, status=status))
+            return None
+        if len(files) >= _MAX_COMPARE_FILES:
+            _log.debug(s_("Too many changed files for diff", repo=repo.url, files=len(files)))
+            return None
+        parts: List[str] = []
+        for f in files:
+            if f.patch is None:
+                # Binary or too large to be included by GitHub.
+                return None
+            old_name = f.previous_filename or f.filename
+            parts.append(f"diff --git a/{old_name} b/{f.filename}\n--- a/{old_name}\n+++ b/{f.filename}\n{f.patch}\n")
+        return "".join(parts)
+
+
+def _compare(auth: Auth.Auth, full_name: str, base: str, head: str) -> Tuple[str, List[File]]:
+    with Github(auth=auth) as gh:
+        comparison = gh.get_repo(full_name).compare(base, head)
+        if comparison.status not in ("ahead", "identical"):
+            return comparison.status, []
+        # Files are paginated, listing them makes further requests.
+        return comparison.status, list(comparison.files)
@@ -0,0 +1,28 @@
+from typing import List
+
+from dev_observer.process import run_process
+
+
+# Helpers for providers that serve the repository of the current working directory.
+
+async def get_head_commit() -> str:
+    return (await git_output(["rev-parse", "HEAD"])).strip()
+
+
+async def get_diff(base: str, head: str) -> str:
+    return await git_output(["diff", base, head])
+
+
+async def get_git_root() -> str:
+    return (await git_output(["rev-parse", "--show-toplevel"])).strip()
+
+
+async def has_uncommitted_changes() -> bool:
+    return len((await git_output(["status", "--porcelain"])).strip()) > 0
+
+
+async def git_output(args: List[str]) -> str:
+    result = await run_process(["git", *args])
+    if result.returncode != 0:
+        raise RuntimeError(f"Git command {args} failed: {result.stderr}")
+    return result.stdout
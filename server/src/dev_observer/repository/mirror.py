@@ -0,0 +1,156 @@
+import asyncio
+import fcntl
+import logging
+import os
+import re
+import shutil
+from typing import List
+
+from dev_observer.log import s_
+from dev_observer.process import run_process
+from dev_observer.util import dir_size
+
+_log = logging.getLogger(__name__)
+
+# Local ref the remote default branch is fetched into.
+_HEAD_REF = "refs/heads/observed-head"
+_LAST_USED_FILE = "last_used"
+# How often a checkout retries the lock of a mirror fetched by someone else.
+_LOCK_POLL_SEC = 0.1
+
+
+class RepoMirrorStore:
+    """Persistent store of bare repository mirrors.
+
+    Each repository is fetched into a bare repository under `root_dir`, so rescans only transfer new objects.
+    Analysis works with worktrees checked out from the mirror. Least recently used mirrors are evicted once
+    the total size exceeds `max_size_bytes`; mirrors that are being fetched or have live worktrees are kept.
+
+    The root may be shared by several worker processes. A mirror is fetched and checked out under an exclusive
+    lock on its lock file, eviction skips mirrors it can't lock. Locks are released by the OS when a process dies.
+    """
+    _dir: str
+    _max_size_bytes: int
+
+    def __init__(self, root_dir: str, max_size_bytes: int):
+        os.makedirs(root_dir, exist_ok=True)
+        self._dir = root_dir
+        self._max_size_bytes = max_size_bytes
+
+    async def checkout(self, name: str, url: str, dest: str):
+        """Fetches the default branch of `url` into the mirror for `name` and checks it out into `dest`.
+
+        The url is not persisted in the mirror, so it may contain short-lived credentials.
+        """
+        mirror_name = _mirror_name(name)
+        path = os.path.join(self._dir, mirror_name)
+        fd = await _lock_exclusive(self._lock_path(mirror_name))
+        try:
+            created = False
+            if not os.path.exists(path):
+                await _run_git(["init", "--bare", "--quiet", path], "initialize mirror")
+                created = True
+            try:
+                _log.debug(s_("Fetching into mirror", name=name, created=created))
+                await _run_git(
+                    ["--git-dir", path, "fetch", "--quiet", "--prune", "--no-tags", "--force", url,
+                     f"+HEAD:{_HEAD_REF}"],
+                    "fetch repository",
+                )
+            except BaseException:
+                if created:
+                    shutil.rmtree(path, ignore_errors=True)
+                raise
+            # Worktrees of previous scans are removed with their directories, forget about them.
+            await _run_git(["--git-dir", path, "worktree", "prune"], "prune worktrees")
+            await _run_git(
+                ["--git-dir", path, "worktree", "add", "--quiet", "--detach", dest, _HEAD_REF],
+                "check out worktree",
+            )
+            with open(os.path.join(path, _LAST_USED_FILE), 'w'):
+                pass
+        finally:
+            os.close(fd)
+        # Sizes of all mirrors are walked, keep it off the event loop.
+        await asyncio.to_thread(self.evict)
+
+    def evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self._dir):
+            path = os.path.join(self._dir, name)
+            if not os.path.isdir(path):
+                continue
+            size = dir_size(path)
+            total += size
+            last_used_path = os.path.join(path, _LAST_USED_FILE)
+            last_used = os.path.getmtime(last_used_path) if os.path.exists(last_used_path) else 0
+            entries.append((last_used, name, size))
+        if total <= self._max_size_bytes:
+            return
+        entries.sort()
+        for _, name, size in entries:
+            if total <= self._max_size_bytes:
+                break
+            fd = os.open(self._lock_path(name), os.O_RDWR | os.O_CREAT)
+            try:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Being fetched or checked out.
+                    continue
+                path = os.path.join(self._dir, name)
+                if not os.path.isdir(path) or len(_live_worktrees(path)) > 0:
+                    continue
+                _log.debug(s_("Evicting repo mirror", name=name, size=size))
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+            finally:
+                os.close(fd)
+
+    def _lock_path(self, mirror_name: str) -> str:
+        # Next to the mirror rather than inside, so it outlives eviction and waiters keep locking the same file.
+        return os.path.join(self._dir, f"{mirror_name}.lock")
+
+
+def _mirror_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name.replace("/", "__")) + ".git"
+
+
+def _live_worktrees(path: str) -> List[str]:
+    """Returns worktree directories of the mirror that still exist."""
+    result: List[str] = []
+    worktrees_dir = os.path.join(path, "worktrees")
+    if not os.path.isdir(worktrees_dir):
+        return result
+    for name in os.listdir(worktrees_dir):
+        gitdir_path = os.path.join(worktrees_dir, name, "gitdir")
+        try:
+            with open(gitdir_path, 'r') as f:
+                worktree_git = f.read().strip()
+        except OSError:
+            continue
+        if os.path.exists(worktree_git):
+            result.append(os.path.dirname(worktree_git))
+    return result
+
+
+async def _lock_exclusive(path: str) -> int:
+    """Locks the file exclusively, polling so the event loop is never blocked by a lock held elsewhere."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return fd
+            except BlockingIOError:
+                await asyncio.sleep(_LOCK_POLL_SEC)
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+async def _run_git(args: List[str], action: str):
+    result = await run_process(["git", *args])
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to {action}: {result.stderr}")
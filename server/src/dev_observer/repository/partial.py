@@ -0,0 +1,66 @@
+import logging
+import os
+import re
+from typing import List, Set, Tuple
+
+from dev_observer.log import s_
+from dev_observer.process import run_process
+from dev_observer.repository.provider import CloneOptions
+
+_log = logging.getLogger(__name__)
+
+_SPECIAL_CHARS = re.compile(r"([\\*?\[\]!#])")
+
+
+async def partial_clone(url: str, dest: str, options: CloneOptions):
+    """Clones the repository without blobs larger than `options.max_blob_size` and without excluded paths.
+
+    Files with missing blobs are excluded from the checkout with sparse-checkout, so they are never fetched.
+    """
+    await _git(
+        ["clone", "--quiet", "--depth=1", f"--filter=blob:limit={options.max_blob_size}", "--no-checkout", url, dest],
+        "clone repository",
+    )
+    missing = await _missing_blobs(dest)
+    large_paths = [path for oid, path in await _list_tree(dest) if oid in missing]
+    patterns = ["/*"]
+    patterns.extend(f"!{p}" for p in options.exclude_patterns if len(p.strip()) > 0)
+    patterns.extend(f"!/{_escape_path(p)}" for p in large_paths)
+    _log.debug(s_("Sparse checkout", excluded_large=len(large_paths), patterns=len(patterns)))
+
+    await _git(["-C", dest, "sparse-checkout", "init", "--no-cone"], "enable sparse checkout")
+    with open(os.path.join(dest, ".git", "info", "sparse-checkout"), 'w', encoding='utf-8') as f:
+        f.write("".join(f"{p}\n" for p in patterns))
+    await _git(["-C", dest, "checkout", "--quiet"], "check out repository")
+
+
+async def _missing_blobs(repo_path: str) -> Set[str]:
+    out = await _git(["-C", repo_path, "rev-list", "--objects", "--missing=print", "HEAD"], "list objects")
+    return set(line[1:].strip() for line in out.splitlines() if line.startswith("?"))
+
+
+async def _list_tree(repo_path: str) -> List[Tuple[str, str]]:
+    out = await _git(["-C", repo_path, "ls-tree", "-r", "-z", "HEAD"], "list files")
+    result = []
+    for entry in out.split("\0"):
+        if len(entry) == 0:
+            continue
+        meta, path = entry.split("\t", 1)
+        parts = meta.split()
+        if len(parts) == 3 and parts[1] == "blob":
+            result.append((parts[2], path))
+    return result
+
+
+def _escape_path(path: str) -> str:
+    escaped = _SPECIAL_CHARS.sub(r"\\\1", path)
+    if escaped.endswith(" "):
+        escaped = escaped[:-1] + "\\ "
+    return escaped
+
+
+async def _git(args: List[str], action: str) -> str:
+    result = await run_process(["git", *args])
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to {action}: {result.stderr}")
+    return result.stdout
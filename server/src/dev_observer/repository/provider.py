@@ -1,6 +1,6 @@
 import dataclasses
 from abc import abstractmethod
-from typing import Protocol
+from typing import Protocol, Optional, List
 
 from dev_observer.repository.types import ObservedRepo
 
@@ -13,11 +13,30 @@ class RepositoryInfo:
     size_kb: int
 
 
+@dataclasses.dataclass
+class CloneOptions:
+    # Blobs larger than this are not fetched, 0 fetches all of them.
+    max_blob_size: int = 0
+    # Gitignore-style patterns of paths that don't need to be checked out.
+    exclude_patterns: List[str] = dataclasses.field(default_factory=list)
+
+
 class GitRepositoryProvider(Protocol):
     @abstractmethod
     async def get_repo(self, repo: ObservedRepo) -> RepositoryInfo:
         ...
 
     @abstractmethod
-    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str):
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        """Clones the repository into `dest`, options are a hint that providers may ignore."""
+        ...
+
+    @abstractmethod
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        """Returns SHA of the commit the default branch points to, without cloning the repository."""
+        ...
+
+    @abstractmethod
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        """Returns unified diff between two commits, or None if it is not available (e.g. too large)."""
         ...
@@ -16,3 +16,5 @@ class ServerEnv:
     periodic_processor: PeriodicProcessor
     users: UsersProvider
     api_keys: List[str]
+    # Whether the API server runs the periodic processor in a background thread.
+    embedded_processing: bool
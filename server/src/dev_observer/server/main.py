@@ -11,7 +11,9 @@ from dev_observer.log import s_
 from dev_observer.server import detect
 from dev_observer.server.middleware.auth import AuthMiddleware
 from dev_observer.server.services.config import ConfigService
+from dev_observer.server.services.metrics import MetricsService
 from dev_observer.server.services.observations import ObservationsService
+from dev_observer.server.services.processing import ProcessingService
 from dev_observer.server.services.repositories import RepositoriesService
 from dev_observer.server.services.sites import WebSitesService
 
@@ -28,8 +30,11 @@ def start_bg_processing():
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    thread = threading.Thread(target=start_bg_processing, daemon=True)
-    thread.start()
+    if env.embedded_processing:
+        thread = threading.Thread(target=start_bg_processing, daemon=True)
+        thread.start()
+    else:
+        _log.info(s_("Embedded processing disabled, items are processed by workers"))
     yield
 
 
@@ -43,6 +48,8 @@ config_service = ConfigService(env.storage, env.users)
 repos_service = RepositoriesService(env.storage)
 observations_service = ObservationsService(env.observations)
 websites_service = WebSitesService(env.storage)
+processing_service = ProcessingService(env.periodic_processor, env.embedded_processing)
+metrics_service = MetricsService(env.storage)
 
 # Include routers with authentication
 app.include_router(
@@ -65,6 +72,13 @@ app.include_router(
     prefix="/api/v1",
     dependencies=[Depends(auth_middleware.verify_token)]
 )
+app.include_router(
+    processing_service.router,
+    prefix="/api/v1",
+    dependencies=[Depends(auth_middleware.verify_token)]
+)
+# Scraped by Prometheus from inside the cluster, not routed by the public proxy.
+app.include_router(metrics_service.router)
 
 origins = [
     "http://localhost:5173",
@@ -0,0 +1,51 @@
+import logging
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from dev_observer.api.types.processing_pb2 import ProcessingItemKey
+from dev_observer.log import s_
+from dev_observer.metrics import Registry, REGISTRY, QUEUE_DEPTH, QUEUE_LAG
+from dev_observer.storage.provider import StorageProvider
+from dev_observer.util import Clock, RealClock
+
+_log = logging.getLogger(__name__)
+
+# Entity types of processing items, as named in the entity oneof of the key.
+_ENTITY_TYPES = [f.name for f in ProcessingItemKey.DESCRIPTOR.oneofs_by_name["entity"].fields]
+
+
+class MetricsService:
+    """Serves metrics of this process in the Prometheus text format.
+
+    Queue depth and lag are read from the storage on every scrape, so they cover items of all workers.
+    """
+    _storage: StorageProvider
+    _registry: Registry
+    _clock: Clock
+
+    router: APIRouter
+
+    def __init__(self, storage: StorageProvider, registry: Registry = REGISTRY, clock: Clock = RealClock()):
+        self._storage = storage
+        self._registry = registry
+        self._clock = clock
+        self.router = APIRouter()
+
+        self.router.add_api_route("/metrics", self.get_metrics, methods=["GET"], response_class=PlainTextResponse)
+
+    async def get_metrics(self) -> PlainTextResponse:
+        try:
+            await self._collect_backlog()
+        except Exception as e:
+            # Metrics of this process are still useful without the backlog.
+            _log.warning(s_("Failed to get processing backlog", error=str(e)))
+        return PlainTextResponse(self._registry.render(), media_type="text/plain; version=0.0.4")
+
+    async def _collect_backlog(self):
+        now = self._clock.now()
+        for entity_type in _ENTITY_TYPES:
+            backlog = await self._storage.get_processing_backlog(entity_type)
+            lag = (now - backlog.oldest_due).total_seconds() if backlog.oldest_due is not None else 0
+            QUEUE_DEPTH.set(backlog.due, entity_type=entity_type)
+            QUEUE_LAG.set(max(lag, 0), entity_type=entity_type)
@@ -0,0 +1,29 @@
+import logging
+
+from fastapi import APIRouter
+
+from dev_observer.api.web.processing_pb2 import GetProcessingStatusResponse
+from dev_observer.processors.periodic import PeriodicProcessor
+from dev_observer.util import pb_to_dict
+
+_log = logging.getLogger(__name__)
+
+
+class ProcessingService:
+    _processor: PeriodicProcessor
+    _embedded: bool
+
+    router: APIRouter
+
+    def __init__(self, processor: PeriodicProcessor, embedded: bool = True):
+        self._processor = processor
+        self._embedded = embedded
+        self.router = APIRouter()
+
+        self.router.add_api_route("/processing/status", self.get_status, methods=["GET"])
+
+    async def get_status(self):
+        if not self._embedded:
+            # The processor of this server is idle, items are processed by standalone workers.
+            return pb_to_dict(GetProcessingStatusResponse(embedded=False))
+        return pb_to_dict(GetProcessingStatusResponse(lanes=self._processor.get_status(), embedded=True))
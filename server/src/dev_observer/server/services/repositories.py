@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter
 from starlette.requests import Request
 
-from dev_observer.api.types.processing_pb2 import ProcessingItemKey
+from dev_observer.api.types.processing_pb2 import ProcessingItemKey, PROCESSING_PRIORITY_INTERACTIVE
 from dev_observer.api.types.repo_pb2 import GitHubRepository
 from dev_observer.api.web.repositories_pb2 import AddGithubRepositoryRequest, AddGithubRepositoryResponse, \
     ListGithubRepositoriesResponse, RescanRepositoryResponse, GetRepositoryResponse, DeleteRepositoryResponse
@@ -58,6 +58,6 @@ class RepositoriesService:
 
     async def rescan(self, repo_id: str):
         await self._store.set_next_processing_time(
-            ProcessingItemKey(github_repo_id=repo_id), self._clock.now(),
+            ProcessingItemKey(github_repo_id=repo_id), self._clock.now(), PROCESSING_PRIORITY_INTERACTIVE,
         )
         return pb_to_dict(RescanRepositoryResponse())
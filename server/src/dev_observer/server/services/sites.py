@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter
 from starlette.requests import Request
 
-from dev_observer.api.types.processing_pb2 import ProcessingItemKey
+from dev_observer.api.types.processing_pb2 import ProcessingItemKey, PROCESSING_PRIORITY_INTERACTIVE
 from dev_observer.api.types.sites_pb2 import WebSite
 from dev_observer.api.web.sites_pb2 import AddWebSiteRequest, AddWebSiteResponse, \
     ListWebSitesResponse, GetWebSiteResponse, DeleteWebSiteResponse, RescanWebSiteResponse
@@ -38,7 +38,7 @@ class WebSitesService:
         site = add_data.site
         if request.scan_if_new and add_data.created:
             await self._store.set_next_processing_time(
-                ProcessingItemKey(website_url=site.url), self._clock.now(),
+                ProcessingItemKey(website_url=site.url), self._clock.now(), PROCESSING_PRIORITY_INTERACTIVE,
             )
         return pb_to_dict(AddWebSiteResponse(site=site))
 
@@ -58,6 +58,6 @@ class WebSitesService:
     async def rescan(self, site_id: str):
         site = await self._store.get_web_site(site_id)
         await self._store.set_next_processing_time(
-            ProcessingItemKey(website_url=site.url), self._clock.now(),
+            ProcessingItemKey(website_url=site.url), self._clock.now(), PROCESSING_PRIORITY_INTERACTIVE,
         )
         return pb_to_dict(RescanWebSiteResponse())
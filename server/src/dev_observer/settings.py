@@ -15,10 +15,17 @@ class Github(BaseModel):
     private_key: Optional[str] = None
 
 
+class GitMirror(BaseModel):
+    dir: str
+    max_size_mb: int = 51_200
+
+
 class Git(BaseModel):
     provider: Literal["github", "copying", "delegating"] = "github"
 
     github: Optional[Github] = None
+    # Keeps bare mirrors of github repos to fetch only new objects on rescans.
+    mirror: Optional[GitMirror] = None
 
 
 class LangfuseAuth(BaseModel):
@@ -47,10 +54,27 @@ class LanggraphAnalysis(BaseModel):
     mask_traces: bool = True
 
 
+class AnalysisCache(BaseModel):
+    # Postgresql cache uses the database of the postgresql storage.
+    provider: Literal["local", "postgresql"] = "local"
+    dir: Optional[str] = None
+    max_size_mb: int = 1_024
+    # Cached results older than this are analyzed again, 0 keeps them forever.
+    ttl_sec: int = 30 * 24 * 3600
+    # Postgresql cache deletes expired and excess entries at most this often per process.
+    evict_interval_sec: int = 300
+
+
 class Analysis(BaseModel):
     provider: Literal["langgraph", "stub"] = "langgraph"
 
     langgrpah: Optional[LanggraphAnalysis] = None
+    # Max LLM requests of the process running at the same time, shared by all analyses. Lowered while the provider
+    # rate limits requests. Each analyzer is also capped by `GlobalConfig.analysis.max_concurrent_requests`, so it
+    # runs at most the smaller of the two, while all analyzers together run at most this many.
+    max_concurrent_llm_requests: int = 16
+    # Reuses results of identical prompts.
+    cache: Optional[AnalysisCache] = None
 
 
 class LocalObservations(BaseModel):
@@ -113,6 +137,45 @@ class UserManagement(BaseModel):
     provider: Literal["clerk", "none"] = "none"
     clerk: Optional[Clerk] = None
 
+
+class FlattenCache(BaseModel):
+    dir: str
+    max_size_mb: int = 10_240
+
+
+class Processes(BaseModel):
+    # Max number of external processes (git, repomix) running at the same time.
+    max_concurrent: int = 4
+    timeout_sec: Optional[int] = None
+
+
+class Processing(BaseModel):
+    # Number of items processed at the same time, per lane.
+    repo_workers: int = 1
+    website_workers: int = 1
+    # Claimed items are picked up by other workers if their lease is not renewed in time.
+    lease_sec: int = 120
+    # Share of the processing interval the next scan time is randomly spread over.
+    interval_jitter: float = 0.2
+    # Failed items are retried after retry_backoff_sec, doubled with every failure in a row up to
+    # max_retry_backoff_sec, and quarantined after max_failures failures in a row (0 never quarantines).
+    retry_backoff_sec: int = 300
+    max_retry_backoff_sec: int = 24 * 3600
+    max_failures: int = 5
+    # Items per lane cloned and flattened ahead while workers wait on the analysis of previous items,
+    # 0 clones, flattens and analyzes each item in the same worker.
+    prefetch: int = 0
+    # Runs processing in a background thread of the API server. Disable when items are processed by workers
+    # started with `python -m dev_observer.worker.main`.
+    embedded: bool = True
+    # Processes started by the worker, each runs its own workers per lane.
+    worker_processes: int = 1
+    # Workers finish items in progress for up to this long on SIGTERM, leases of unfinished items expire then.
+    drain_timeout_sec: int = 300
+    # Worker processes serve their metrics at /metrics on consecutive ports starting from this one, 0 disables.
+    worker_metrics_port: int = 0
+
+
 class WebScraping(BaseModel):
     provider: Literal["scrapy"] = "scrapy"
 
@@ -129,6 +192,9 @@ class Settings(BaseSettings):
     users_management: Optional[UserManagement] = None
     api_keys: Optional[ApiKeys] = None
     web_scraping: Optional[WebScraping] = WebScraping()
+    flatten_cache: Optional[FlattenCache] = None
+    processes: Optional[Processes] = None
+    processing: Optional[Processing] = None
 
     def __init__(self) -> None:
         toml_file = Settings.model_config.get("toml_file", None)
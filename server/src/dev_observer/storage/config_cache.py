@@ -0,0 +1,67 @@
+import datetime
+import logging
+from typing import Optional
+
+from dev_observer.api.types.config_pb2 import GlobalConfig
+from dev_observer.log import s_
+from dev_observer.storage.provider import StorageProvider
+from dev_observer.util import Clock, RealClock
+
+_log = logging.getLogger(__name__)
+
+
+class GlobalConfigCache:
+    """Keeps the global config in memory, so hot paths read it without a storage round-trip.
+
+    The config is reloaded after `invalidate`, which `listen` calls on every config change reported by the
+    storage, also for changes made by other replicas. It is reloaded at least every `max_age_sec` in case
+    notifications are missed.
+    """
+    _storage: StorageProvider
+    _clock: Clock
+    _max_age: datetime.timedelta
+    _config: Optional[GlobalConfig]
+    _loaded_at: Optional[datetime.datetime]
+    _loaded_version: int
+    _version: int
+
+    def __init__(self, storage: StorageProvider, max_age_sec: float = 60, clock: Clock = RealClock()):
+        self._storage = storage
+        self._clock = clock
+        self._max_age = datetime.timedelta(seconds=max_age_sec)
+        self._config = None
+        self._loaded_at = None
+        self._loaded_version = 0
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """Incremented on every invalidation, a config read after the change has a greater version."""
+        return self._version
+
+    async def get(self) -> GlobalConfig:
+        """Returns the cached config, callers must not modify it."""
+        version = self._version
+        config = self._config
+        if config is not None and self._loaded_version == version and not self._expired():
+            return config
+        config = await self._storage.get_global_config()
+        # Keep the older version if invalidated while loading, so the next read loads again.
+        self._config = config
+        self._loaded_version = version
+        self._loaded_at = self._clock.now()
+        return config
+
+    def invalidate(self):
+        # May be called from other threads, a lost concurrent increment still changes the version.
+        self._version += 1
+
+    async def listen(self):
+        """Invalidates the config on changes reported by the storage, runs until cancelled."""
+        try:
+            await self._storage.listen_config_changes(self.invalidate)
+        except Exception as e:
+            _log.error(s_("Stopped listening for config changes, config is reloaded on expiration only"), exc_info=e)
+
+    def _expired(self) -> bool:
+        return self._loaded_at is None or self._clock.now() - self._loaded_at >= self._max_age
@@ -0,0 +1,100 @@
+import datetime
+import logging
+from typing import Optional
+
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from dev_observer.analysis.cache import AnalysisCache
+from dev_observer.log import s_
+from dev_observer.storage.postgresql.model import AnalysisCacheEntity
+from dev_observer.util import Clock, RealClock
+
+_log = logging.getLogger(__name__)
+
+
+class PostgresqlAnalysisCache(AnalysisCache):
+    """Stores analysis results in the `analysis_cache` table, shared by all server replicas.
+
+    Entries older than `ttl_sec` are not returned (0 keeps them forever). Expired entries and least recently used
+    entries past `max_size_bytes` are deleted by a write at most once per `evict_interval_sec`, so the table can
+    exceed the budget in between. Uses the engine of the storage, so it shares its connection pool.
+    """
+    _engine: AsyncEngine
+    _max_size_bytes: int
+    _ttl_sec: int
+    _evict_interval: datetime.timedelta
+    _next_evict: Optional[datetime.datetime]
+    _clock: Clock
+
+    def __init__(self, engine: AsyncEngine, max_size_bytes: int, ttl_sec: int = 0, evict_interval_sec: int = 300,
+                 clock: Clock = RealClock()):
+        self._engine = engine
+        self._max_size_bytes = max_size_bytes
+        self._ttl_sec = ttl_sec
+        self._evict_interval = datetime.timedelta(seconds=evict_interval_sec)
+        self._next_evict = None
+        self._clock = clock
+
+    async def get(self, key: str) -> Optional[str]:
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                ent = await session.get(AnalysisCacheEntity, key)
+                if ent is None:
+                    return None
+                if self._ttl_sec > 0 and ent.created_at < self._expiry_time():
+                    return None
+                await session.execute(
+                    update(AnalysisCacheEntity)
+                    .where(AnalysisCacheEntity.key == key)
+                    .values(accessed_at=self._clock.now())
+                )
+                return ent.analysis
+
+    async def put(self, key: str, analysis: str):
+        now = self._clock.now()
+        size = len(analysis.encode("utf-8"))
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                await session.execute(
+                    insert(AnalysisCacheEntity)
+                    .values(key=key, analysis=analysis, size_bytes=size, accessed_at=now, created_at=now)
+                    .on_conflict_do_update(
+                        index_elements=[AnalysisCacheEntity.key],
+                        set_={"analysis": analysis, "size_bytes": size, "accessed_at": now, "created_at": now},
+                    )
+                )
+        if self._next_evict is None or now >= self._next_evict:
+            # Set before evicting, so concurrent writes don't evict at the same time.
+            self._next_evict = now + self._evict_interval
+            try:
+                await self.evict()
+            except Exception as e:
+                _log.warning(s_("Failed to evict analysis cache entries", error=e))
+
+    async def evict(self):
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                if self._ttl_sec > 0:
+                    await session.execute(
+                        delete(AnalysisCacheEntity).where(AnalysisCacheEntity.created_at < self._expiry_time())
+                    )
+                total = await session.scalar(select(func.coalesce(func.sum(AnalysisCacheEntity.size_bytes), 0)))
+                if total <= self._max_size_bytes:
+                    return
+                # Sizes accumulated from the most recently used entry, everything past the budget is deleted.
+                running = func.sum(AnalysisCacheEntity.size_bytes).over(
+                    order_by=AnalysisCacheEntity.accessed_at.desc()
+                ).label("running")
+                ranked = select(AnalysisCacheEntity.key, running).subquery()
+                res = await session.execute(
+                    delete(AnalysisCacheEntity)
+                    .where(AnalysisCacheEntity.key.in_(
+                        select(ranked.c.key).where(ranked.c.running > self._max_size_bytes)
+                    ))
+                )
+                _log.debug(s_("Evicted analysis cache entries", total=total, evicted=res.rowcount))
+
+    def _expiry_time(self) -> datetime.datetime:
+        return self._clock.now() - datetime.timedelta(seconds=self._ttl_sec)
@@ -58,10 +58,16 @@ class ProcessingItemEntity(Base):
     __tablename__ = "processing_item"
     key: Mapped[str] = mapped_column(primary_key=True)
     json_data: Mapped[str]
+    # Name of the entity field set in the key, e.g. `github_repo_id`, so lanes filter on an index.
+    entity_type: Mapped[Optional[str]] = mapped_column(index=True)
     next_processing: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
     last_processed: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
     last_error: Mapped[Optional[str]]
     no_processing: Mapped[bool] = mapped_column(default=False)
+    lease_owner: Mapped[Optional[str]]
+    lease_expires: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True))
+    failures: Mapped[int] = mapped_column(default=0, server_default="0")
+    priority: Mapped[int] = mapped_column(default=0, server_default="0")
 
     created_at: Mapped[datetime.datetime] = mapped_column(
         DateTime(timezone=True),
@@ -76,7 +82,7 @@ class ProcessingItemEntity(Base):
     )
 
     def __repr__(self):
-        return f"ProcessingItemEntity(key={self.key}, json_data={self.json_data}, next_processing={self.next_processing}, last_processed={self.last_processed}, last_error={self.last_error}, no_processing={self.no_processing})"
+        return f"ProcessingItemEntity(key={self.key}, json_data={self.json_data}, entity_type={self.entity_type}, next_processing={self.next_processing}, last_processed={self.last_processed}, last_error={self.last_error}, no_processing={self.no_processing}, lease_owner={self.lease_owner}, lease_expires={self.lease_expires}, failures={self.failures}, priority={self.priority})"
 
 
 class WebsiteEntity(Base):
@@ -99,4 +105,21 @@ class WebsiteEntity(Base):
     )
 
     def __repr__(self):
-        return f"WebsiteEntity(id={self.id}, json_data={self.json_data})"
\ No newline at end of file
+        return f"WebsiteEntity(id={self.id}, json_data={self.json_data})"
+
+class AnalysisCacheEntity(Base):
+    __tablename__ = "analysis_cache"
+
+    key: Mapped[str] = mapped_column(primary_key=True)
+    analysis: Mapped[str]
+    size_bytes: Mapped[int]
+    accessed_at: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), index=True)
+
+    created_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+    def __repr__(self):
+        return f"AnalysisCacheEntity(key={self.key}, size_bytes={self.size_bytes}, accessed_at={self.accessed_at})"
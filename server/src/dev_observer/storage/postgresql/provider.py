@@ -1,19 +1,31 @@
+import asyncio
 import datetime
+import logging
 import uuid
-from typing import Optional, MutableSequence
+from typing import Optional, MutableSequence, Callable
 
 from google.protobuf import json_format
-from sqlalchemy import select, delete, update
+from sqlalchemy import select, delete, update, or_, func, text, case, literal, and_
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 
 from dev_observer.api.types.config_pb2 import GlobalConfig
-from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey
+from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey, ProcessingPriority, \
+    PROCESSING_PRIORITY_SCHEDULED, PROCESSING_PRIORITY_BACKFILL
 from dev_observer.api.types.repo_pb2 import GitHubRepository, GitProperties
 from dev_observer.api.types.sites_pb2 import WebSite
 from dev_observer.storage.postgresql.model import GitRepoEntity, ProcessingItemEntity, GlobalConfigEntity, WebsiteEntity
-from dev_observer.storage.provider import StorageProvider, AddWebSiteData
+from dev_observer.log import s_
+from dev_observer.storage.provider import StorageProvider, AddWebSiteData, ProcessingBacklog, PRIORITY_LEVELS, \
+    PRIORITY_AGING, MIN_AGED_PRIORITY_LEVEL
 from dev_observer.util import parse_json_pb, pb_to_json, Clock, RealClock
 
+_log = logging.getLogger(__name__)
+
+# Channels of NOTIFY messages sent when items are scheduled for processing and when the global config changes.
+_PROCESSING_CHANNEL = "processing_items"
+_CONFIG_CHANNEL = "global_config"
+_LISTEN_RETRY_SEC = 5
+
 
 class PostgresqlStorageProvider(StorageProvider):
     _engine: AsyncEngine
@@ -23,6 +35,10 @@ class PostgresqlStorageProvider(StorageProvider):
         self._engine = create_async_engine(url, echo=echo)
         self._clock = clock
 
+    @property
+    def engine(self) -> AsyncEngine:
+        return self._engine
+
     async def get_github_repos(self) -> MutableSequence[GitHubRepository]:
         async with AsyncSession(self._engine) as session:
             entities = await session.execute(select(GitRepoEntity))
@@ -118,33 +134,157 @@ class PostgresqlStorageProvider(StorageProvider):
                     created=True,
                 )
 
-    async def next_processing_item(self) -> Optional[ProcessingItem]:
+    async def next_processing_item(self, entity_type: Optional[str] = None) -> Optional[ProcessingItem]:
         next_processing_time = self._clock.now()
         async with AsyncSession(self._engine) as session:
-            res = await session.execute(
-                select(ProcessingItemEntity)
-                .where(
-                    ProcessingItemEntity.next_processing != None,
-                    ProcessingItemEntity.next_processing < next_processing_time,
-                )
-                .order_by(ProcessingItemEntity.next_processing)
+            query = select(ProcessingItemEntity).where(
+                ProcessingItemEntity.next_processing != None,
+                ProcessingItemEntity.next_processing < next_processing_time,
+                ProcessingItemEntity.no_processing == False,
             )
+            if entity_type is not None:
+                query = query.where(ProcessingItemEntity.entity_type == _entity_type(entity_type))
+            res = await session.execute(query.order_by(*_queue_order(next_processing_time)))
             item = res.first()
             return _to_optional_item(item[0] if item is not None else None)
 
-    async def set_next_processing_time(self, key: ProcessingItemKey, next_time: Optional[datetime.datetime]):
+    async def set_next_processing_time(
+            self,
+            key: ProcessingItemKey,
+            next_time: Optional[datetime.datetime],
+            priority: ProcessingPriority = PROCESSING_PRIORITY_SCHEDULED,
+    ):
         key_str = json_format.MessageToJson(key, indent=None, sort_keys=True)
         async with AsyncSession(self._engine) as session:
             async with session.begin():
                 existing = await session.get(ProcessingItemEntity, key_str)
                 if existing is not None:
+                    values = dict(next_processing=next_time, priority=priority, entity_type=key.WhichOneof("entity"))
+                    if next_time is not None:
+                        values.update(no_processing=False, failures=0)
                     await session.execute(
                         update(ProcessingItemEntity)
                         .where(ProcessingItemEntity.key == key_str)
-                        .values(next_processing=next_time)
+                        .values(**values)
                     )
                 else:
-                    session.add(ProcessingItemEntity(key=key_str, next_processing=next_time, json_data="{}"))
+                    session.add(ProcessingItemEntity(
+                        key=key_str,
+                        entity_type=key.WhichOneof("entity"),
+                        next_processing=next_time,
+                        priority=priority,
+                        json_data="{}",
+                    ))
+                if next_time is not None:
+                    # Delivered to listeners on commit.
+                    await session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": _PROCESSING_CHANNEL})
+
+    async def claim_processing_item(
+            self,
+            owner: str,
+            lease: datetime.timedelta,
+            entity_type: Optional[str] = None,
+    ) -> Optional[ProcessingItem]:
+        now = self._clock.now()
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                query = select(ProcessingItemEntity).where(
+                    ProcessingItemEntity.next_processing != None,
+                    ProcessingItemEntity.next_processing < now,
+                    ProcessingItemEntity.no_processing == False,
+                    or_(ProcessingItemEntity.lease_expires == None, ProcessingItemEntity.lease_expires <= now),
+                )
+                if entity_type is not None:
+                    query = query.where(ProcessingItemEntity.entity_type == _entity_type(entity_type))
+                # Rows locked by concurrent claims are skipped, so replicas never claim the same item.
+                query = query.order_by(*_queue_order(now)).limit(1).with_for_update(skip_locked=True)
+                ent = await session.scalar(query)
+                if ent is None:
+                    return None
+                ent.lease_owner = owner
+                ent.lease_expires = now + lease
+                return _to_item(ent)
+
+    async def renew_processing_lease(self, key: ProcessingItemKey, owner: str, lease: datetime.timedelta) -> bool:
+        key_str = json_format.MessageToJson(key, indent=None, sort_keys=True)
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                res = await session.execute(
+                    update(ProcessingItemEntity)
+                    .where(ProcessingItemEntity.key == key_str, ProcessingItemEntity.lease_owner == owner)
+                    .values(lease_expires=self._clock.now() + lease)
+                )
+                return res.rowcount > 0
+
+    async def release_processing_item(
+            self,
+            key: ProcessingItemKey,
+            owner: str,
+            next_time: Optional[datetime.datetime],
+            error: Optional[str] = None,
+            quarantine: bool = False,
+    ):
+        key_str = json_format.MessageToJson(key, indent=None, sort_keys=True)
+        values = dict(next_processing=next_time, lease_owner=None, lease_expires=None, no_processing=quarantine)
+        if error is None:
+            values.update(
+                last_processed=self._clock.now(), last_error=None, failures=0, priority=PROCESSING_PRIORITY_SCHEDULED,
+            )
+        else:
+            values.update(
+                last_error=error, failures=ProcessingItemEntity.failures + 1, priority=PROCESSING_PRIORITY_BACKFILL,
+            )
+        async with AsyncSession(self._engine) as session:
+            async with session.begin():
+                await session.execute(
+                    update(ProcessingItemEntity)
+                    .where(ProcessingItemEntity.key == key_str, ProcessingItemEntity.lease_owner == owner)
+                    .values(**values)
+                )
+
+    async def next_processing_due(self, entity_type: Optional[str] = None) -> Optional[datetime.datetime]:
+        due = func.greatest(
+            ProcessingItemEntity.next_processing,
+            func.coalesce(ProcessingItemEntity.lease_expires, ProcessingItemEntity.next_processing),
+        )
+        async with AsyncSession(self._engine) as session:
+            query = select(func.min(due)).where(
+                ProcessingItemEntity.next_processing != None,
+                ProcessingItemEntity.no_processing == False,
+            )
+            if entity_type is not None:
+                query = query.where(ProcessingItemEntity.entity_type == _entity_type(entity_type))
+            return await session.scalar(query)
+
+    async def get_processing_backlog(self, entity_type: Optional[str] = None) -> ProcessingBacklog:
+        now = self._clock.now()
+        async with AsyncSession(self._engine) as session:
+            query = select(func.count(), func.min(ProcessingItemEntity.next_processing)).where(
+                ProcessingItemEntity.next_processing != None,
+                ProcessingItemEntity.next_processing < now,
+                ProcessingItemEntity.no_processing == False,
+                or_(ProcessingItemEntity.lease_expires == None, ProcessingItemEntity.lease_expires <= now),
+            )
+            if entity_type is not None:
+                query = query.where(ProcessingItemEntity.entity_type == _entity_type(entity_type))
+            due, oldest_due = (await session.execute(query)).one()
+            return ProcessingBacklog(due=due, oldest_due=oldest_due)
+
+    async def listen_processing_changes(self, on_change: Callable[[], None]):
+        await self._listen(_PROCESSING_CHANNEL, on_change)
+
+    async def listen_config_changes(self, on_change: Callable[[], None]):
+        await self._listen(_CONFIG_CHANNEL, on_change)
+
+    async def _listen(self, channel: str, on_change: Callable[[], None]):
+        while True:
+            try:
+                async with self._engine.connect() as conn:
+                    raw = await conn.get_raw_connection()
+                    await _listen(raw.driver_connection, channel, on_change)
+            except Exception as e:
+                _log.warning(s_("Listening for changes failed, reconnecting", channel=channel, error=str(e)))
+            await asyncio.sleep(_LISTEN_RETRY_SEC)
 
     async def get_global_config(self) -> GlobalConfig:
         async with AsyncSession(self._engine) as session:
@@ -164,9 +304,46 @@ class PostgresqlStorageProvider(StorageProvider):
                     .where(GlobalConfigEntity.id == "global_config")
                     .values(json_data=pb_to_json(config))
                 )
+                await session.execute(text("SELECT pg_notify(:channel, '')"), {"channel": _CONFIG_CHANNEL})
         return await self.get_global_config()
 
 
+async def _listen(driver, channel: str, on_change: Callable[[], None]):
+    # driver is an asyncpg connection, LISTEN requires a dedicated connection that is kept open.
+    closed = asyncio.Event()
+
+    def notified(*_):
+        on_change()
+
+    driver.add_termination_listener(lambda *_: closed.set())
+    await driver.add_listener(channel, notified)
+    try:
+        # Changes made while not listening were not delivered.
+        on_change()
+        await closed.wait()
+        _log.warning(s_("Changes connection closed", channel=channel))
+    finally:
+        if not driver.is_closed():
+            await driver.remove_listener(channel, notified)
+
+
+def _queue_order(now: datetime.datetime):
+    # Matches priority_level of single blob providers.
+    whens = []
+    for priority, level in PRIORITY_LEVELS.items():
+        for steps in range(level - MIN_AGED_PRIORITY_LEVEL, 0, -1):
+            overdue = ProcessingItemEntity.next_processing <= now - steps * PRIORITY_AGING
+            whens.append((and_(ProcessingItemEntity.priority == priority, overdue), literal(level - steps)))
+        whens.append((ProcessingItemEntity.priority == priority, literal(level)))
+    return case(*whens, else_=literal(MIN_AGED_PRIORITY_LEVEL)), ProcessingItemEntity.next_processing
+
+
+def _entity_type(entity_type: str) -> str:
+    if entity_type not in ProcessingItemKey.DESCRIPTOR.fields_by_name:
+        raise ValueError(f"Unknown processing item entity type: {entity_type}")
+    return entity_type
+
+
 def _to_optional_repo(ent: Optional[GitRepoEntity]) -> Optional[GitHubRepository]:
     return None if ent is None else _to_repo(ent)
 
@@ -206,5 +383,15 @@ def _to_item(ent: ProcessingItemEntity) -> ProcessingItem:
         data.last_processed = ent.last_processed
     data.last_error = ent.last_error if ent.last_error else ""
     data.no_processing = ent.no_processing
+    data.failures = ent.failures
+    data.priority = ent.priority
+    if ent.lease_owner is None:
+        data.ClearField("lease_owner")
+    else:
+        data.lease_owner = ent.lease_owner
+    if ent.lease_expires is None:
+        data.ClearField("lease_expires")
+    else:
+        data.lease_expires = ent.lease_expires
     data.key.CopyFrom(parse_json_pb(ent.key, ProcessingItemKey()))
     return data
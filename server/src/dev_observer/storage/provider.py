@@ -1,11 +1,32 @@
 import dataclasses
 import datetime
-from typing import Protocol, Optional, MutableSequence
+from typing import Protocol, Optional, MutableSequence, Callable, Dict
 
 from dev_observer.api.types.config_pb2 import GlobalConfig
-from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey
+from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey, ProcessingPriority, \
+    PROCESSING_PRIORITY_INTERACTIVE, PROCESSING_PRIORITY_SCHEDULED, PROCESSING_PRIORITY_BACKFILL
 from dev_observer.api.types.repo_pb2 import GitHubRepository, GitProperties
 from dev_observer.api.types.sites_pb2 import WebSite
+# Items are processed by priority level first and by due time within a level, interactive items go first.
+# Items of lower priority are promoted one level for every PRIORITY_AGING they are overdue, so backfill items are not
+# starved by scheduled ones. Aged items never reach the interactive level, so user requests go first even after
+# outages.
+PRIORITY_LEVELS: Dict[int, int] = {
+    PROCESSING_PRIORITY_INTERACTIVE: 0,
+    PROCESSING_PRIORITY_SCHEDULED: 1,
+    PROCESSING_PRIORITY_BACKFILL: 2,
+}
+PRIORITY_AGING = datetime.timedelta(hours=6)
+MIN_AGED_PRIORITY_LEVEL = PRIORITY_LEVELS[PROCESSING_PRIORITY_SCHEDULED]
+
+
+def priority_level(priority: int, next_processing: datetime.datetime, now: datetime.datetime) -> int:
+    level = PRIORITY_LEVELS.get(priority, MIN_AGED_PRIORITY_LEVEL)
+    if level <= MIN_AGED_PRIORITY_LEVEL:
+        return level
+    steps = max(0, (now - next_processing) // PRIORITY_AGING)
+    return max(MIN_AGED_PRIORITY_LEVEL, level - steps)
+
 
 @dataclasses.dataclass
 class AddWebSiteData:
@@ -13,6 +34,14 @@ class AddWebSiteData:
     created: bool
 
 
+@dataclasses.dataclass
+class ProcessingBacklog:
+    # Items that are due and can be claimed.
+    due: int
+    # Earliest next processing time of due items, None if nothing is due.
+    oldest_due: Optional[datetime.datetime]
+
+
 class StorageProvider(Protocol):
     async def get_github_repos(self) -> MutableSequence[GitHubRepository]:
         ...
@@ -45,10 +74,83 @@ class StorageProvider(Protocol):
     async def add_web_site(self, site: WebSite) -> AddWebSiteData:
         ...
 
-    async def next_processing_item(self) -> Optional[ProcessingItem]:
+    async def next_processing_item(self, entity_type: Optional[str] = None) -> Optional[ProcessingItem]:
+        """Returns the item that is due the longest, quarantined items are skipped.
+
+        Args:
+            entity_type: Name of the `ProcessingItemKey.entity` field to limit items to, e.g. `github_repo_id`.
+        """
+        ...
+
+    async def set_next_processing_time(
+            self,
+            key: ProcessingItemKey,
+            next_time: Optional[datetime.datetime],
+            priority: ProcessingPriority = PROCESSING_PRIORITY_SCHEDULED,
+    ):
+        """Schedules the item for processing, scheduling a quarantined item lifts the quarantine."""
+        ...
+
+    async def claim_processing_item(
+            self,
+            owner: str,
+            lease: datetime.timedelta,
+            entity_type: Optional[str] = None,
+    ) -> Optional[ProcessingItem]:
+        """Atomically claims the item that is due the longest and is not leased by another worker.
+
+        The claim holds until the lease expires, so items of crashed workers are picked up again once their lease
+        runs out.
+
+        Args:
+            owner: Unique id of the claiming worker.
+            lease: How long the claim holds unless renewed.
+            entity_type: Name of the `ProcessingItemKey.entity` field to limit items to, e.g. `github_repo_id`.
+        """
+        ...
+
+    async def renew_processing_lease(self, key: ProcessingItemKey, owner: str, lease: datetime.timedelta) -> bool:
+        """Extends the claim of `owner`. Returns False if the item is not claimed by `owner` anymore."""
         ...
 
-    async def set_next_processing_time(self, key: ProcessingItemKey, next_time: Optional[datetime.datetime]):
+    async def release_processing_item(
+            self,
+            key: ProcessingItemKey,
+            owner: str,
+            next_time: Optional[datetime.datetime],
+            error: Optional[str] = None,
+            quarantine: bool = False,
+    ):
+        """Drops the claim of `owner` and schedules the next processing. Does nothing if the claim was lost.
+
+        Args:
+            error: Failure reason, None records a successful processing and resets failures. Failed items are
+                retried with backfill priority.
+            quarantine: Excludes the item from processing until it is scheduled explicitly.
+        """
+        ...
+
+    async def next_processing_due(self, entity_type: Optional[str] = None) -> Optional[datetime.datetime]:
+        """Returns the earliest time a scheduled item can be claimed, None if nothing is scheduled."""
+        ...
+
+    async def get_processing_backlog(self, entity_type: Optional[str] = None) -> ProcessingBacklog:
+        """Returns items that are due and not claimed by a live lease, quarantined items are not counted."""
+        ...
+
+    async def listen_processing_changes(self, on_change: Callable[[], None]):
+        """Calls `on_change` whenever items are scheduled for processing, runs until cancelled.
+
+        Notifications may be coalesced or dropped while reconnecting, so listeners should still check for due items
+        from time to time. `on_change` may be called from other threads.
+        """
+        ...
+
+    async def listen_config_changes(self, on_change: Callable[[], None]):
+        """Calls `on_change` whenever the global config is updated, runs until cancelled.
+
+        `on_change` may be called from other threads.
+        """
         ...
 
     async def get_global_config(self) -> GlobalConfig:
@@ -4,21 +4,26 @@ import datetime
 import logging
 import uuid
 from abc import abstractmethod
-from typing import Optional, Callable, MutableSequence
+from typing import Optional, Callable, MutableSequence, List, Tuple
 
 from google.protobuf import timestamp
+from google.protobuf.timestamp_pb2 import Timestamp
 
 from dev_observer.api.storage.local_pb2 import LocalStorageData
 from dev_observer.api.types.config_pb2 import GlobalConfig
-from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey
+from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingItemKey, ProcessingPriority, \
+    PROCESSING_PRIORITY_SCHEDULED, PROCESSING_PRIORITY_BACKFILL
 from dev_observer.api.types.repo_pb2 import GitHubRepository, GitProperties
 from dev_observer.api.types.sites_pb2 import WebSite
-from dev_observer.storage.provider import StorageProvider, AddWebSiteData
+from dev_observer.storage.provider import StorageProvider, AddWebSiteData, ProcessingBacklog, priority_level
 from dev_observer.util import Clock, RealClock
 
 _log = logging.getLogger(__name__)
 
 _lock = asyncio.Lock()
+# Shared by all providers of the process, the server and the background processor use separate instances.
+_processing_listeners: List[Callable[[], None]] = []
+_config_listeners: List[Callable[[], None]] = []
 
 
 class SingleBlobStorageProvider(abc.ABC, StorageProvider):
@@ -65,6 +70,7 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
                 ))
 
         await self._update(up)
+        _notify(_processing_listeners)
         return repo
 
     async def update_repo_properties(self, id: str, properties: GitProperties) -> GitHubRepository:
@@ -111,6 +117,7 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
                 ))
 
         await self._update(up)
+        _notify(_processing_listeners)
         async with _lock:
             for s in self._get().web_sites:
                 if s.url == site.url:
@@ -118,15 +125,16 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
 
         raise ValueError(f"Site with url {site.url} not found after creation")
 
-    async def next_processing_item(self) -> Optional[ProcessingItem]:
+    async def next_processing_item(self, entity_type: Optional[str] = None) -> Optional[ProcessingItem]:
         now = self._clock.now()
         items = [i for i in self._get().processing_items if
-                 i.HasField("next_processing") and timestamp.to_datetime(i.next_processing,
-                                                                         tz=datetime.timezone.utc) < now]
+                 i.HasField("next_processing") and not i.no_processing and timestamp.to_datetime(
+                     i.next_processing, tz=datetime.timezone.utc) < now]
+        if entity_type is not None:
+            items = [i for i in items if i.key.WhichOneof("entity") == entity_type]
         if len(items) == 0:
             return None
-        items.sort(key=lambda item: timestamp.to_datetime(item.next_processing))
-        return items[0]
+        return min(items, key=lambda i: _queue_key(i, now))
 
     async def get_processing_items(self) -> MutableSequence[ProcessingItem]:
         return self._get().processing_items
@@ -137,7 +145,12 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
                 return i
         return None
 
-    async def set_next_processing_time(self, key: ProcessingItemKey, next_time: Optional[datetime.datetime]):
+    async def set_next_processing_time(
+            self,
+            key: ProcessingItemKey,
+            next_time: Optional[datetime.datetime],
+            priority: ProcessingPriority = PROCESSING_PRIORITY_SCHEDULED,
+    ):
         def up(d: LocalStorageData):
             found = False
             for i in d.processing_items:
@@ -147,12 +160,120 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
                         i.ClearField("next_processing")
                     else:
                         i.next_processing.CopyFrom(timestamp.from_milliseconds(int(next_time.timestamp() * 1000)))
+                        i.no_processing = False
+                        i.failures = 0
+                    i.priority = priority
 
             if not found:
-                d.processing_items.append(ProcessingItem(key=key, next_processing=next_time))
+                d.processing_items.append(ProcessingItem(key=key, next_processing=next_time, priority=priority))
+
+        await self._update(up)
+        if next_time is not None:
+            _notify(_processing_listeners)
+
+    async def claim_processing_item(
+            self,
+            owner: str,
+            lease: datetime.timedelta,
+            entity_type: Optional[str] = None,
+    ) -> Optional[ProcessingItem]:
+        now = self._clock.now()
+        claimed: List[ProcessingItem] = []
+
+        def up(d: LocalStorageData):
+            items = [i for i in d.processing_items if i.HasField("next_processing") and not i.no_processing and
+                     _to_datetime(i.next_processing) < now and not _lease_active(i, now)]
+            if entity_type is not None:
+                items = [i for i in items if i.key.WhichOneof("entity") == entity_type]
+            if len(items) == 0:
+                return
+            item = min(items, key=lambda i: _queue_key(i, now))
+            item.lease_owner = owner
+            item.lease_expires.CopyFrom(_to_timestamp(now + lease))
+            claimed.append(ProcessingItem(key=item.key))
+
+        await self._update(up)
+        if len(claimed) == 0:
+            return None
+        return await self.get_processing_item(claimed[0].key)
+
+    async def renew_processing_lease(self, key: ProcessingItemKey, owner: str, lease: datetime.timedelta) -> bool:
+        now = self._clock.now()
+        renewed: List[bool] = []
+
+        def up(d: LocalStorageData):
+            for i in d.processing_items:
+                if i.key == key and i.lease_owner == owner:
+                    i.lease_expires.CopyFrom(_to_timestamp(now + lease))
+                    renewed.append(True)
+
+        await self._update(up)
+        return len(renewed) > 0
+
+    async def release_processing_item(
+            self,
+            key: ProcessingItemKey,
+            owner: str,
+            next_time: Optional[datetime.datetime],
+            error: Optional[str] = None,
+            quarantine: bool = False,
+    ):
+        now = self._clock.now()
+
+        def up(d: LocalStorageData):
+            for i in d.processing_items:
+                if i.key == key and i.lease_owner == owner:
+                    i.ClearField("lease_owner")
+                    i.ClearField("lease_expires")
+                    if next_time is None:
+                        i.ClearField("next_processing")
+                    else:
+                        i.next_processing.CopyFrom(_to_timestamp(next_time))
+                    if error is None:
+                        i.last_processed.CopyFrom(_to_timestamp(now))
+                        i.ClearField("last_error")
+                        i.failures = 0
+                        i.priority = PROCESSING_PRIORITY_SCHEDULED
+                    else:
+                        i.last_error = error
+                        i.failures += 1
+                        i.priority = PROCESSING_PRIORITY_BACKFILL
+                    i.no_processing = quarantine
 
         await self._update(up)
 
+    async def next_processing_due(self, entity_type: Optional[str] = None) -> Optional[datetime.datetime]:
+        due: List[datetime.datetime] = []
+        for i in self._get().processing_items:
+            if not i.HasField("next_processing") or i.no_processing:
+                continue
+            if entity_type is not None and i.key.WhichOneof("entity") != entity_type:
+                continue
+            t = _to_datetime(i.next_processing)
+            if i.HasField("lease_expires"):
+                t = max(t, _to_datetime(i.lease_expires))
+            due.append(t)
+        return min(due) if len(due) > 0 else None
+
+    async def get_processing_backlog(self, entity_type: Optional[str] = None) -> ProcessingBacklog:
+        now = self._clock.now()
+        due: List[datetime.datetime] = []
+        for i in self._get().processing_items:
+            if not i.HasField("next_processing") or i.no_processing or _lease_active(i, now):
+                continue
+            if entity_type is not None and i.key.WhichOneof("entity") != entity_type:
+                continue
+            t = _to_datetime(i.next_processing)
+            if t < now:
+                due.append(t)
+        return ProcessingBacklog(due=len(due), oldest_due=min(due) if len(due) > 0 else None)
+
+    async def listen_processing_changes(self, on_change: Callable[[], None]):
+        await _listen(_processing_listeners, on_change)
+
+    async def listen_config_changes(self, on_change: Callable[[], None]):
+        await _listen(_config_listeners, on_change)
+
     async def upsert_processing_item(self, item: ProcessingItem):
         def up(d: LocalStorageData):
             if item.key in [i.key for i in d.processing_items]:
@@ -172,6 +293,7 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
             d.global_config.CopyFrom(config)
 
         data = await self._update(up)
+        _notify(_config_listeners)
         return data.global_config
 
     async def _update(self, updater: Callable[[LocalStorageData], None]) -> LocalStorageData:
@@ -188,3 +310,33 @@ class SingleBlobStorageProvider(abc.ABC, StorageProvider):
     @abstractmethod
     def _store(self, data: LocalStorageData):
         ...
+
+
+def _to_datetime(ts: Timestamp) -> datetime.datetime:
+    return timestamp.to_datetime(ts, tz=datetime.timezone.utc)
+
+
+def _to_timestamp(t: datetime.datetime) -> Timestamp:
+    return timestamp.from_milliseconds(int(t.timestamp() * 1000))
+
+
+def _lease_active(item: ProcessingItem, now: datetime.datetime) -> bool:
+    return item.HasField("lease_expires") and _to_datetime(item.lease_expires) > now
+
+
+def _queue_key(item: ProcessingItem, now: datetime.datetime) -> Tuple[int, datetime.datetime]:
+    next_processing = _to_datetime(item.next_processing)
+    return priority_level(item.priority, next_processing, now), next_processing
+
+
+async def _listen(listeners: List[Callable[[], None]], on_change: Callable[[], None]):
+    listeners.append(on_change)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        listeners.remove(on_change)
+
+
+def _notify(listeners: List[Callable[[], None]]):
+    for listener in list(listeners):
+        listener()
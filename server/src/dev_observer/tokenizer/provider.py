@@ -1,13 +1,39 @@
 from abc import abstractmethod
-from typing import Protocol, List
+from array import array
+from typing import Protocol, List, Sequence, Union
+
+# Typecode of compact token buffers: unsigned int, 4 bytes per token instead of a boxed int object.
+TOKEN_TYPECODE = "I"
+# Compact token buffer, an `array('I')` or a memoryview with the same format.
+TokenBuffer = Union[array, memoryview]
 
 
 class TokenizerProvider(Protocol):
 
+    @property
+    def name(self) -> str:
+        """Identifies the encoding, providers with the same name produce the same tokens."""
+        return type(self).__name__
+
     @abstractmethod
     def encode(self, content: str) -> List[int]:
         ...
 
     @abstractmethod
-    def decode(self, tokens: List[int]) -> str:
-        ...
\ No newline at end of file
+    def decode(self, tokens: Sequence[int]) -> str:
+        ...
+
+    def encode_buffer(self, content: str) -> TokenBuffer:
+        """Encodes content into a compact buffer of `TOKEN_TYPECODE` tokens.
+
+        Slices of the buffer can be decoded without copying through `memoryview(buffer)[start:end]`. The default
+        copies the encoded list, providers that can encode into a buffer directly should override it.
+        """
+        return array(TOKEN_TYPECODE, self.encode(content))
+
+    def count_tokens(self, content: str) -> int:
+        return len(self.encode(content))
+
+    def decode_buffer(self, tokens: memoryview | array) -> str:
+        """Decodes a token buffer or a memoryview slice of it."""
+        return self.decode(tokens)
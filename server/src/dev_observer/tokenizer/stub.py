@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Sequence
 
 from dev_observer.tokenizer.provider import TokenizerProvider
 
@@ -13,7 +13,7 @@ class StubTokenizerProvider(TokenizerProvider):
             result.append(res)
         return result
 
-    def decode(self, tokens: List[int]) -> str:
+    def decode(self, tokens: Sequence[int]) -> str:
         result: str = ""
         for c in tokens:
             tb: List[int] = []
@@ -1,9 +1,9 @@
-from typing import List
+from typing import List, Sequence
 
 import tiktoken
 from tiktoken import Encoding
 
-from dev_observer.tokenizer.provider import TokenizerProvider
+from dev_observer.tokenizer.provider import TokenizerProvider, TOKEN_TYPECODE
 
 
 class TiktokenTokenizerProvider(TokenizerProvider):
@@ -12,8 +12,19 @@ class TiktokenTokenizerProvider(TokenizerProvider):
     def __init__(self, encoding: str):
         self._encoding = tiktoken.get_encoding(encoding)
 
+    @property
+    def name(self) -> str:
+        return f"tiktoken:{self._encoding.name}"
+
     def encode(self, content: str) -> List[int]:
         return self._encoding.encode(content)
 
-    def decode(self, tokens: List[int]) -> str:
+    def decode(self, tokens: Sequence[int]) -> str:
         return self._encoding.decode(tokens)
+
+    def encode_buffer(self, content: str) -> memoryview:
+        # Encoded straight into a uint32 array, without the list of boxed ints `encode` returns.
+        return memoryview(self._encoding.encode_to_numpy(content)).cast("B").cast(TOKEN_TYPECODE)
+
+    def count_tokens(self, content: str) -> int:
+        return len(self._encoding.encode_to_numpy(content))
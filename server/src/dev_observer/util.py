@@ -1,6 +1,8 @@
+import asyncio
 import datetime
+import os
 from abc import abstractmethod
-from typing import Protocol, TypeVar, Optional
+from typing import Protocol, TypeVar, Optional, List, Awaitable
 
 from google.protobuf import json_format
 from google.protobuf.message import Message
@@ -44,3 +46,27 @@ def parse_json_pb(msg: str, m: M) -> M:
 
 def parse_dict_pb(msg: dict, m: M) -> M:
     return json_format.ParseDict(msg, m, ignore_unknown_fields=True)
+
+
+def dir_size(path: str) -> int:
+    size = 0
+    for dirpath, _, files in os.walk(path):
+        for f in files:
+            fp = os.path.join(dirpath, f)
+            if not os.path.islink(fp):
+                size += os.path.getsize(fp)
+    return size
+
+
+T = TypeVar("T")
+
+
+async def gather_limited(aws: List[Awaitable[T]], limit: int) -> List[T]:
+    """Like `asyncio.gather`, but runs at most `limit` awaitables at the same time."""
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*[run(aw) for aw in aws])
@@ -9,6 +9,7 @@ from typing import Optional, List, Dict
 from dev_observer.api.types.config_pb2 import WebsiteCrawlingConfig
 from dev_observer.flatten.flatten import FlattenResult
 from dev_observer.log import s_
+from dev_observer.metrics import STAGE_DURATION, STAGE_TOKENS
 from dev_observer.tokenizer.provider import TokenizerProvider
 from dev_observer.website.cloner import crawl_website
 from dev_observer.website.provider import WebsiteCrawlerProvider
@@ -82,7 +83,7 @@ def combine_website(website_path: str, tokenizer: TokenizerProvider, max_tokens_
 
             # Calculate tokens for this file with header
             file_content = file_header + content
-            file_tokens = len(tokenizer.encode(file_content))
+            file_tokens = tokenizer.count_tokens(file_content)
 
             file_contents.append((file_content, file_tokens))
             total_tokens += file_tokens
@@ -146,7 +147,8 @@ async def flatten_website(
         crawling_config: Optional[WebsiteCrawlingConfig] = None,
         max_tokens_per_file: int = 100_000,
 ) -> FlattenWebsiteResult:
-    crawl_result = await crawl_website(url, provider, crawling_config)
+    with STAGE_DURATION.timer(stage="crawl"):
+        crawl_result = await crawl_website(url, provider, crawling_config)
     website_path = crawl_result.path
     output_dir: Optional[str] = None
 
@@ -161,7 +163,9 @@ async def flatten_website(
         return cleaned
 
     _log.debug(s_("Combining website files..."))
-    comb_res = combine_website(website_path, tokenizer, max_tokens_per_file)
+    with STAGE_DURATION.timer(stage="website_flatten"):
+        comb_res = combine_website(website_path, tokenizer, max_tokens_per_file)
+    STAGE_TOKENS.observe(comb_res.total_tokens, stage="website_flatten")
     out_files = comb_res.output_files
     output_dir = comb_res.folder_path
     total_tokens=comb_res.total_tokens
@@ -0,0 +1,168 @@
+"""Processes due repos and websites in dedicated processes, separately from the API server.
+
+Usage:
+    python -m dev_observer.worker.main [--processes N] [--drain-timeout-sec SEC] [--metrics-port PORT]
+
+Set `processing.embedded = false` in the config of API servers, so items are processed by workers only. Workers
+share items through the storage, any number of them can run next to each other. Only postgresql storage can be
+shared: local storage serializes updates with a lock of its process and memory storage lives in the process, so
+workers refuse to start with them.
+
+On SIGTERM or SIGINT workers stop claiming items and finish items in progress for up to the drain timeout.
+
+With a metrics port, each process serves its metrics at /metrics, the first one at the given port and the
+others at the following ports.
+"""
+import argparse
+import asyncio
+import http.server
+import logging
+import multiprocessing
+import signal
+import sys
+import threading
+import time
+from typing import Optional
+
+import dev_observer.log
+from dev_observer.env_detection import detect_server_env
+from dev_observer.log import s_
+from dev_observer.metrics import REGISTRY
+from dev_observer.processors.periodic import PeriodicProcessor
+from dev_observer.server.settings_loader import load_settings
+from dev_observer.settings import Processing, Settings
+
+_log = logging.getLogger(__name__)
+
+# How often the supervisor checks worker processes.
+_POLL_SEC = 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processes due repos and websites")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Number of worker processes, processing.worker_processes from the config by default")
+    parser.add_argument("--drain-timeout-sec", type=float, default=None,
+                        help="How long items in progress are finished on stop, processing.drain_timeout_sec by default")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="First port metrics are served at, processing.worker_metrics_port by default")
+    args = parser.parse_args()
+
+    _configure_logging()
+    settings = load_settings()
+    _check_storage(settings)
+    p = settings.processing if settings.processing is not None else Processing()
+    processes = args.processes if args.processes is not None else p.worker_processes
+    drain_timeout_sec = args.drain_timeout_sec if args.drain_timeout_sec is not None else p.drain_timeout_sec
+    metrics_port = args.metrics_port if args.metrics_port is not None else p.worker_metrics_port
+    if processes <= 1:
+        _run_process(drain_timeout_sec, metrics_port)
+        return
+    sys.exit(_supervise(processes, drain_timeout_sec, metrics_port))
+
+
+def _check_storage(settings: Settings):
+    provider = settings.storage.provider if settings.storage is not None else None
+    if provider != "postgresql":
+        raise ValueError(f"Workers require postgresql storage shared with the API server, got: {provider}")
+
+
+def _supervise(processes: int, drain_timeout_sec: float, metrics_port: int) -> int:
+    """Runs worker processes until all of them exit, returns the exit code of the first failed one."""
+    # Workers don't share anything with the supervisor, spawning avoids forking its threads and connections.
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_run_process, args=(drain_timeout_sec, metrics_port + i if metrics_port > 0 else 0),
+                           name=f"worker-{i}")
+               for i in range(processes)]
+    for w in workers:
+        w.start()
+    _log.info(s_("Started worker processes", pids=[w.pid for w in workers]))
+
+    stopping = False
+
+    def stop():
+        nonlocal stopping
+        stopping = True
+        for wp in workers:
+            if wp.is_alive():
+                wp.terminate()
+
+    signal.signal(signal.SIGTERM, lambda *_: stop())
+    signal.signal(signal.SIGINT, lambda *_: stop())
+
+    exit_code = 0
+    while True:
+        alive = any(w.is_alive() for w in workers)
+        failed: Optional[multiprocessing.Process] = next((w for w in workers if w.exitcode not in (None, 0)), None)
+        if failed is not None and not stopping:
+            # Let the orchestrator restart the whole worker instead of running with fewer processes.
+            _log.error(s_("Worker process failed, stopping others", name=failed.name, exitcode=failed.exitcode))
+            exit_code = failed.exitcode if failed.exitcode > 0 else 1
+            stop()
+        if not alive:
+            break
+        time.sleep(_POLL_SEC)
+    _log.info(s_("Worker processes stopped"))
+    return exit_code
+
+
+def _run_process(drain_timeout_sec: float, metrics_port: int):
+    _configure_logging()
+    if metrics_port > 0:
+        _serve_metrics(metrics_port)
+    env = detect_server_env(load_settings())
+    asyncio.run(_run(env.periodic_processor, drain_timeout_sec))
+
+
+async def _run(processor: PeriodicProcessor, drain_timeout_sec: float):
+    loop = asyncio.get_running_loop()
+    task = asyncio.create_task(processor.run())
+    draining = False
+
+    def drain(sig: signal.Signals):
+        nonlocal draining
+        if draining:
+            return
+        draining = True
+        _log.info(s_("Draining worker", signal=sig.name, timeout_sec=drain_timeout_sec))
+        processor.stop()
+        loop.call_later(drain_timeout_sec, task.cancel)
+
+    for s in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(s, drain, s)
+    try:
+        await task
+    except asyncio.CancelledError:
+        _log.warning(s_("Drain timed out, unfinished items are picked up again once their leases expire"))
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        # Scrapes would flood the logs.
+        pass
+
+
+def _serve_metrics(port: int):
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    _log.info(s_("Serving metrics", port=port))
+
+
+def _configure_logging():
+    dev_observer.log.encoder = dev_observer.log.PlainTextEncoder()
+    logging.basicConfig(level=logging.DEBUG)
+
+
+if __name__ == "__main__":
+    main()
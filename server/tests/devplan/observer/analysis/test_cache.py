@@ -0,0 +1,63 @@
+import datetime
+import os
+import tempfile
+import unittest
+from typing import Optional
+
+from dev_observer.analysis.cache import CachingAnalysisProvider, LocalAnalysisCache, prompt_cache_key
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.prompts.stub import StubPromptsProvider
+from dev_observer.util import MockClock
+
+
+class _CountingAnalysisProvider(AnalysisProvider):
+    calls: int
+
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        self.calls += 1
+        return AnalysisResult(analysis=f"{prompt.user.text} {self.calls}")
+
+
+class TestAnalysisCache(unittest.IsolatedAsyncioTestCase):
+    async def test_reuses_identical_prompts(self):
+        delegate = _CountingAnalysisProvider()
+        provider = CachingAnalysisProvider(delegate, LocalAnalysisCache(tempfile.mkdtemp(), 1024 * 1024))
+        prompt = await StubPromptsProvider().get_formatted("p")
+
+        first = await provider.analyze(prompt, "s1")
+        second = await provider.analyze(await StubPromptsProvider().get_formatted("p"), "s2")
+        self.assertEqual(first.analysis, second.analysis)
+        self.assertEqual(1, delegate.calls)
+
+        prompt.config.model.model_name = "other"
+        await provider.analyze(prompt)
+        self.assertEqual(2, delegate.calls)
+
+    async def test_expires_entries(self):
+        clock = MockClock()
+        cache = LocalAnalysisCache(tempfile.mkdtemp(), 1024 * 1024, ttl_sec=60, clock=clock)
+        await cache.put("k", "v")
+        self.assertEqual("v", await cache.get("k"))
+        clock.bump(datetime.timedelta(seconds=61))
+        self.assertIsNone(await cache.get("k"))
+
+    async def test_evicts_least_recently_used(self):
+        root = tempfile.mkdtemp()
+        cache = LocalAnalysisCache(root, 200)
+        await cache.put("a", "x" * 50)
+        await cache.put("b", "x" * 50)
+        os.utime(os.path.join(root, "a.json"), (1, 1))
+        await cache.put("c", "x" * 50)
+        self.assertIsNone(await cache.get("a"))
+        self.assertIsNotNone(await cache.get("b"))
+        self.assertIsNotNone(await cache.get("c"))
+
+    async def test_key_depends_on_messages(self):
+        prompt = await StubPromptsProvider().get_formatted("p")
+        key = prompt_cache_key(prompt)
+        prompt.user.text = "changed"
+        self.assertNotEqual(key, prompt_cache_key(prompt))
@@ -0,0 +1,135 @@
+import asyncio
+import unittest
+from typing import Optional
+
+from dev_observer.analysis.limiter import AdaptiveLimiter, is_rate_limit_error, LimitingAnalysisProvider
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.api.types.ai_pb2 import PromptConfig
+from dev_observer.processors.tokenized import TokenizedAnalyzer
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.prompts.stub import StubPromptsProvider
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class _Wrapped(Exception):
+    pass
+
+
+class TestAdaptiveLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_concurrency(self):
+        limiter = AdaptiveLimiter(3)
+        running = 0
+        max_running = 0
+
+        async def call() -> int:
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 1
+
+        results = await asyncio.gather(*[limiter.run(call) for _ in range(10)])
+        self.assertEqual([1] * 10, results)
+        self.assertEqual(3, max_running)
+
+    async def test_backs_off_and_recovers(self):
+        limiter = AdaptiveLimiter(8, backoff_sec=0)
+        failed = set()
+
+        async def call(i: int) -> str:
+            await asyncio.sleep(0)
+            if i not in failed:
+                failed.add(i)
+                raise RateLimitError()
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*[limiter.run(lambda i=i: call(i)) for i in range(8)])
+        self.assertEqual(["ok"] * 8, results)
+        # Failures of calls started together halve the limit once: 8 -> 4, then 4 successes raise it to 5.
+        self.assertEqual(5, limiter.limit)
+
+        await asyncio.gather(*[limiter.run(lambda: asyncio.sleep(0)) for _ in range(30)])
+        self.assertEqual(8, limiter.limit)
+
+    async def test_gives_up_after_retries(self):
+        limiter = AdaptiveLimiter(2, max_retries=2, backoff_sec=0)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            raise RateLimitError()
+
+        with self.assertRaises(RateLimitError):
+            await limiter.run(call)
+        self.assertEqual(3, calls)
+        self.assertEqual(1, limiter.limit)
+
+    async def test_does_not_retry_other_errors(self):
+        limiter = AdaptiveLimiter(2, backoff_sec=0)
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            raise ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            await limiter.run(call)
+        self.assertEqual(1, calls)
+        self.assertEqual(2, limiter.limit)
+
+    def test_is_rate_limit_error(self):
+        self.assertTrue(is_rate_limit_error(RateLimitError()))
+        try:
+            try:
+                raise RateLimitError()
+            except RateLimitError as e:
+                raise _Wrapped() from e
+        except _Wrapped as wrapped:
+            self.assertTrue(is_rate_limit_error(wrapped))
+        self.assertFalse(is_rate_limit_error(ValueError("429")))
+        try:
+            try:
+                raise RateLimitError()
+            except RateLimitError:
+                # Raised while handling the rate limit, but not caused by it.
+                raise _Wrapped()
+        except _Wrapped as unrelated:
+            self.assertFalse(is_rate_limit_error(unrelated))
+
+
+class _FlakyAnalysisProvider(AnalysisProvider):
+    rate_limited: int
+
+    def __init__(self, rate_limited: int):
+        self.rate_limited = rate_limited
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        await asyncio.sleep(0)
+        if self.rate_limited > 0:
+            self.rate_limited -= 1
+            raise RateLimitError()
+        return AnalysisResult(analysis="ok")
+
+
+class TestLimitingAnalysisProvider(unittest.IsolatedAsyncioTestCase):
+    async def test_rate_limit_throttles_all_callers(self):
+        provider = LimitingAnalysisProvider(_FlakyAnalysisProvider(rate_limited=1), max_concurrency=4)
+        provider.limiter = AdaptiveLimiter(4, backoff_sec=0)
+        prompt = FormattedPrompt(config=PromptConfig(), system=None, user=None)
+        first = TokenizedAnalyzer("a", provider, StubPromptsProvider(), max_concurrency=4)
+        second = TokenizedAnalyzer("b", provider, StubPromptsProvider(), max_concurrency=4)
+        results = await asyncio.gather(
+            provider.analyze(prompt),
+            first.analyze_update("prev", "diff", "first"),
+            second.analyze_update("prev", "diff", "second"),
+        )
+        self.assertEqual(["ok", "ok", "ok"], [results[0].analysis, results[1], results[2]])
+        # All callers share the limiter lowered by the rate limit, it's raised back gradually.
+        self.assertLess(provider.limiter.limit, 4)
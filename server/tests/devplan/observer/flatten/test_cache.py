@@ -0,0 +1,130 @@
+import json
+import os
+import tempfile
+import unittest
+from typing import Optional
+
+from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.api.types.repo_pb2 import GitHubRepository
+from dev_observer.flatten.cache import FlattenCache, flatten_cache_key
+from dev_observer.flatten.flatten import flatten_repository
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
+from dev_observer.repository.types import ObservedRepo
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+
+
+class _TestRepositoryProvider(GitRepositoryProvider):
+    clones: int = 0
+
+    async def get_repo(self, repo: ObservedRepo) -> RepositoryInfo:
+        return RepositoryInfo(owner="o", name="n", clone_url=repo.url, size_kb=1)
+
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        self.clones += 1
+        with open(os.path.join(dest, "main.py"), 'w') as f:
+            f.write("print('hi')\n")
+
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        return "abc"
+
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        return None
+
+
+def _write(path: str, content: str) -> str:
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+class TestFlattenCache(unittest.TestCase):
+    def setUp(self):
+        self.src = tempfile.mkdtemp()
+        self.cache = FlattenCache(tempfile.mkdtemp(), max_size_bytes=200)
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get("k1"))
+        full = _write(os.path.join(self.src, "full.md"), "full")
+        chunk = _write(os.path.join(self.src, "chunk_0.md"), "chunk")
+        self.cache.put("k1", full, [chunk], 10)
+        cached = self.cache.get("k1")
+        self.assertEqual(10, cached.total_tokens)
+        with open(cached.full_file_path) as f:
+            self.assertEqual("full", f.read())
+        self.assertEqual(1, len(cached.file_paths))
+        with open(cached.file_paths[0]) as f:
+            self.assertEqual("chunk", f.read())
+
+    def test_evicts_least_recently_used(self):
+        f1 = _write(os.path.join(self.src, "1.md"), "a" * 80)
+        f2 = _write(os.path.join(self.src, "2.md"), "b" * 80)
+        f3 = _write(os.path.join(self.src, "3.md"), "c" * 80)
+        self.cache.put("k1", f1, [], 1)
+        self.cache.release("k1")
+        self.cache.put("k2", f2, [], 1)
+        self.cache.release("k2")
+        os.utime(os.path.join(self.cache._dir, "k2", "meta.json"), (0, 0))
+        self.cache.put("k3", f3, [], 1)
+        self.assertIsNone(self.cache.get("k2"))
+        self.assertIsNotNone(self.cache.get("k1"))
+        self.assertIsNotNone(self.cache.get("k3"))
+
+    def test_keeps_entries_in_use_by_other_processes(self):
+        # Another process sharing the cache root, with its own pins.
+        other = FlattenCache(self.cache._dir, max_size_bytes=200)
+        f1 = _write(os.path.join(self.src, "1.md"), "a" * 150)
+        f2 = _write(os.path.join(self.src, "2.md"), "b" * 150)
+        other.put("k1", f1, [], 1)
+        self.cache.put("k2", f2, [], 1)
+        self.assertIsNotNone(self.cache.get("k1"))
+        self.cache.release("k1")
+
+        other.release("k1")
+        self.cache.release("k2")
+        os.utime(os.path.join(self.cache._dir, "k1", "meta.json"), (0, 0))
+        self.cache.evict()
+        self.assertIsNone(self.cache.get("k1"))
+        self.assertIsNotNone(other.get("k2"))
+
+    def test_key_depends_on_config(self):
+        config = RepoAnalysisConfig.Flatten(max_tokens_per_chunk=1)
+        key = flatten_cache_key("abc", config, False, "t1")
+        self.assertEqual(key, flatten_cache_key("abc", RepoAnalysisConfig.Flatten(max_tokens_per_chunk=1), False, "t1"))
+        other_config = RepoAnalysisConfig.Flatten(max_tokens_per_chunk=2)
+        self.assertNotEqual(key, flatten_cache_key("abc", other_config, False, "t1"))
+        self.assertNotEqual(key, flatten_cache_key("abc", config, True, "t1"))
+        self.assertNotEqual(key, flatten_cache_key("abc", config, False, "t2"))
+
+    def test_evicts_by_recorded_sizes(self):
+        f1 = _write(os.path.join(self.src, "1.md"), "a" * 120)
+        self.cache.put("k1", f1, [], 1)
+        self.cache.release("k1")
+        meta_path = os.path.join(self.cache._dir, "k1", "meta.json")
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.assertEqual(120, meta["size_bytes"])
+        # Sizes of entries are not walked on eviction.
+        meta["size_bytes"] = 1000
+        with open(meta_path, 'w') as f:
+            json.dump(meta, f)
+        self.cache.evict()
+        self.assertIsNone(self.cache.get("k1"))
+
+
+class TestFlattenRepositoryCache(unittest.IsolatedAsyncioTestCase):
+    async def test_skips_clone_on_hit(self):
+        provider = _TestRepositoryProvider()
+        cache = FlattenCache(tempfile.mkdtemp(), max_size_bytes=1_000_000)
+        config = GlobalConfig(repo_analysis=RepoAnalysisConfig(
+            flatten=RepoAnalysisConfig.Flatten(flattener="native", max_repo_size_mb=1, max_tokens_per_chunk=1000),
+        ))
+        repo = ObservedRepo(url="https://github.com/o/n", github_repo=GitHubRepository())
+        first = await flatten_repository(repo, provider, StubTokenizerProvider(), config, cache)
+        first.flatten_result.close()
+        second = await flatten_repository(repo, provider, StubTokenizerProvider(), config, cache)
+        second.flatten_result.close()
+
+        self.assertEqual(1, provider.clones)
+        self.assertEqual(first.flatten_result.full_file_path, second.flatten_result.full_file_path)
+        self.assertEqual(first.flatten_result.total_tokens, second.flatten_result.total_tokens)
+        self.assertTrue(os.path.exists(second.flatten_result.full_file_path))
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.flatten.flatten import combine_repository
+from dev_observer.flatten.ignore import IgnoreRules
+from dev_observer.flatten.packing import iter_section_bounds
+from dev_observer.repository.provider import RepositoryInfo
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+
+
+class TestIgnoreRules(unittest.TestCase):
+    def test_patterns(self):
+        rules = IgnoreRules()
+        rules.add_all(["*.log", "/build", "docs/**", "cache/", "!keep.log"])
+        self.assertTrue(rules.is_ignored("a.log", False))
+        self.assertTrue(rules.is_ignored("x/y/a.log", False))
+        self.assertFalse(rules.is_ignored("keep.log", False))
+        self.assertTrue(rules.is_ignored("build", True))
+        self.assertFalse(rules.is_ignored("src/build", True))
+        self.assertTrue(rules.is_ignored("docs/a/b.md", False))
+        self.assertTrue(rules.is_ignored("x/cache", True))
+        self.assertFalse(rules.is_ignored("x/cache", False))
+
+    def test_nested_base(self):
+        rules = IgnoreRules()
+        rules.add("/gen", "sub")
+        rules.add("*.tmp", "sub")
+        self.assertTrue(rules.is_ignored("sub/gen", True))
+        self.assertFalse(rules.is_ignored("gen", True))
+        self.assertTrue(rules.is_ignored("sub/x/a.tmp", False))
+        self.assertFalse(rules.is_ignored("a.tmp", False))
+
+
+class TestNativeFlatten(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self._write("README.md", "# Readme\n")
+        self._write("src/main.py", "print('hi')\n")
+        self._write("src/doc.md", "```py\nx = 1\n```\n")
+        self._write("src/gen/out.py", "generated\n")
+        self._write("src/.gitignore", "gen/\n")
+        self._write("debug.log", "log\n")
+        self._write("big.txt", "b" * 200)
+        self._write("skip.txt", "skip\n")
+        with open(os.path.join(self.dir, "image.bin"), 'wb') as f:
+            f.write(b"\x89PNG\0\0\0")
+
+    def _write(self, rel: str, content: str):
+        path = os.path.join(self.dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    async def test_combine_native(self):
+        config = GlobalConfig(repo_analysis=RepoAnalysisConfig(flatten=RepoAnalysisConfig.Flatten(
+            flattener="native",
+            max_file_size_bytes=100,
+            ignore_pattern="skip.txt",
+        )))
+        info = RepositoryInfo(owner="o", name="n", clone_url="", size_kb=1)
+        res = await combine_repository(self.dir, info, config, StubTokenizerProvider())
+        self.assertEqual(["README.md", "src/.gitignore", "src/doc.md", "src/main.py"], sorted(res.file_tokens))
+        with open(res.file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        # Counts cover the whole section of the file, as it is split from the combined file.
+        section = "## File: src/main.py\n```python\nprint('hi')\n```\n\n"
+        self.assertEqual(len(StubTokenizerProvider().encode(section)), res.file_tokens["src/main.py"])
+        self.assertIn("## File: src/main.py\n```python\nprint('hi')\n```\n", content)
+        self.assertIn("## File: src/doc.md\n````markdown\n```py\nx = 1\n```\n````\n", content)
+        self.assertIn("# Directory Structure\n```\nsrc/\n  .gitignore\n  doc.md\n  main.py\nREADME.md\n```", content)
+        self.assertEqual(os.path.getsize(res.file_path), res.size_bytes)
+
+        # Summary and each of the 4 files are separate sections.
+        with open(res.file_path, 'rb') as f:
+            self.assertEqual(5, len(list(iter_section_bounds(f, "markdown"))))
+
+    async def test_unsupported_style(self):
+        config = GlobalConfig(repo_analysis=RepoAnalysisConfig(flatten=RepoAnalysisConfig.Flatten(
+            flattener="native", out_style="xml",
+        )))
+        info = RepositoryInfo(owner="o", name="n", clone_url="", size_kb=1)
+        with self.assertRaises(ValueError):
+            await combine_repository(self.dir, info, config, StubTokenizerProvider())
@@ -0,0 +1,144 @@
+import io
+import os
+import tempfile
+import unittest
+from typing import List
+
+import tiktoken
+from tiktoken.registry import ENCODINGS
+
+from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.flatten.flatten import _tokenize_file, _read_blocks
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+from dev_observer.tokenizer.tiktoken import TiktokenTokenizerProvider
+
+
+def _config(max_tokens: int, style: str = "") -> GlobalConfig:
+    return GlobalConfig(repo_analysis=RepoAnalysisConfig(
+        flatten=RepoAnalysisConfig.Flatten(max_tokens_per_chunk=max_tokens, out_style=style),
+    ))
+
+
+class _RecordingTokenizer(StubTokenizerProvider):
+    encoded: List[str]
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, content: str) -> List[int]:
+        self.encoded.append(content)
+        return super().encode(content)
+
+
+def _bytes_tokenizer() -> TiktokenTokenizerProvider:
+    # Registered up front, real encodings are downloaded on first use.
+    ENCODINGS.setdefault("test_bytes", tiktoken.Encoding(
+        "test_bytes", pat_str=r"\S+|\s+", mergeable_ranks={bytes([i]): i for i in range(256)}, special_tokens={},
+    ))
+    return TiktokenTokenizerProvider("test_bytes")
+
+
+class TestTokenizeFile(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file = os.path.join(self.dir, "full.md")
+
+    def _write(self, content: str):
+        with open(self.file, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def test_fits_single_chunk(self):
+        self._write("abc\ndef\n")
+        res = _tokenize_file(self.file, self.dir, StubTokenizerProvider(), _config(8))
+        self.assertEqual(8, res.total_tokens)
+        self.assertEqual([], res.file_paths)
+
+    def test_splits_plain_by_max_tokens(self):
+        self._write("line\n" * 10)
+        res = _tokenize_file(self.file, self.dir, StubTokenizerProvider(), _config(20, "plain"))
+        self.assertEqual(50, res.total_tokens)
+        self.assertEqual(
+            [os.path.join(self.dir, f"chunk_{i}.md") for i in range(3)],
+            res.file_paths,
+        )
+        for p in res.file_paths:
+            self.assertTrue(os.path.exists(p))
+
+    def test_packs_markdown_files(self):
+        summary = "# Files\n\n"
+        a = "## File: a.py\n```py\n" + "a" * 60 + "\n```\n\n"
+        b = "## File: b.py\n````md\n## File: fake\n```\n````\n\n"
+        c = "## File: c.py\n```py\n" + "c" * 20 + "\n```\n\n"
+        self._write(summary + a + b + c)
+        max_tokens = len(a) + len(summary)
+        res = _tokenize_file(self.file, self.dir, StubTokenizerProvider(), _config(max_tokens))
+        self.assertEqual(len(summary + a + b + c), res.total_tokens)
+        self.assertEqual(2, len(res.file_paths))
+        with open(res.file_paths[0], 'r', encoding='utf-8') as f:
+            self.assertEqual(summary + a, f.read())
+        with open(res.file_paths[1], 'r', encoding='utf-8') as f:
+            self.assertEqual(b + c, f.read())
+
+    def test_uses_counted_file_tokens(self):
+        summary = "# Files\n\n"
+        a = "## File: a.py\n```py\n" + "a" * 60 + "\n```\n\n"
+        c = "## File: c.py\n```py\n" + "c" * 20 + "\n```\n\n"
+        self._write(summary + a + c)
+        tokenizer = _RecordingTokenizer()
+        # Sections counted by the flattener are not tokenized again, the summary is.
+        file_tokens = {"a.py": len(a), "c.py": len(c)}
+        res = _tokenize_file(self.file, self.dir, tokenizer, _config(len(a)), file_tokens)
+        self.assertEqual(len(summary + a + c), res.total_tokens)
+        self.assertEqual([summary], tokenizer.encoded)
+        self.assertEqual(2, len(res.file_paths))
+
+    def test_splits_only_oversized_xml_files(self):
+        a = '<file path="a.py">\n' + "a" * 10 + "\n</file>\n"
+        b = '<file path="b.py">\n' + "b" * 84 + "\n</file>\n"
+        self._write(a + b)
+        res = _tokenize_file(self.file, self.dir, StubTokenizerProvider(), _config(50, "xml"))
+        self.assertEqual(len(a + b), res.total_tokens)
+        # b.py is split in 3 pieces, the last one shares a chunk with a.py.
+        self.assertEqual(3, len(res.file_paths))
+        contents = []
+        for path in res.file_paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                contents.append(f.read())
+        self.assertTrue(contents[2].startswith(a))
+        tokenizer = StubTokenizerProvider()
+        self.assertEqual(tokenizer.decode(tokenizer.encode(b)), contents[0] + contents[1] + contents[2][len(a):])
+        # Spilled pieces don't outlive tokenization.
+        self.assertEqual(sorted(["full.md"] + [os.path.basename(p) for p in res.file_paths]), sorted(os.listdir(self.dir)))
+
+    def test_invalid_max_tokens(self):
+        self._write("abc")
+        with self.assertRaises(ValueError):
+            _tokenize_file(self.file, self.dir, StubTokenizerProvider(), _config(-1))
+
+    def test_read_blocks_ends_on_line(self):
+        blocks = list(_read_blocks(io.StringIO("aaaa\nbb\ncccccc\nd"), block_chars=3))
+        self.assertEqual(["aaaa\n", "bb\n", "cccccc\n", "d"], blocks)
+
+    def test_token_buffer_slices(self):
+        tokenizer = StubTokenizerProvider()
+        buf = tokenizer.encode_buffer("abcdef")
+        self.assertEqual("I", buf.typecode)
+        self.assertEqual(tokenizer.decode(tokenizer.encode("cde")), tokenizer.decode_buffer(memoryview(buf)[2:5]))
+
+    def test_tiktoken_buffer(self):
+        tokenizer = _bytes_tokenizer()
+        buf = tokenizer.encode_buffer("abcdef")
+        self.assertEqual("I", buf.format)
+        self.assertEqual(tokenizer.encode("abcdef"), buf.tolist())
+        self.assertEqual("cde", tokenizer.decode_buffer(buf[2:5]))
+        self.assertEqual(6, tokenizer.count_tokens("abcdef"))
+
+    def test_splits_by_tokens_with_tiktoken(self):
+        self._write("a" * 25)
+        res = _tokenize_file(self.file, self.dir, _bytes_tokenizer(), _config(10, "plain"))
+        self.assertEqual(25, res.total_tokens)
+        contents = []
+        for path in res.file_paths:
+            with open(path) as f:
+                contents.append(f.read())
+        self.assertEqual(["a" * 10, "a" * 10, "a" * 5], contents)
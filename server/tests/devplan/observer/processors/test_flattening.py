@@ -0,0 +1,108 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from typing import Optional, List
+
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.api.types.config_pb2 import GlobalConfig, AnalysisConfig
+from dev_observer.api.types.observations_pb2 import ObservationKey
+from dev_observer.flatten.flatten import FlattenResult
+from dev_observer.observations.local import LocalObservationsProvider
+from dev_observer.processors.flattening import FlatteningProcessor, ObservationRequest
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.prompts.stub import StubPromptsProvider
+
+
+class _SlowAnalysisProvider(AnalysisProvider):
+    running: int = 0
+    max_running: int = 0
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.05)
+            if prompt.user.text.startswith("fail"):
+                raise RuntimeError("analysis failed")
+            return AnalysisResult(analysis=prompt.user.text)
+        finally:
+            self.running -= 1
+
+
+class _NamePromptsProvider(StubPromptsProvider):
+    async def get_formatted(self, name: str, params=None) -> FormattedPrompt:
+        prompt = await super().get_formatted(name, params)
+        prompt.user.text = name
+        return prompt
+
+
+class _TestProcessor(FlatteningProcessor[str]):
+    async def get_flatten(self, entity: str, config: GlobalConfig) -> FlattenResult:
+        path = os.path.join(tempfile.mkdtemp(), "full.md")
+        with open(path, 'w') as f:
+            f.write(entity)
+        return FlattenResult(full_file_path=path, file_paths=[], total_tokens=1, clean_up=lambda: True)
+
+
+class _RecordingAnalysisProvider(AnalysisProvider):
+    calls: List[str]
+
+    def __init__(self):
+        self.calls = []
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        self.calls.append(prompt.user.text)
+        return AnalysisResult(analysis=f"digest of {prompt.user.text}")
+
+
+class _ContentPromptsProvider(StubPromptsProvider):
+    async def get_formatted(self, name: str, params=None) -> FormattedPrompt:
+        prompt = await super().get_formatted(name, params)
+        prompt.user.text = f"{name}: {params['content']}"
+        return prompt
+
+
+class _ChunkedProcessor(FlatteningProcessor[str]):
+    async def get_flatten(self, entity: str, config: GlobalConfig) -> FlattenResult:
+        folder = tempfile.mkdtemp()
+        paths = []
+        for i in range(3):
+            path = os.path.join(folder, f"chunk_{i}.md")
+            with open(path, 'w') as f:
+                f.write(f"chunk {i}")
+            paths.append(path)
+        return FlattenResult(full_file_path="", file_paths=paths, total_tokens=3, clean_up=lambda: True)
+
+
+class TestFlatteningProcessor(unittest.IsolatedAsyncioTestCase):
+    async def test_runs_analyzers_concurrently(self):
+        analysis = _SlowAnalysisProvider()
+        observations = LocalObservationsProvider(tempfile.mkdtemp())
+        processor = _TestProcessor(analysis, _NamePromptsProvider(), observations)
+        requests = [
+            ObservationRequest(prompt_prefix=p, key=ObservationKey(kind="test", name=p, key=f"e/{p}"))
+            for p in ["a", "b", "fail", "c", "d"]
+        ]
+        config = GlobalConfig(analysis=AnalysisConfig(max_concurrent_analyzers=3))
+        await processor.process("entity", requests, config)
+
+        self.assertEqual(3, analysis.max_running)
+        stored = sorted(k.name for k in await observations.list("test"))
+        self.assertEqual(["a", "b", "c", "d"], stored)
+
+    async def test_shares_chunk_digests(self):
+        analysis = _RecordingAnalysisProvider()
+        observations = LocalObservationsProvider(tempfile.mkdtemp())
+        processor = _ChunkedProcessor(analysis, _ContentPromptsProvider(), observations)
+        requests = [
+            ObservationRequest(prompt_prefix=p, key=ObservationKey(kind="test", name=p, key=f"e/{p}"))
+            for p in ["a", "b"]
+        ]
+        config = GlobalConfig(analysis=AnalysisConfig(chunk_digest_prompt="digest_chunk"))
+        await processor.process("entity", requests, config)
+
+        digests = [c for c in analysis.calls if c.startswith("digest_chunk")]
+        self.assertEqual(["digest_chunk: chunk 0", "digest_chunk: chunk 1", "digest_chunk: chunk 2"], sorted(digests))
+        chunk_calls = sorted(c for c in analysis.calls if c.startswith("a_analyze_chunk"))
+        self.assertEqual([f"a_analyze_chunk: digest of digest_chunk: chunk {i}" for i in range(3)], chunk_calls)
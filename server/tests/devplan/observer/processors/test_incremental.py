@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+from typing import Optional, Dict, List, Set
+
+from dev_observer.analysis.stub import StubAnalysisProvider
+from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.api.types.observations_pb2 import ObservationKey
+from dev_observer.api.types.repo_pb2 import GitHubRepository
+from dev_observer.flatten.ignore import IgnoreRules
+from dev_observer.observations.local import LocalObservationsProvider
+from dev_observer.processors.flattening import ObservationRequest
+from dev_observer.processors.repos import ReposProcessor, filter_diff
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.prompts.stub import StubPromptsProvider
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
+from dev_observer.repository.types import ObservedRepo
+from dev_observer.storage.local import LocalStorageProvider
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+
+
+class _TestRepositoryProvider(GitRepositoryProvider):
+    head: str = "c1"
+    diff: Optional[str] = None
+    clones: int = 0
+
+    async def get_repo(self, repo: ObservedRepo) -> RepositoryInfo:
+        return RepositoryInfo(owner="o", name="n", clone_url=repo.url, size_kb=1)
+
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        self.clones += 1
+        with open(os.path.join(dest, "main.py"), 'w') as f:
+            f.write("print('hi')\n")
+
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        return self.head
+
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        return self.diff
+
+
+class _RecordingPromptsProvider(StubPromptsProvider):
+    names: List[str]
+    version: str = "v1"
+    missing: Set[str]
+
+    def __init__(self):
+        self.names = []
+        self.missing = set()
+
+    async def get_formatted(self, name: str, params: Optional[Dict[str, str]] = None) -> FormattedPrompt:
+        if name in self.missing:
+            raise FileNotFoundError(name)
+        # Only prompts formatted for the analysis are recorded, not lookups of templates.
+        if params is not None:
+            self.names.append(name)
+        prompt = await super().get_formatted(name, params)
+        prompt.system.text += self.version
+        return prompt
+
+
+class TestIncrementalAnalysis(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.storage = LocalStorageProvider(tempfile.mkdtemp())
+        self.gh_repo = await self.storage.add_github_repo(GitHubRepository(
+            id="incremental", name="n", full_name="o/n", url="https://github.com/o/n",
+        ))
+        self.repository = _TestRepositoryProvider()
+        self.prompts = _RecordingPromptsProvider()
+        self.processor = ReposProcessor(
+            analysis=StubAnalysisProvider(),
+            repository=self.repository,
+            prompts=self.prompts,
+            observations=LocalObservationsProvider(tempfile.mkdtemp()),
+            tokenizer=StubTokenizerProvider(),
+            storage=self.storage,
+        )
+        self.config = GlobalConfig(repo_analysis=RepoAnalysisConfig(
+            incremental=True,
+            incremental_max_diff_tokens=100,
+            flatten=RepoAnalysisConfig.Flatten(flattener="native", max_repo_size_mb=1, max_tokens_per_chunk=10_000),
+        ))
+        key = ObservationKey(kind="repos", name="a.md", key="o/n/a.md")
+        self.requests = [ObservationRequest(prompt_prefix="p", key=key)]
+
+    async def _process(self):
+        repo = ObservedRepo(url=self.gh_repo.url, github_repo=await self.storage.get_github_repo(self.gh_repo.id))
+        await self.processor.process(repo, self.requests, self.config)
+
+    async def test_incremental(self):
+        await self._process()
+        self.assertEqual(1, self.repository.clones)
+        self.assertEqual(["p_analyze_full"], self.prompts.names)
+        stored = await self.storage.get_github_repo(self.gh_repo.id)
+        self.assertEqual("c1", stored.properties.observed_commits[0].commit)
+
+        # Same commit, nothing to do.
+        await self._process()
+        self.assertEqual(1, self.repository.clones)
+        self.assertEqual(1, len(self.prompts.names))
+
+        self.repository.head = "c2"
+        self.repository.diff = "+x = 1\n"
+        await self._process()
+        self.assertEqual(1, self.repository.clones)
+        self.assertEqual(["p_analyze_full", "p_analyze_update"], self.prompts.names)
+        stored = await self.storage.get_github_repo(self.gh_repo.id)
+        self.assertEqual("c2", stored.properties.observed_commits[0].commit)
+
+        # Diff over the token threshold falls back to the full analysis.
+        self.repository.head = "c3"
+        self.repository.diff = "+" * 200
+        await self._process()
+        self.assertEqual(2, self.repository.clones)
+        self.assertEqual("p_analyze_full", self.prompts.names[-1])
+        stored = await self.storage.get_github_repo(self.gh_repo.id)
+        self.assertEqual(1, len(stored.properties.observed_commits))
+        self.assertEqual("c3", stored.properties.observed_commits[0].commit)
+
+    async def test_reanalyzes_same_commit_after_prompt_change(self):
+        await self._process()
+        await self._process()
+        self.assertEqual(["p_analyze_full"], self.prompts.names)
+
+        self.prompts.version = "v2"
+        await self._process()
+        self.assertEqual(2, self.repository.clones)
+        self.assertEqual(["p_analyze_full", "p_analyze_full"], self.prompts.names)
+
+        # The new fingerprint is recorded, so the next run is up to date again.
+        await self._process()
+        self.assertEqual(2, len(self.prompts.names))
+
+    async def test_full_analysis_without_update_prompt(self):
+        self.prompts.missing.add("p_analyze_update")
+        await self._process()
+        self.repository.head = "c2"
+        self.repository.diff = "+x = 1\n"
+        await self._process()
+        self.assertEqual(2, self.repository.clones)
+        self.assertEqual(["p_analyze_full", "p_analyze_full"], self.prompts.names)
+        stored = await self.storage.get_github_repo(self.gh_repo.id)
+        self.assertEqual("c2", stored.properties.observed_commits[0].commit)
+
+    async def test_ignores_changes_of_ignored_files(self):
+        self.config.repo_analysis.flatten.ignore_pattern = "vendor/"
+        await self._process()
+        self.repository.head = "c2"
+        self.repository.diff = _file_diff("uv.lock", "+" * 200) + _file_diff("vendor/lib.js", "+x")
+        await self._process()
+        # Only ignored files changed, nothing to analyze.
+        self.assertEqual(1, self.repository.clones)
+        self.assertEqual(["p_analyze_full"], self.prompts.names)
+        stored = await self.storage.get_github_repo(self.gh_repo.id)
+        self.assertEqual("c2", stored.properties.observed_commits[0].commit)
+
+    def test_filter_diff(self):
+        rules = IgnoreRules()
+        rules.add_all(["*.lock", "vendor/"])
+        main = _file_diff("main.py", "+x = 1")
+        diff = _file_diff("uv.lock", "+a") + main + _file_diff("vendor/lib.js", "+b")
+        self.assertEqual(main, filter_diff(diff, rules))
+        # Renames out of ignored paths are kept.
+        renamed = "diff --git a/vendor/lib.js b/lib.js\n--- a/vendor/lib.js\n+++ b/lib.js\n"
+        self.assertEqual(renamed, filter_diff(renamed, rules))
+
+
+def _file_diff(path: str, patch: str) -> str:
+    return f"diff --git a/{path} b/{path}\n--- a/{path}\n+++ b/{path}\n{patch}\n"
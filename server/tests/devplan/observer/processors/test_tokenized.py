@@ -0,0 +1,156 @@
+import asyncio
+import dataclasses
+import os
+import tempfile
+import unittest
+from typing import Optional, List
+
+from dev_observer.analysis.provider import AnalysisProvider, AnalysisResult
+from dev_observer.flatten.flatten import FlattenResult
+from dev_observer.metrics import REGISTRY
+from dev_observer.processors.tokenized import TokenizedAnalyzer
+from dev_observer.prompts.provider import FormattedPrompt
+from dev_observer.prompts.stub import StubPromptsProvider
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+
+
+class _CountingAnalysisProvider(AnalysisProvider):
+    calls: List[str]
+
+    def __init__(self):
+        self.calls = []
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        self.calls.append(prompt.user.text)
+        return AnalysisResult(analysis="s" * 10, input_tokens=1000, output_tokens=10)
+
+
+class _EchoAnalysisProvider(AnalysisProvider):
+    running: int
+    max_running: int
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def analyze(self, prompt: FormattedPrompt, session_id: Optional[str] = None) -> AnalysisResult:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        text = prompt.user.text
+        # Later chunks finish first.
+        await asyncio.sleep(0.01 if text.startswith("chunk") and text[-1] < "4" else 0)
+        self.running -= 1
+        return AnalysisResult(analysis=text)
+
+
+class _NamePromptsProvider(StubPromptsProvider):
+    async def get_formatted(self, name: str, params=None) -> FormattedPrompt:
+        prompt = await super().get_formatted(name, params)
+        prompt.user.text = name
+        return prompt
+
+
+class _ContentPromptsProvider(StubPromptsProvider):
+    async def get_formatted(self, name: str, params=None) -> FormattedPrompt:
+        prompt = await super().get_formatted(name, params)
+        prompt.user.text = params["content"]
+        return prompt
+
+
+def _rendered_value(sample: str) -> float:
+    line = next((l for l in REGISTRY.render().splitlines() if l.startswith(sample + " ")), None)
+    return 0 if line is None else float(line.split(" ")[1])
+
+
+class TestTokenizedAnalyzer(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(8):
+            path = os.path.join(self.dir, f"chunk_{i}.md")
+            with open(path, 'w') as f:
+                f.write(f"chunk {i}")
+            self.paths.append(path)
+        self.res = FlattenResult(full_file_path="", file_paths=self.paths, total_tokens=0, clean_up=lambda: False)
+
+    async def _analyze(self, max_combine_tokens: int) -> List[str]:
+        analysis = _CountingAnalysisProvider()
+        analyzer = TokenizedAnalyzer(
+            prompts_prefix="p",
+            analysis=analysis,
+            prompts=_NamePromptsProvider(),
+            tokenizer=StubTokenizerProvider(),
+            max_combine_tokens=max_combine_tokens,
+            max_concurrency=3,
+        )
+        await analyzer.analyze_flatten(self.res)
+        return analysis.calls
+
+    async def test_combines_all_at_once(self):
+        calls = await self._analyze(0)
+        self.assertEqual(8, calls.count("p_analyze_chunk"))
+        self.assertEqual(1, calls.count("p_analyze_combined_chunks"))
+
+    async def test_combines_in_levels(self):
+        # Each summary is 10 tokens plus 11 for the separator, so two of them fit into the budget.
+        calls = await self._analyze(42)
+        self.assertEqual(8, calls.count("p_analyze_chunk"))
+        # 8 -> 4 -> 2 -> 1.
+        self.assertEqual(4 + 2 + 1, calls.count("p_analyze_combined_chunks"))
+
+    async def test_observes_tokens_of_each_chunk(self):
+        count = 'dev_observer_llm_tokens_count{stage="llm_chunk",type="input"}'
+        total = 'dev_observer_llm_tokens_sum{stage="llm_chunk",type="output"}'
+        count_before, total_before = _rendered_value(count), _rendered_value(total)
+        await self._analyze(0)
+        self.assertEqual(8, _rendered_value(count) - count_before)
+        self.assertEqual(80, _rendered_value(total) - total_before)
+
+    async def test_analyzes_chunks_concurrently_in_order(self):
+        analysis = _EchoAnalysisProvider()
+        analyzer = TokenizedAnalyzer(
+            prompts_prefix="p",
+            analysis=analysis,
+            prompts=_ContentPromptsProvider(),
+            max_concurrency=4,
+        )
+        result = await analyzer.analyze_flatten(self.res)
+        self.assertEqual("\n\n-------\n\n".join(f"chunk {i}" for i in range(8)), result)
+        self.assertEqual(4, analysis.max_running)
+
+    async def test_shares_contents_until_close(self):
+        await self._analyze(0)
+        for p in self.paths:
+            os.remove(p)
+        # Contents read by the first analyzer are reused.
+        calls = await self._analyze(0)
+        self.assertEqual(8, calls.count("p_analyze_chunk"))
+
+        self.res.close()
+        with self.assertRaises(FileNotFoundError):
+            await self._analyze(0)
+
+    def test_bounds_shared_contents(self):
+        res = FlattenResult(
+            full_file_path="", file_paths=self.paths, total_tokens=0, clean_up=lambda: False, max_cached_chars=16,
+        )
+        for p in self.paths[:3]:
+            res.read(p)
+        os.remove(self.paths[0])
+        os.remove(self.paths[2])
+        # Only the two most recently read chunks fit.
+        self.assertEqual("chunk 2", res.read(self.paths[2]))
+        self.assertEqual("chunk 1", res.read(self.paths[1]))
+        with self.assertRaises(FileNotFoundError):
+            res.read(self.paths[0])
+
+    def test_replaced_result_closes_once(self):
+        cleaned = []
+
+        def clean_up() -> bool:
+            cleaned.append(True)
+            return True
+
+        res = FlattenResult(full_file_path="", file_paths=[], total_tokens=0, clean_up=clean_up)
+        self.assertTrue(dataclasses.replace(res, total_tokens=1).close())
+        self.assertEqual(1, len(cleaned))
@@ -0,0 +1,431 @@
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from datetime import timedelta, timezone
+from typing import Dict, List, Optional
+
+from dev_observer.api.types.config_pb2 import GlobalConfig, RepoAnalysisConfig
+from dev_observer.api.types.processing_pb2 import ProcessingItem, ProcessingLaneStatus, ProcessingItemKey
+from dev_observer.api.types.repo_pb2 import GitHubRepository
+from dev_observer.api.types.sites_pb2 import WebSite
+from dev_observer.flatten.flatten import FlattenResult, flatten_repository
+from dev_observer.processors.flattening import PreparedAnalysis
+from dev_observer.processors.periodic import PeriodicProcessor, PreparedItem
+from dev_observer.repository.provider import GitRepositoryProvider, RepositoryInfo, CloneOptions
+from dev_observer.repository.types import ObservedRepo
+from dev_observer.storage.local import LocalStorageProvider
+from dev_observer.tokenizer.stub import StubTokenizerProvider
+from dev_observer.util import MockClock, RealClock
+
+
+class _BlockingProcessor(PeriodicProcessor):
+    started: List[ProcessingItem]
+    release: asyncio.Event
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def _process_item(self, item: ProcessingItem):
+        self.started.append(item)
+        await self.release.wait()
+
+
+class _FailingProcessor(PeriodicProcessor):
+    fail: bool = True
+
+    async def _process_item(self, item: ProcessingItem):
+        if self.fail:
+            raise RuntimeError("clone failed")
+
+
+class _PipelinedProcessor(PeriodicProcessor):
+    prepared: List[str]
+    analyzed: List[str]
+    cleaned: List[str]
+    release: asyncio.Event
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = []
+        self.analyzed = []
+        self.cleaned = []
+        self.release = asyncio.Event()
+
+    async def _prepare_item(self, item: ProcessingItem) -> Optional[PreparedItem]:
+        repo_id = item.key.github_repo_id
+        self.prepared.append(repo_id)
+
+        def clean_up() -> bool:
+            self.cleaned.append(repo_id)
+            return True
+
+        flatten = FlattenResult(full_file_path=repo_id, file_paths=[], total_tokens=0, clean_up=clean_up)
+        return PreparedItem(processor=None, analysis=PreparedAnalysis(
+            entity=repo_id, requests=[], config=GlobalConfig(), flatten=flatten,
+        ))
+
+    async def _analyze_item(self, prepared: PreparedItem):
+        self.analyzed.append(prepared.analysis.entity)
+        await self.release.wait()
+
+
+class _SlowTokenizer(StubTokenizerProvider):
+    started: float = 0
+    finished: float = 0
+
+    def encode(self, content: str) -> List[int]:
+        self.started = time.monotonic()
+        time.sleep(0.4)
+        self.finished = time.monotonic()
+        return super().encode(content)
+
+
+class _LocalRepositoryProvider(GitRepositoryProvider):
+    async def get_repo(self, repo: ObservedRepo) -> RepositoryInfo:
+        return RepositoryInfo(owner="o", name="n", clone_url=repo.url, size_kb=1)
+
+    async def clone(self, repo: ObservedRepo, info: RepositoryInfo, dest: str, options: Optional[CloneOptions] = None):
+        with open(os.path.join(dest, "main.py"), 'w') as f:
+            f.write("print('hi')\n")
+
+    async def get_head_commit(self, repo: ObservedRepo, info: RepositoryInfo) -> Optional[str]:
+        return None
+
+    async def get_diff(self, repo: ObservedRepo, info: RepositoryInfo, base: str, head: str) -> Optional[str]:
+        return None
+
+
+class _RenewalsStorage(LocalStorageProvider):
+    renewals: List[float]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.renewals = []
+
+    async def renew_processing_lease(self, key: ProcessingItemKey, owner: str, lease: timedelta) -> bool:
+        self.renewals.append(time.monotonic())
+        return await super().renew_processing_lease(key, owner, lease)
+
+
+class _FlatteningProcessor(PeriodicProcessor):
+    tokenizer: _SlowTokenizer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.tokenizer = _SlowTokenizer()
+
+    async def _process_item(self, item: ProcessingItem):
+        config = GlobalConfig(repo_analysis=RepoAnalysisConfig(
+            flatten=RepoAnalysisConfig.Flatten(flattener="native", max_repo_size_mb=1, max_tokens_per_chunk=1000),
+        ))
+        repo = ObservedRepo(url="https://github.com/devplan/r1", github_repo=GitHubRepository())
+        res = await flatten_repository(repo, _LocalRepositoryProvider(), self.tokenizer, config)
+        res.flatten_result.close()
+
+
+class TestPeriodicProcessorWorkers(unittest.IsolatedAsyncioTestCase):
+    async def test_processes_lanes_concurrently(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        for i in range(3):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        await storage.add_web_site(WebSite(url="https://example.com"))
+        clock.bump(timedelta(seconds=1))
+
+        p = _BlockingProcessor(storage, None, clock=clock, repo_workers=2, website_workers=1, max_idle_sec=0.01)
+        task = asyncio.create_task(p.run())
+        try:
+            for _ in range(100):
+                if len(p.started) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            lanes: Dict[str, ProcessingLaneStatus] = {s.name: s for s in p.get_status()}
+            self.assertEqual(2, lanes["repos"].workers)
+            self.assertEqual(2, len(lanes["repos"].items))
+            self.assertEqual(1, lanes["websites"].workers)
+            self.assertEqual(["https://example.com"], [k.website_url for k in lanes["websites"].items])
+            # Third repo waits for a free repo worker.
+            self.assertEqual(2, len([i for i in p.started if i.key.HasField("github_repo_id")]))
+
+            p.release.set()
+            for _ in range(100):
+                if len(p.started) == 4:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(4, len(p.started))
+            self.assertEqual(3, len({i.key.github_repo_id for i in p.started if i.key.HasField("github_repo_id")}))
+        finally:
+            task.cancel()
+
+    async def test_stops_processing_when_lease_is_lost(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        await storage.add_github_repo(GitHubRepository(
+            name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+        ))
+        clock.bump(timedelta(seconds=1))
+
+        p = _BlockingProcessor(storage, None, clock=clock, lease_sec=0.03)
+        processing = asyncio.create_task(p.process_next())
+        while len(p.started) == 0:
+            await asyncio.sleep(0.01)
+        # Another node took the item over after the lease expired.
+        clock.bump(timedelta(seconds=1))
+        taken = await storage.claim_processing_item("other", timedelta(minutes=1))
+        self.assertIsNotNone(taken)
+
+        item = await asyncio.wait_for(processing, 1)
+        self.assertEqual("r1", item.key.github_repo_id)
+        self.assertFalse(p.release.is_set())
+        self.assertEqual("other", (await storage.get_processing_item(taken.key)).lease_owner)
+
+    async def test_wakes_up_when_items_are_scheduled(self):
+        storage = LocalStorageProvider(tempfile.mkdtemp())
+        p = _BlockingProcessor(storage, None, max_idle_sec=60)
+        p.release.set()
+        task = asyncio.create_task(p.run())
+        try:
+            # Let workers find nothing and go idle.
+            await asyncio.sleep(0.05)
+            await storage.add_github_repo(GitHubRepository(
+                name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+            ))
+            await storage.add_web_site(WebSite(url="https://example.com"))
+            for _ in range(100):
+                if len(p.started) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(2, len(p.started))
+
+            # Rescan of a processed item.
+            await storage.set_next_processing_time(p.started[0].key, RealClock().now())
+            for _ in range(100):
+                if len(p.started) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(3, len(p.started))
+        finally:
+            task.cancel()
+
+    async def test_schedules_next_scan_with_jitter(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        await storage.set_global_config(GlobalConfig(
+            repo_analysis=RepoAnalysisConfig(processing_interval_sec=1000),
+        ))
+        for i in range(20):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        await storage.add_web_site(WebSite(url="https://example.com"))
+        clock.bump(timedelta(seconds=1))
+
+        p = _BlockingProcessor(storage, None, clock=clock, interval_jitter=0.2)
+        p.release.set()
+        while await p.process_next() is not None:
+            pass
+        self.assertEqual(21, len(p.started))
+
+        now = clock.now()
+        delays = []
+        for item in await storage.get_processing_items():
+            if item.key.HasField("website_url"):
+                # No interval for websites, scanned on demand only.
+                self.assertFalse(item.HasField("next_processing"))
+                continue
+            delay = (item.next_processing.ToDatetime(tzinfo=timezone.utc) - now).total_seconds()
+            self.assertGreaterEqual(delay, 899)
+            self.assertLessEqual(delay, 1101)
+            delays.append(delay)
+        self.assertEqual(20, len(delays))
+        self.assertGreater(len(set(delays)), 1)
+
+    async def test_backs_off_and_quarantines_failing_items(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        await storage.add_github_repo(GitHubRepository(
+            name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+        ))
+        clock.bump(timedelta(seconds=1))
+        key = ProcessingItemKey(github_repo_id="r1")
+
+        p = _FailingProcessor(storage, None, clock=clock, retry_backoff_sec=100, max_failures=3)
+        for failures, delay in [(1, 100), (2, 200)]:
+            with self.assertRaises(RuntimeError):
+                await p.process_next()
+            item = await storage.get_processing_item(key)
+            self.assertEqual(failures, item.failures)
+            self.assertEqual("RuntimeError: clone failed", item.last_error)
+            next_time = item.next_processing.ToDatetime(tzinfo=timezone.utc)
+            self.assertAlmostEqual(clock.now() + timedelta(seconds=delay), next_time, delta=timedelta(milliseconds=1))
+            self.assertIsNone(await p.process_next())
+            clock.bump(timedelta(seconds=delay + 1))
+
+        with self.assertRaises(RuntimeError):
+            await p.process_next()
+        item = await storage.get_processing_item(key)
+        self.assertTrue(item.no_processing)
+        self.assertFalse(item.HasField("next_processing"))
+        clock.bump(timedelta(days=7))
+        self.assertIsNone(await p.process_next())
+        self.assertIsNone(await storage.next_processing_item())
+
+        # Rescan lifts the quarantine.
+        await storage.set_next_processing_time(key, clock.now())
+        clock.bump(timedelta(seconds=1))
+        p.fail = False
+        self.assertIsNotNone(await p.process_next())
+        item = await storage.get_processing_item(key)
+        self.assertFalse(item.no_processing)
+        self.assertEqual(0, item.failures)
+        self.assertFalse(item.HasField("last_error"))
+        self.assertAlmostEqual(clock.now(), item.last_processed.ToDatetime(tzinfo=timezone.utc),
+                               delta=timedelta(milliseconds=1))
+
+    async def test_wakes_up_on_changes_from_other_threads(self):
+        root = tempfile.mkdtemp()
+        p = _BlockingProcessor(LocalStorageProvider(root), None, max_idle_sec=60)
+        p.release.set()
+        task = asyncio.create_task(p.run())
+        try:
+            await asyncio.sleep(0.05)
+
+            # The server schedules items through its own storage instance on its own event loop.
+            def add_repo():
+                asyncio.run(LocalStorageProvider(root).add_github_repo(GitHubRepository(
+                    name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+                )))
+
+            await asyncio.to_thread(add_repo)
+            for _ in range(100):
+                if len(p.started) == 1:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(1, len(p.started))
+        finally:
+            task.cancel()
+
+    async def test_prefetches_next_items_during_analysis(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        for i in range(3):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        clock.bump(timedelta(seconds=1))
+
+        p = _PipelinedProcessor(storage, None, clock=clock, prefetch=1, max_idle_sec=0.01)
+        task = asyncio.create_task(p.run())
+        try:
+            for _ in range(100):
+                if len(p.analyzed) == 1 and len(p.prepared) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            # Next item is flattened while the first one is analyzed, the third one is not claimed yet.
+            self.assertEqual(1, len(p.analyzed))
+            self.assertEqual(2, len(p.prepared))
+            claimed = [i for i in await storage.get_processing_items() if i.HasField("lease_owner")]
+            self.assertEqual(2, len(claimed))
+            lanes: Dict[str, ProcessingLaneStatus] = {s.name: s for s in p.get_status()}
+            self.assertEqual([p.analyzed[0]], [k.github_repo_id for k in lanes["repos"].items])
+
+            p.release.set()
+            for _ in range(100):
+                if len(p.analyzed) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(p.prepared, p.analyzed)
+            self.assertEqual(3, len(set(p.analyzed)))
+            for _ in range(100):
+                items = await storage.get_processing_items()
+                if all(i.HasField("last_processed") for i in items):
+                    break
+                await asyncio.sleep(0.01)
+            self.assertTrue(all(i.HasField("last_processed") for i in items))
+            self.assertFalse(any(i.HasField("lease_owner") for i in items))
+        finally:
+            task.cancel()
+
+    async def test_gives_up_prefetched_items_on_stop(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        for i in range(3):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        clock.bump(timedelta(seconds=1))
+
+        p = _PipelinedProcessor(storage, None, clock=clock, prefetch=1, max_idle_sec=0.01)
+        task = asyncio.create_task(p.run())
+        for _ in range(100):
+            if len(p.analyzed) == 1 and len(p.prepared) == 2:
+                break
+            await asyncio.sleep(0.01)
+        # Let the second item reach the queue.
+        await asyncio.sleep(0.05)
+        p.stop()
+        await asyncio.sleep(0.05)
+        self.assertFalse(task.done())
+
+        # Item being analyzed is finished, the one flattened ahead is cleaned up and can be claimed right away.
+        p.release.set()
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(1, len(p.analyzed))
+        self.assertEqual([p.prepared[1]], p.cleaned)
+        self.assertTrue((await storage.get_processing_item(ProcessingItemKey(github_repo_id=p.analyzed[0])))
+                        .HasField("last_processed"))
+        given_up = await storage.get_processing_item(ProcessingItemKey(github_repo_id=p.prepared[1]))
+        self.assertFalse(given_up.HasField("last_processed"))
+        taken = set()
+        while (item := await storage.claim_processing_item("other", timedelta(minutes=1))) is not None:
+            taken.add(item.key.github_repo_id)
+        self.assertEqual({"r0", "r1", "r2"} - {p.analyzed[0]}, taken)
+
+    async def test_stops_after_items_in_progress(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        for i in range(2):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        clock.bump(timedelta(seconds=1))
+
+        p = _BlockingProcessor(storage, None, clock=clock, max_idle_sec=60)
+        task = asyncio.create_task(p.run())
+        for _ in range(100):
+            if len(p.started) == 1:
+                break
+            await asyncio.sleep(0.01)
+        p.stop()
+        await asyncio.sleep(0.05)
+        self.assertFalse(task.done())
+
+        p.release.set()
+        await asyncio.wait_for(task, 1)
+        # Idle website worker exits right away, the second repo is left for the next run.
+        self.assertEqual(1, len(p.started))
+        self.assertIsNotNone(await storage.claim_processing_item("other", timedelta(minutes=1)))
+
+    async def test_renews_lease_while_tokenizing(self):
+        storage = _RenewalsStorage(tempfile.mkdtemp())
+        await storage.add_github_repo(GitHubRepository(
+            name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+        ))
+        await asyncio.sleep(0.01)
+
+        p = _FlatteningProcessor(storage, None, lease_sec=0.15)
+        item = await asyncio.wait_for(p.process_next(), 5)
+        self.assertIsNotNone(item)
+        tokenizer = p.tokenizer
+        during = [t for t in storage.renewals if tokenizer.started <= t <= tokenizer.finished]
+        self.assertGreaterEqual(len(during), 3)
+        processed = await storage.get_processing_item(item.key)
+        self.assertFalse(processed.HasField("lease_owner"))
+        self.assertTrue(processed.HasField("last_processed"))
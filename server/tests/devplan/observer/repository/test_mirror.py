@@ -0,0 +1,84 @@
+import asyncio
+import fcntl
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from dev_observer.repository.mirror import RepoMirrorStore
+
+
+def _git(cwd: str, *args: str):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+def _commit(repo: str, name: str, content: str):
+    with open(os.path.join(repo, name), 'w') as f:
+        f.write(content)
+    _git(repo, "add", name)
+    _git(repo, "commit", "-q", "-m", name)
+
+
+def _mirrors(store: RepoMirrorStore):
+    return sorted(n for n in os.listdir(store._dir) if not n.endswith(".lock"))
+
+
+class TestRepoMirrorStore(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.origin = tempfile.mkdtemp()
+        _git(self.origin, "init", "-q")
+        _commit(self.origin, "a.txt", "a")
+
+    async def test_checkout_fetches_updates(self):
+        store = RepoMirrorStore(tempfile.mkdtemp(), max_size_bytes=100_000_000)
+        first = tempfile.mkdtemp()
+        await store.checkout("o/n", self.origin, first)
+        self.assertTrue(os.path.exists(os.path.join(first, "a.txt")))
+
+        _commit(self.origin, "b.txt", "b")
+        second = tempfile.mkdtemp()
+        await store.checkout("o/n", self.origin, second)
+        self.assertTrue(os.path.exists(os.path.join(second, "b.txt")))
+        self.assertFalse(os.path.exists(os.path.join(first, "b.txt")))
+        self.assertEqual(["o__n.git"], _mirrors(store))
+
+    async def test_evicts_unused_mirrors(self):
+        store = RepoMirrorStore(tempfile.mkdtemp(), max_size_bytes=1)
+        dest = tempfile.mkdtemp()
+        await store.checkout("o/n", self.origin, dest)
+        # The mirror has a live worktree, so it is kept.
+        self.assertEqual(["o__n.git"], _mirrors(store))
+        shutil.rmtree(dest)
+        store.evict()
+        self.assertEqual([], _mirrors(store))
+
+    async def test_keeps_mirrors_locked_by_other_processes(self):
+        root = tempfile.mkdtemp()
+        store = RepoMirrorStore(root, max_size_bytes=1)
+        dest = tempfile.mkdtemp()
+        await store.checkout("o/n", self.origin, dest)
+        shutil.rmtree(dest)
+
+        # Another process sharing the root is fetching into the mirror.
+        fd = os.open(os.path.join(root, "o__n.git.lock"), os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            RepoMirrorStore(root, max_size_bytes=1).evict()
+            self.assertEqual(["o__n.git"], _mirrors(store))
+        finally:
+            os.close(fd)
+        store.evict()
+        self.assertEqual([], _mirrors(store))
+
+    async def test_serializes_checkouts_of_stores_sharing_root(self):
+        root = tempfile.mkdtemp()
+        stores = [RepoMirrorStore(root, max_size_bytes=100_000_000) for _ in range(2)]
+        dests = [tempfile.mkdtemp() for _ in stores]
+        await asyncio.gather(*[s.checkout("o/n", self.origin, d) for s, d in zip(stores, dests)])
+        for d in dests:
+            self.assertTrue(os.path.exists(os.path.join(d, "a.txt")))
+        self.assertEqual(["o__n.git"], _mirrors(stores[0]))
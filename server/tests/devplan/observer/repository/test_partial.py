@@ -0,0 +1,41 @@
+import os
+import subprocess
+import tempfile
+import unittest
+
+from dev_observer.repository.partial import partial_clone
+from dev_observer.repository.provider import CloneOptions
+
+
+def _git(cwd: str, *args: str):
+    subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args],
+        cwd=cwd, check=True, capture_output=True,
+    )
+
+
+def _write(root: str, rel: str, content: str):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+class TestPartialClone(unittest.IsolatedAsyncioTestCase):
+    async def test_skips_large_and_excluded_files(self):
+        origin = tempfile.mkdtemp()
+        _git(origin, "init", "-q")
+        _git(origin, "config", "uploadpack.allowFilter", "true")
+        _write(origin, "main.py", "print('hi')\n")
+        _write(origin, "data/big [1].txt", "x" * 5000)
+        _write(origin, "vendor/lib.js", "lib\n")
+        _git(origin, "add", ".")
+        _git(origin, "commit", "-q", "-m", "init")
+
+        dest = os.path.join(tempfile.mkdtemp(), "clone")
+        await partial_clone(f"file://{origin}", dest, CloneOptions(
+            max_blob_size=1000, exclude_patterns=["vendor/**"],
+        ))
+        self.assertTrue(os.path.exists(os.path.join(dest, "main.py")))
+        self.assertFalse(os.path.exists(os.path.join(dest, "data", "big [1].txt")))
+        self.assertFalse(os.path.exists(os.path.join(dest, "vendor", "lib.js")))
@@ -0,0 +1,47 @@
+import asyncio
+import tempfile
+import unittest
+from datetime import timedelta
+
+from dev_observer.api.types.config_pb2 import GlobalConfig, AnalysisConfig
+from dev_observer.storage.config_cache import GlobalConfigCache
+from dev_observer.storage.local import LocalStorageProvider
+from dev_observer.util import MockClock
+
+
+class _CountingStorageProvider(LocalStorageProvider):
+    loads: int = 0
+
+    async def get_global_config(self) -> GlobalConfig:
+        self.loads += 1
+        return await super().get_global_config()
+
+
+class TestGlobalConfigCache(unittest.IsolatedAsyncioTestCase):
+    async def test_reloads_on_change_and_expiration(self):
+        clock = MockClock()
+        root = tempfile.mkdtemp()
+        storage = _CountingStorageProvider(root, clock)
+        await storage.set_global_config(GlobalConfig(analysis=AnalysisConfig(disable_masking=True)))
+        cache = GlobalConfigCache(storage, max_age_sec=60, clock=clock)
+        listener = asyncio.create_task(cache.listen())
+        try:
+            await asyncio.sleep(0)
+            for _ in range(10):
+                self.assertTrue((await cache.get()).analysis.disable_masking)
+            self.assertEqual(1, storage.loads)
+            version = cache.version
+
+            # Updated through another instance, e.g. by the server.
+            await LocalStorageProvider(root, clock).set_global_config(GlobalConfig())
+            self.assertGreater(cache.version, version)
+            self.assertFalse((await cache.get()).analysis.disable_masking)
+            self.assertEqual(2, storage.loads)
+
+            await cache.get()
+            self.assertEqual(2, storage.loads)
+            clock.bump(timedelta(seconds=61))
+            await cache.get()
+            self.assertEqual(3, storage.loads)
+        finally:
+            listener.cancel()
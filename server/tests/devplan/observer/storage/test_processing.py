@@ -0,0 +1,107 @@
+import tempfile
+import unittest
+from datetime import timedelta
+
+from dev_observer.api.types.processing_pb2 import ProcessingItemKey, PROCESSING_PRIORITY_BACKFILL, \
+    PROCESSING_PRIORITY_INTERACTIVE
+from dev_observer.api.types.repo_pb2 import GitHubRepository
+from dev_observer.storage.local import LocalStorageProvider
+from dev_observer.util import MockClock
+
+
+class TestProcessingItems(unittest.IsolatedAsyncioTestCase):
+    async def test_claims_until_lease_expires(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        await storage.add_github_repo(GitHubRepository(
+            name="r1", id="r1", full_name="devplan/r1", url="https://github.com/devplan/r1",
+        ))
+        clock.bump(timedelta(seconds=1))
+        lease = timedelta(minutes=1)
+
+        item = await storage.claim_processing_item("a", lease)
+        self.assertEqual("r1", item.key.github_repo_id)
+        self.assertEqual("a", item.lease_owner)
+        self.assertIsNone(await storage.claim_processing_item("b", lease))
+
+        clock.bump(timedelta(seconds=40))
+        self.assertTrue(await storage.renew_processing_lease(item.key, "a", lease))
+        clock.bump(timedelta(seconds=40))
+        self.assertIsNone(await storage.claim_processing_item("b", lease))
+
+        # Owner "a" stopped renewing, e.g. crashed.
+        clock.bump(timedelta(seconds=30))
+        taken = await storage.claim_processing_item("b", lease)
+        self.assertEqual("b", taken.lease_owner)
+        self.assertFalse(await storage.renew_processing_lease(item.key, "a", lease))
+
+        # Release by the previous owner is ignored.
+        await storage.release_processing_item(item.key, "a", None)
+        self.assertTrue((await storage.get_processing_item(item.key)).HasField("next_processing"))
+
+        await storage.release_processing_item(item.key, "b", None)
+        released = await storage.get_processing_item(ProcessingItemKey(github_repo_id="r1"))
+        self.assertFalse(released.HasField("next_processing"))
+        self.assertFalse(released.HasField("lease_owner"))
+        self.assertIsNone(await storage.claim_processing_item("a", lease))
+
+    async def test_claims_by_priority_with_aging(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        start = clock.now()
+        lease = timedelta(minutes=1)
+
+        def key(name: str) -> ProcessingItemKey:
+            return ProcessingItemKey(github_repo_id=name)
+
+        # Overdue after a long outage, still behind user requests.
+        await storage.set_next_processing_time(key("outage"), start - timedelta(days=2))
+        # Overdue for longer than PRIORITY_AGING, competes with scheduled items by due time.
+        await storage.set_next_processing_time(key("aged"), start - timedelta(days=3), PROCESSING_PRIORITY_BACKFILL)
+        await storage.set_next_processing_time(
+            key("backfill"), start - timedelta(hours=3), PROCESSING_PRIORITY_BACKFILL,
+        )
+        await storage.set_next_processing_time(key("scheduled"), start - timedelta(hours=3))
+        await storage.set_next_processing_time(key("interactive"), start, PROCESSING_PRIORITY_INTERACTIVE)
+        clock.bump(timedelta(seconds=1))
+
+        claimed = []
+        while (item := await storage.claim_processing_item("a", lease)) is not None:
+            claimed.append(item.key.github_repo_id)
+        self.assertEqual(["interactive", "aged", "outage", "scheduled", "backfill"], claimed)
+
+    async def test_failed_items_are_retried_as_backfill(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        key = ProcessingItemKey(github_repo_id="r1")
+        await storage.set_next_processing_time(key, clock.now(), PROCESSING_PRIORITY_INTERACTIVE)
+        clock.bump(timedelta(seconds=1))
+        await storage.claim_processing_item("a", timedelta(minutes=1))
+        await storage.release_processing_item(key, "a", clock.now(), error="failed")
+        self.assertEqual(PROCESSING_PRIORITY_BACKFILL, (await storage.get_processing_item(key)).priority)
+
+    async def test_backlog_counts_due_unclaimed_items(self):
+        clock = MockClock()
+        storage = LocalStorageProvider(tempfile.mkdtemp(), clock)
+        for i in range(3):
+            await storage.add_github_repo(GitHubRepository(
+                name=f"r{i}", id=f"r{i}", full_name=f"devplan/r{i}", url=f"https://github.com/devplan/r{i}",
+            ))
+        first_due = (await storage.get_processing_item(ProcessingItemKey(github_repo_id="r0"))).next_processing
+        clock.bump(timedelta(seconds=10))
+
+        backlog = await storage.get_processing_backlog("github_repo_id")
+        self.assertEqual(3, backlog.due)
+        self.assertAlmostEqual(first_due.ToDatetime(tzinfo=clock.now().tzinfo), backlog.oldest_due,
+                               delta=timedelta(milliseconds=1))
+        self.assertEqual(0, (await storage.get_processing_backlog("website_url")).due)
+
+        # One item is claimed, another one quarantined.
+        await storage.claim_processing_item("a", timedelta(minutes=1))
+        failed = await storage.claim_processing_item("a", timedelta(minutes=1))
+        await storage.release_processing_item(failed.key, "a", None, error="failed", quarantine=True)
+        self.assertEqual(1, (await storage.get_processing_backlog()).due)
+
+        # Items with expired leases are due again.
+        clock.bump(timedelta(minutes=2))
+        self.assertEqual(2, (await storage.get_processing_backlog()).due)
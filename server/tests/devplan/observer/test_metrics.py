@@ -0,0 +1,48 @@
+import unittest
+
+from dev_observer.metrics import Registry, Counter, Gauge, Histogram
+
+
+class TestMetrics(unittest.TestCase):
+    def test_renders_text_format(self):
+        registry = Registry()
+        items = Counter("items_total", "Processed items.", ["outcome"], registry=registry)
+        depth = Gauge("queue_depth", "Due items.", registry=registry)
+        items.inc(outcome="success")
+        items.inc(2, outcome="failure")
+        registry.add_collector(lambda: depth.set(7))
+
+        self.assertEqual("\n".join([
+            "# HELP items_total Processed items.",
+            "# TYPE items_total counter",
+            'items_total{outcome="failure"} 2',
+            'items_total{outcome="success"} 1',
+            "# HELP queue_depth Due items.",
+            "# TYPE queue_depth gauge",
+            "queue_depth 7",
+        ]) + "\n", registry.render())
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        duration = Histogram("duration_seconds", "Stage duration.", ["stage"], buckets=[1, 10], registry=registry)
+        for v in (0.5, 2, 20):
+            duration.observe(v, stage="clone")
+
+        samples = registry.render().splitlines()[2:]
+        self.assertEqual([
+            'duration_seconds_bucket{stage="clone",le="1"} 1',
+            'duration_seconds_bucket{stage="clone",le="10"} 2',
+            'duration_seconds_bucket{stage="clone",le="+Inf"} 3',
+            'duration_seconds_sum{stage="clone"} 22.5',
+            'duration_seconds_count{stage="clone"} 3',
+        ], samples)
+
+    def test_validates_labels(self):
+        registry = Registry()
+        items = Counter("items_total", "Processed items.", ["outcome"], registry=registry)
+        with self.assertRaises(ValueError):
+            items.inc(stage="clone")
+        with self.assertRaises(ValueError):
+            items.inc(-1, outcome="success")
+        with self.assertRaises(ValueError):
+            Gauge("items_total", "Duplicate.", registry=registry)
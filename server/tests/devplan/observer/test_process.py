@@ -0,0 +1,57 @@
+import asyncio
+import os
+import time
+import unittest
+from typing import List
+
+from dev_observer.process import ProcessRunner
+
+
+class TestProcessRunner(unittest.IsolatedAsyncioTestCase):
+    async def test_output(self):
+        res = await ProcessRunner().run(["sh", "-c", "echo out; echo err >&2; exit 3"])
+        self.assertEqual(3, res.returncode)
+        self.assertEqual("out\n", res.stdout)
+        self.assertEqual("err", res.stderr)
+
+    async def test_timeout(self):
+        with self.assertRaises(RuntimeError):
+            await ProcessRunner().run(["sleep", "5"], timeout=0.1)
+
+    async def test_concurrency_limit(self):
+        runner = ProcessRunner(max_concurrent=1)
+        start = time.monotonic()
+        await asyncio.gather(runner.run(["sleep", "0.2"]), runner.run(["sleep", "0.2"]))
+        self.assertGreaterEqual(time.monotonic() - start, 0.4)
+
+    async def test_runs_concurrently(self):
+        runner = ProcessRunner(max_concurrent=2)
+        start = time.monotonic()
+        await asyncio.gather(runner.run(["sleep", "0.3"]), runner.run(["sleep", "0.3"]))
+        self.assertLess(time.monotonic() - start, 0.55)
+
+    async def test_reaps_cancelled_process(self):
+        runner = ProcessRunner()
+        task = asyncio.create_task(runner.run(["sleep", "5"]))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(0, len(_children()))
+
+    async def test_keeps_limit_when_used_from_another_loop(self):
+        runner = ProcessRunner(max_concurrent=1)
+        start = time.monotonic()
+        first = asyncio.create_task(runner.run(["sleep", "0.3"]))
+        await asyncio.sleep(0.05)
+        # The server and the processor share the runner from their own event loops.
+        await asyncio.to_thread(lambda: asyncio.run(runner.run(["true"])))
+        await runner.run(["true"])
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        await first
+
+
+def _children() -> List[str]:
+    # Children of the main thread, including zombies that were not waited for.
+    with open(f"/proc/{os.getpid()}/task/{os.getpid()}/children") as f:
+        return f.read().split()
@@ -50,6 +50,7 @@ const websiteCrawlingConfigSchema = z.object({
   scrapyResponseTimeoutSeconds: z.coerce.number(),
   crawlDepth: z.coerce.number(),
   timeoutWithoutDataSeconds: z.coerce.number(),
+  processingIntervalSec: z.coerce.number(),
 })
 
 const globalConfigSchema = z.object({
@@ -481,6 +482,20 @@ function GlobalConfigEditorForm({config}: { config: GlobalConfig }) {
               </FormItem>
             )}
           />
+
+          <FormField
+            control={form.control}
+            name="websiteCrawling.processingIntervalSec"
+            render={({field}) => (
+              <FormItem className="flex items-center gap-4">
+                <FormLabel className="w-[200px]">Processing Interval (sec):</FormLabel>
+                <FormControl className="w-[200px]">
+                  <Input type="number" {...field} onChange={e => field.onChange(Number(e.target.value))}/>
+                </FormControl>
+                <FormMessage/>
+              </FormItem>
+            )}
+          />
         </div>
       </div>
 
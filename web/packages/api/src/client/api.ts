@@ -1,6 +1,7 @@
 import {BaseClient} from "./base";
 import {ConfigClient} from "./config";
 import {ObservationsClient} from "./observations";
+import {ProcessingClient} from "./processing";
 import {RepositoriesClient} from "./repositories";
 import {WebsitesClient} from "./websites";
 import {AxiosRequestConfig} from "axios";
@@ -11,6 +12,7 @@ import {AxiosRequestConfig} from "axios";
 export class ApiClient extends BaseClient {
   readonly config: ConfigClient;
   readonly observations: ObservationsClient;
+  readonly processing: ProcessingClient;
   readonly repositories: RepositoriesClient;
   readonly websites: WebsitesClient;
 
@@ -23,6 +25,7 @@ export class ApiClient extends BaseClient {
     super(baseUrl, config);
     this.config = new ConfigClient(baseUrl, config);
     this.observations = new ObservationsClient(baseUrl, config);
+    this.processing = new ProcessingClient(baseUrl, config);
     this.repositories = new RepositoriesClient(baseUrl, config);
     this.websites = new WebsitesClient(baseUrl, config);
   }
@@ -35,6 +38,7 @@ export class ApiClient extends BaseClient {
     super.setAuthToken(token);
     this.config.setAuthToken(token);
     this.observations.setAuthToken(token);
+    this.processing.setAuthToken(token);
     this.repositories.setAuthToken(token);
     this.websites.setAuthToken(token);
   }
@@ -46,6 +50,7 @@ export class ApiClient extends BaseClient {
     super.clearAuthToken();
     this.config.clearAuthToken();
     this.observations.clearAuthToken();
+    this.processing.clearAuthToken();
     this.repositories.clearAuthToken();
     this.websites.clearAuthToken();
   }
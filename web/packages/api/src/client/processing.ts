@@ -0,0 +1,15 @@
+import { BaseClient } from './base';
+import { GetProcessingStatusResponse } from '../pb/dev_observer/api/web/processing';
+
+/**
+ * Client for interacting with the Processing API
+ */
+export class ProcessingClient extends BaseClient {
+  /**
+   * Get occupancy of background processing workers
+   * @returns The processing status response
+   */
+  async getStatus(): Promise<GetProcessingStatusResponse> {
+    return this._get('/api/v1/processing/status', GetProcessingStatusResponse);
+  }
+}
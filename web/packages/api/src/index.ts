@@ -2,7 +2,9 @@
 export {SystemMessage, UserMessage, ModelConfig, PromptConfig, PromptTemplate} from './pb/dev_observer/api/types/ai';
 export {UserManagementStatus, GlobalConfig, AnalysisConfig} from './pb/dev_observer/api/types/config';
 export {Analyzer, Observation, ObservationKey,} from './pb/dev_observer/api/types/observations';
-export {ProcessingItem, ProcessingItemKey} from './pb/dev_observer/api/types/processing';
+export {
+  ProcessingItem, ProcessingItemKey, ProcessingLaneStatus, ProcessingPriority
+} from './pb/dev_observer/api/types/processing';
 export {GitHubRepository} from './pb/dev_observer/api/types/repo';
 export {WebSite} from './pb/dev_observer/api/types/sites';
 export {
@@ -18,6 +20,7 @@ export {
   GetGlobalConfigResponse, GetUserManagementStatusResponse, UpdateGlobalConfigResponse, UpdateGlobalConfigRequest
 } from './pb/dev_observer/api/web/config';
 export {GetObservationResponse, GetObservationsResponse} from './pb/dev_observer/api/web/observations';
+export {GetProcessingStatusResponse} from './pb/dev_observer/api/web/processing';
 export {
   GetRepositoryResponse,
   DeleteRepositoryResponse,
@@ -34,6 +37,7 @@ export {ParseableMessage, VoidParser, BaseClient} from './client/base';
 export {ConfigClient} from './client/config';
 export {S3ObservationsFetcherProps, FetchResult, S3ObservationsFetcher} from './client/directFetcher';
 export {ObservationsClient} from './client/observations';
+export {ProcessingClient} from './client/processing';
 export {RepositoriesClient} from './client/repositories';
 export {WebsitesClient} from './client/websites';
 export {normalizeDomain, normalizeName} from './client/sitesUtils';
@@ -20,6 +20,23 @@ export interface AnalysisConfig {
   repoAnalyzers: Analyzer[];
   siteAnalyzers: Analyzer[];
   disableMasking: boolean;
+  /**
+   * Max tokens of chunk summaries combined in one prompt. Larger sets are combined in groups, level by level,
+   * until one result remains. 0 combines all summaries at once.
+   */
+  maxCombineTokens: number;
+  /**
+   * Max LLM requests a single analyzer runs at the same time. Requests of all analyzers of the process are also
+   * limited together by the `analysis.max_concurrent_llm_requests` server setting.
+   */
+  maxConcurrentRequests: number;
+  /** Max analyzers running at the same time for a single repo or website. */
+  maxConcurrentAnalyzers: number;
+  /**
+   * Prompt that condenses each chunk into an analyzer-neutral digest. When set, chunks are digested once and
+   * analyzers of the same repo or website read the digests instead of raw chunks. Empty disables digests.
+   */
+  chunkDigestPrompt: string;
 }
 
 export interface UserManagementStatus {
@@ -31,6 +48,10 @@ export interface RepoAnalysisConfig {
   flatten: RepoAnalysisConfig_Flatten | undefined;
   processingIntervalSec: number;
   disabled: boolean;
+  /** Re-analyze repos from the diff since the previously observed commit when it is small enough. */
+  incremental: boolean;
+  /** Diffs with more tokens than this fall back to a full analysis. */
+  incrementalMaxDiffTokens: number;
 }
 
 export interface RepoAnalysisConfig_Flatten {
@@ -46,6 +67,10 @@ export interface RepoAnalysisConfig_Flatten {
   largeRepoIgnorePattern: string;
   compressLarge: boolean;
   maxFileSizeBytes: number;
+  /** Flattener to use: "repomix" (default) or "native" for the in-process one. */
+  flattener: string;
+  /** Clone github repos without blobs over max_file_size_bytes and without ignored paths. */
+  partialClone: boolean;
 }
 
 export interface WebsiteCrawlingConfig {
@@ -53,6 +78,8 @@ export interface WebsiteCrawlingConfig {
   scrapyResponseTimeoutSeconds: number;
   crawlDepth: number;
   timeoutWithoutDataSeconds: number;
+  /** Interval between scans of a website, 0 scans websites on demand only. */
+  processingIntervalSec: number;
 }
 
 function createBaseGlobalConfig(): GlobalConfig {
@@ -156,7 +183,15 @@ export const GlobalConfig: MessageFns<GlobalConfig> = {
 };
 
 function createBaseAnalysisConfig(): AnalysisConfig {
-  return { repoAnalyzers: [], siteAnalyzers: [], disableMasking: false };
+  return {
+    repoAnalyzers: [],
+    siteAnalyzers: [],
+    disableMasking: false,
+    maxCombineTokens: 0,
+    maxConcurrentRequests: 0,
+    maxConcurrentAnalyzers: 0,
+    chunkDigestPrompt: "",
+  };
 }
 
 export const AnalysisConfig: MessageFns<AnalysisConfig> = {
@@ -170,6 +205,18 @@ export const AnalysisConfig: MessageFns<AnalysisConfig> = {
     if (message.disableMasking !== false) {
       writer.uint32(24).bool(message.disableMasking);
     }
+    if (message.maxCombineTokens !== 0) {
+      writer.uint32(32).int32(message.maxCombineTokens);
+    }
+    if (message.maxConcurrentRequests !== 0) {
+      writer.uint32(40).int32(message.maxConcurrentRequests);
+    }
+    if (message.maxConcurrentAnalyzers !== 0) {
+      writer.uint32(48).int32(message.maxConcurrentAnalyzers);
+    }
+    if (message.chunkDigestPrompt !== "") {
+      writer.uint32(58).string(message.chunkDigestPrompt);
+    }
     return writer;
   },
 
@@ -204,6 +251,38 @@ export const AnalysisConfig: MessageFns<AnalysisConfig> = {
           message.disableMasking = reader.bool();
           continue;
         }
+        case 4: {
+          if (tag !== 32) {
+            break;
+          }
+
+          message.maxCombineTokens = reader.int32();
+          continue;
+        }
+        case 5: {
+          if (tag !== 40) {
+            break;
+          }
+
+          message.maxConcurrentRequests = reader.int32();
+          continue;
+        }
+        case 6: {
+          if (tag !== 48) {
+            break;
+          }
+
+          message.maxConcurrentAnalyzers = reader.int32();
+          continue;
+        }
+        case 7: {
+          if (tag !== 58) {
+            break;
+          }
+
+          message.chunkDigestPrompt = reader.string();
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -222,6 +301,10 @@ export const AnalysisConfig: MessageFns<AnalysisConfig> = {
         ? object.siteAnalyzers.map((e: any) => Analyzer.fromJSON(e))
         : [],
       disableMasking: isSet(object.disableMasking) ? gt.Boolean(object.disableMasking) : false,
+      maxCombineTokens: isSet(object.maxCombineTokens) ? gt.Number(object.maxCombineTokens) : 0,
+      maxConcurrentRequests: isSet(object.maxConcurrentRequests) ? gt.Number(object.maxConcurrentRequests) : 0,
+      maxConcurrentAnalyzers: isSet(object.maxConcurrentAnalyzers) ? gt.Number(object.maxConcurrentAnalyzers) : 0,
+      chunkDigestPrompt: isSet(object.chunkDigestPrompt) ? gt.String(object.chunkDigestPrompt) : "",
     };
   },
 
@@ -236,6 +319,18 @@ export const AnalysisConfig: MessageFns<AnalysisConfig> = {
     if (message.disableMasking !== false) {
       obj.disableMasking = message.disableMasking;
     }
+    if (message.maxCombineTokens !== 0) {
+      obj.maxCombineTokens = Math.round(message.maxCombineTokens);
+    }
+    if (message.maxConcurrentRequests !== 0) {
+      obj.maxConcurrentRequests = Math.round(message.maxConcurrentRequests);
+    }
+    if (message.maxConcurrentAnalyzers !== 0) {
+      obj.maxConcurrentAnalyzers = Math.round(message.maxConcurrentAnalyzers);
+    }
+    if (message.chunkDigestPrompt !== "") {
+      obj.chunkDigestPrompt = message.chunkDigestPrompt;
+    }
     return obj;
   },
 
@@ -247,6 +342,10 @@ export const AnalysisConfig: MessageFns<AnalysisConfig> = {
     message.repoAnalyzers = object.repoAnalyzers?.map((e) => Analyzer.fromPartial(e)) || [];
     message.siteAnalyzers = object.siteAnalyzers?.map((e) => Analyzer.fromPartial(e)) || [];
     message.disableMasking = object.disableMasking ?? false;
+    message.maxCombineTokens = object.maxCombineTokens ?? 0;
+    message.maxConcurrentRequests = object.maxConcurrentRequests ?? 0;
+    message.maxConcurrentAnalyzers = object.maxConcurrentAnalyzers ?? 0;
+    message.chunkDigestPrompt = object.chunkDigestPrompt ?? "";
     return message;
   },
 };
@@ -328,7 +427,13 @@ export const UserManagementStatus: MessageFns<UserManagementStatus> = {
 };
 
 function createBaseRepoAnalysisConfig(): RepoAnalysisConfig {
-  return { flatten: undefined, processingIntervalSec: 0, disabled: false };
+  return {
+    flatten: undefined,
+    processingIntervalSec: 0,
+    disabled: false,
+    incremental: false,
+    incrementalMaxDiffTokens: 0,
+  };
 }
 
 export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
@@ -342,6 +447,12 @@ export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
     if (message.disabled !== false) {
       writer.uint32(24).bool(message.disabled);
     }
+    if (message.incremental !== false) {
+      writer.uint32(32).bool(message.incremental);
+    }
+    if (message.incrementalMaxDiffTokens !== 0) {
+      writer.uint32(40).int32(message.incrementalMaxDiffTokens);
+    }
     return writer;
   },
 
@@ -376,6 +487,22 @@ export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
           message.disabled = reader.bool();
           continue;
         }
+        case 4: {
+          if (tag !== 32) {
+            break;
+          }
+
+          message.incremental = reader.bool();
+          continue;
+        }
+        case 5: {
+          if (tag !== 40) {
+            break;
+          }
+
+          message.incrementalMaxDiffTokens = reader.int32();
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -390,6 +517,8 @@ export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
       flatten: isSet(object.flatten) ? RepoAnalysisConfig_Flatten.fromJSON(object.flatten) : undefined,
       processingIntervalSec: isSet(object.processingIntervalSec) ? gt.Number(object.processingIntervalSec) : 0,
       disabled: isSet(object.disabled) ? gt.Boolean(object.disabled) : false,
+      incremental: isSet(object.incremental) ? gt.Boolean(object.incremental) : false,
+      incrementalMaxDiffTokens: isSet(object.incrementalMaxDiffTokens) ? gt.Number(object.incrementalMaxDiffTokens) : 0,
     };
   },
 
@@ -404,6 +533,12 @@ export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
     if (message.disabled !== false) {
       obj.disabled = message.disabled;
     }
+    if (message.incremental !== false) {
+      obj.incremental = message.incremental;
+    }
+    if (message.incrementalMaxDiffTokens !== 0) {
+      obj.incrementalMaxDiffTokens = Math.round(message.incrementalMaxDiffTokens);
+    }
     return obj;
   },
 
@@ -417,6 +552,8 @@ export const RepoAnalysisConfig: MessageFns<RepoAnalysisConfig> = {
       : undefined;
     message.processingIntervalSec = object.processingIntervalSec ?? 0;
     message.disabled = object.disabled ?? false;
+    message.incremental = object.incremental ?? false;
+    message.incrementalMaxDiffTokens = object.incrementalMaxDiffTokens ?? 0;
     return message;
   },
 };
@@ -433,6 +570,8 @@ function createBaseRepoAnalysisConfig_Flatten(): RepoAnalysisConfig_Flatten {
     largeRepoIgnorePattern: "",
     compressLarge: false,
     maxFileSizeBytes: 0,
+    flattener: "",
+    partialClone: false,
   };
 }
 
@@ -468,6 +607,12 @@ export const RepoAnalysisConfig_Flatten: MessageFns<RepoAnalysisConfig_Flatten>
     if (message.maxFileSizeBytes !== 0) {
       writer.uint32(80).int32(message.maxFileSizeBytes);
     }
+    if (message.flattener !== "") {
+      writer.uint32(90).string(message.flattener);
+    }
+    if (message.partialClone !== false) {
+      writer.uint32(96).bool(message.partialClone);
+    }
     return writer;
   },
 
@@ -558,6 +703,22 @@ export const RepoAnalysisConfig_Flatten: MessageFns<RepoAnalysisConfig_Flatten>
           message.maxFileSizeBytes = reader.int32();
           continue;
         }
+        case 11: {
+          if (tag !== 90) {
+            break;
+          }
+
+          message.flattener = reader.string();
+          continue;
+        }
+        case 12: {
+          if (tag !== 96) {
+            break;
+          }
+
+          message.partialClone = reader.bool();
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -579,6 +740,8 @@ export const RepoAnalysisConfig_Flatten: MessageFns<RepoAnalysisConfig_Flatten>
       largeRepoIgnorePattern: isSet(object.largeRepoIgnorePattern) ? gt.String(object.largeRepoIgnorePattern) : "",
       compressLarge: isSet(object.compressLarge) ? gt.Boolean(object.compressLarge) : false,
       maxFileSizeBytes: isSet(object.maxFileSizeBytes) ? gt.Number(object.maxFileSizeBytes) : 0,
+      flattener: isSet(object.flattener) ? gt.String(object.flattener) : "",
+      partialClone: isSet(object.partialClone) ? gt.Boolean(object.partialClone) : false,
     };
   },
 
@@ -614,6 +777,12 @@ export const RepoAnalysisConfig_Flatten: MessageFns<RepoAnalysisConfig_Flatten>
     if (message.maxFileSizeBytes !== 0) {
       obj.maxFileSizeBytes = Math.round(message.maxFileSizeBytes);
     }
+    if (message.flattener !== "") {
+      obj.flattener = message.flattener;
+    }
+    if (message.partialClone !== false) {
+      obj.partialClone = message.partialClone;
+    }
     return obj;
   },
 
@@ -632,12 +801,20 @@ export const RepoAnalysisConfig_Flatten: MessageFns<RepoAnalysisConfig_Flatten>
     message.largeRepoIgnorePattern = object.largeRepoIgnorePattern ?? "";
     message.compressLarge = object.compressLarge ?? false;
     message.maxFileSizeBytes = object.maxFileSizeBytes ?? 0;
+    message.flattener = object.flattener ?? "";
+    message.partialClone = object.partialClone ?? false;
     return message;
   },
 };
 
 function createBaseWebsiteCrawlingConfig(): WebsiteCrawlingConfig {
-  return { websiteScanTimeoutSeconds: 0, scrapyResponseTimeoutSeconds: 0, crawlDepth: 0, timeoutWithoutDataSeconds: 0 };
+  return {
+    websiteScanTimeoutSeconds: 0,
+    scrapyResponseTimeoutSeconds: 0,
+    crawlDepth: 0,
+    timeoutWithoutDataSeconds: 0,
+    processingIntervalSec: 0,
+  };
 }
 
 export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
@@ -654,6 +831,9 @@ export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
     if (message.timeoutWithoutDataSeconds !== 0) {
       writer.uint32(32).int32(message.timeoutWithoutDataSeconds);
     }
+    if (message.processingIntervalSec !== 0) {
+      writer.uint32(40).int32(message.processingIntervalSec);
+    }
     return writer;
   },
 
@@ -696,6 +876,14 @@ export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
           message.timeoutWithoutDataSeconds = reader.int32();
           continue;
         }
+        case 5: {
+          if (tag !== 40) {
+            break;
+          }
+
+          message.processingIntervalSec = reader.int32();
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -717,6 +905,7 @@ export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
       timeoutWithoutDataSeconds: isSet(object.timeoutWithoutDataSeconds)
         ? gt.Number(object.timeoutWithoutDataSeconds)
         : 0,
+      processingIntervalSec: isSet(object.processingIntervalSec) ? gt.Number(object.processingIntervalSec) : 0,
     };
   },
 
@@ -734,6 +923,9 @@ export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
     if (message.timeoutWithoutDataSeconds !== 0) {
       obj.timeoutWithoutDataSeconds = Math.round(message.timeoutWithoutDataSeconds);
     }
+    if (message.processingIntervalSec !== 0) {
+      obj.processingIntervalSec = Math.round(message.processingIntervalSec);
+    }
     return obj;
   },
 
@@ -746,6 +938,7 @@ export const WebsiteCrawlingConfig: MessageFns<WebsiteCrawlingConfig> = {
     message.scrapyResponseTimeoutSeconds = object.scrapyResponseTimeoutSeconds ?? 0;
     message.crawlDepth = object.crawlDepth ?? 0;
     message.timeoutWithoutDataSeconds = object.timeoutWithoutDataSeconds ?? 0;
+    message.processingIntervalSec = object.processingIntervalSec ?? 0;
     return message;
   },
 };
@@ -10,6 +10,52 @@ import { Timestamp } from "../../../google/protobuf/timestamp";
 
 export const protobufPackage = "dev_observer.api.types.processing";
 
+/**
+ * Items are processed by priority, interactive first, then scheduled, then backfill, and by due time within a
+ * priority. Backfill items overdue for long enough are processed as scheduled ones, so they are not starved.
+ * Nothing is promoted to interactive, user requests go first even after outages.
+ */
+export enum ProcessingPriority {
+  PROCESSING_PRIORITY_SCHEDULED = 0,
+  /** PROCESSING_PRIORITY_INTERACTIVE - Requested by a user, e.g. a rescan. */
+  PROCESSING_PRIORITY_INTERACTIVE = 1,
+  /** PROCESSING_PRIORITY_BACKFILL - Retries and other work that can wait. */
+  PROCESSING_PRIORITY_BACKFILL = 2,
+  UNRECOGNIZED = -1,
+}
+
+export function processingPriorityFromJSON(object: any): ProcessingPriority {
+  switch (object) {
+    case 0:
+    case "PROCESSING_PRIORITY_SCHEDULED":
+      return ProcessingPriority.PROCESSING_PRIORITY_SCHEDULED;
+    case 1:
+    case "PROCESSING_PRIORITY_INTERACTIVE":
+      return ProcessingPriority.PROCESSING_PRIORITY_INTERACTIVE;
+    case 2:
+    case "PROCESSING_PRIORITY_BACKFILL":
+      return ProcessingPriority.PROCESSING_PRIORITY_BACKFILL;
+    case -1:
+    case "UNRECOGNIZED":
+    default:
+      return ProcessingPriority.UNRECOGNIZED;
+  }
+}
+
+export function processingPriorityToJSON(object: ProcessingPriority): string {
+  switch (object) {
+    case ProcessingPriority.PROCESSING_PRIORITY_SCHEDULED:
+      return "PROCESSING_PRIORITY_SCHEDULED";
+    case ProcessingPriority.PROCESSING_PRIORITY_INTERACTIVE:
+      return "PROCESSING_PRIORITY_INTERACTIVE";
+    case ProcessingPriority.PROCESSING_PRIORITY_BACKFILL:
+      return "PROCESSING_PRIORITY_BACKFILL";
+    case ProcessingPriority.UNRECOGNIZED:
+    default:
+      return "UNRECOGNIZED";
+  }
+}
+
 export interface ProcessingItemKey {
   entity?: { $case: "githubRepoId"; value: string } | { $case: "websiteUrl"; value: string } | undefined;
 }
@@ -20,6 +66,19 @@ export interface ProcessingItem {
   lastProcessed?: Date | undefined;
   lastError?: string | undefined;
   noProcessing: boolean;
+  /** Worker that claimed the item, the claim is valid until the lease expires. */
+  leaseOwner?: string | undefined;
+  leaseExpires?: Date | undefined;
+  /** Failed attempts since the last successful one. */
+  failures: number;
+  priority: ProcessingPriority;
+}
+
+export interface ProcessingLaneStatus {
+  name: string;
+  workers: number;
+  /** Items processed by busy workers of the lane. */
+  items: ProcessingItemKey[];
 }
 
 function createBaseProcessingItemKey(): ProcessingItemKey {
@@ -121,6 +180,10 @@ function createBaseProcessingItem(): ProcessingItem {
     lastProcessed: undefined,
     lastError: undefined,
     noProcessing: false,
+    leaseOwner: undefined,
+    leaseExpires: undefined,
+    failures: 0,
+    priority: 0,
   };
 }
 
@@ -141,6 +204,18 @@ export const ProcessingItem: MessageFns<ProcessingItem> = {
     if (message.noProcessing !== false) {
       writer.uint32(40).bool(message.noProcessing);
     }
+    if (message.leaseOwner !== undefined) {
+      writer.uint32(50).string(message.leaseOwner);
+    }
+    if (message.leaseExpires !== undefined) {
+      Timestamp.encode(toTimestamp(message.leaseExpires), writer.uint32(58).fork()).join();
+    }
+    if (message.failures !== 0) {
+      writer.uint32(64).int32(message.failures);
+    }
+    if (message.priority !== 0) {
+      writer.uint32(72).int32(message.priority);
+    }
     return writer;
   },
 
@@ -191,6 +266,38 @@ export const ProcessingItem: MessageFns<ProcessingItem> = {
           message.noProcessing = reader.bool();
           continue;
         }
+        case 6: {
+          if (tag !== 50) {
+            break;
+          }
+
+          message.leaseOwner = reader.string();
+          continue;
+        }
+        case 7: {
+          if (tag !== 58) {
+            break;
+          }
+
+          message.leaseExpires = fromTimestamp(Timestamp.decode(reader, reader.uint32()));
+          continue;
+        }
+        case 8: {
+          if (tag !== 64) {
+            break;
+          }
+
+          message.failures = reader.int32();
+          continue;
+        }
+        case 9: {
+          if (tag !== 72) {
+            break;
+          }
+
+          message.priority = reader.int32() as any;
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -207,6 +314,10 @@ export const ProcessingItem: MessageFns<ProcessingItem> = {
       lastProcessed: isSet(object.lastProcessed) ? fromJsonTimestamp(object.lastProcessed) : undefined,
       lastError: isSet(object.lastError) ? gt.String(object.lastError) : undefined,
       noProcessing: isSet(object.noProcessing) ? gt.Boolean(object.noProcessing) : false,
+      leaseOwner: isSet(object.leaseOwner) ? gt.String(object.leaseOwner) : undefined,
+      leaseExpires: isSet(object.leaseExpires) ? fromJsonTimestamp(object.leaseExpires) : undefined,
+      failures: isSet(object.failures) ? gt.Number(object.failures) : 0,
+      priority: isSet(object.priority) ? processingPriorityFromJSON(object.priority) : 0,
     };
   },
 
@@ -227,6 +338,18 @@ export const ProcessingItem: MessageFns<ProcessingItem> = {
     if (message.noProcessing !== false) {
       obj.noProcessing = message.noProcessing;
     }
+    if (message.leaseOwner !== undefined) {
+      obj.leaseOwner = message.leaseOwner;
+    }
+    if (message.leaseExpires !== undefined) {
+      obj.leaseExpires = message.leaseExpires.toISOString();
+    }
+    if (message.failures !== 0) {
+      obj.failures = Math.round(message.failures);
+    }
+    if (message.priority !== 0) {
+      obj.priority = processingPriorityToJSON(message.priority);
+    }
     return obj;
   },
 
@@ -242,6 +365,102 @@ export const ProcessingItem: MessageFns<ProcessingItem> = {
     message.lastProcessed = object.lastProcessed ?? undefined;
     message.lastError = object.lastError ?? undefined;
     message.noProcessing = object.noProcessing ?? false;
+    message.leaseOwner = object.leaseOwner ?? undefined;
+    message.leaseExpires = object.leaseExpires ?? undefined;
+    message.failures = object.failures ?? 0;
+    message.priority = object.priority ?? 0;
+    return message;
+  },
+};
+
+function createBaseProcessingLaneStatus(): ProcessingLaneStatus {
+  return { name: "", workers: 0, items: [] };
+}
+
+export const ProcessingLaneStatus: MessageFns<ProcessingLaneStatus> = {
+  encode(message: ProcessingLaneStatus, writer: BinaryWriter = new BinaryWriter()): BinaryWriter {
+    if (message.name !== "") {
+      writer.uint32(10).string(message.name);
+    }
+    if (message.workers !== 0) {
+      writer.uint32(16).int32(message.workers);
+    }
+    for (const v of message.items) {
+      ProcessingItemKey.encode(v!, writer.uint32(26).fork()).join();
+    }
+    return writer;
+  },
+
+  decode(input: BinaryReader | Uint8Array, length?: number): ProcessingLaneStatus {
+    const reader = input instanceof BinaryReader ? input : new BinaryReader(input);
+    const end = length === undefined ? reader.len : reader.pos + length;
+    const message = createBaseProcessingLaneStatus();
+    while (reader.pos < end) {
+      const tag = reader.uint32();
+      switch (tag >>> 3) {
+        case 1: {
+          if (tag !== 10) {
+            break;
+          }
+
+          message.name = reader.string();
+          continue;
+        }
+        case 2: {
+          if (tag !== 16) {
+            break;
+          }
+
+          message.workers = reader.int32();
+          continue;
+        }
+        case 3: {
+          if (tag !== 26) {
+            break;
+          }
+
+          message.items.push(ProcessingItemKey.decode(reader, reader.uint32()));
+          continue;
+        }
+      }
+      if ((tag & 7) === 4 || tag === 0) {
+        break;
+      }
+      reader.skip(tag & 7);
+    }
+    return message;
+  },
+
+  fromJSON(object: any): ProcessingLaneStatus {
+    return {
+      name: isSet(object.name) ? gt.String(object.name) : "",
+      workers: isSet(object.workers) ? gt.Number(object.workers) : 0,
+      items: gt.Array.isArray(object?.items) ? object.items.map((e: any) => ProcessingItemKey.fromJSON(e)) : [],
+    };
+  },
+
+  toJSON(message: ProcessingLaneStatus): unknown {
+    const obj: any = {};
+    if (message.name !== "") {
+      obj.name = message.name;
+    }
+    if (message.workers !== 0) {
+      obj.workers = Math.round(message.workers);
+    }
+    if (message.items?.length) {
+      obj.items = message.items.map((e) => ProcessingItemKey.toJSON(e));
+    }
+    return obj;
+  },
+
+  create(base?: DeepPartial<ProcessingLaneStatus>): ProcessingLaneStatus {
+    return ProcessingLaneStatus.fromPartial(base ?? {});
+  },
+  fromPartial(object: DeepPartial<ProcessingLaneStatus>): ProcessingLaneStatus {
+    const message = createBaseProcessingLaneStatus();
+    message.name = object.name ?? "";
+    message.workers = object.workers ?? 0;
+    message.items = object.items?.map((e) => ProcessingItemKey.fromPartial(e)) || [];
     return message;
   },
 };
@@ -22,6 +22,15 @@ export interface GitHubRepository {
 export interface GitProperties {
   appInfo?: GitAppInfo | undefined;
   meta?: GitMeta | undefined;
+  observedCommits: ObservedCommit[];
+}
+
+/** Commit an observation of the repo was produced from. */
+export interface ObservedCommit {
+  observationKey: string;
+  commit: string;
+  /** Hash of the prompts and flatten config the observation was produced with. */
+  analyzerFingerprint: string;
 }
 
 export interface GitMeta {
@@ -178,7 +187,7 @@ export const GitHubRepository: MessageFns<GitHubRepository> = {
 };
 
 function createBaseGitProperties(): GitProperties {
-  return { appInfo: undefined, meta: undefined };
+  return { appInfo: undefined, meta: undefined, observedCommits: [] };
 }
 
 export const GitProperties: MessageFns<GitProperties> = {
@@ -189,6 +198,9 @@ export const GitProperties: MessageFns<GitProperties> = {
     if (message.meta !== undefined) {
       GitMeta.encode(message.meta, writer.uint32(18).fork()).join();
     }
+    for (const v of message.observedCommits) {
+      ObservedCommit.encode(v!, writer.uint32(26).fork()).join();
+    }
     return writer;
   },
 
@@ -215,6 +227,14 @@ export const GitProperties: MessageFns<GitProperties> = {
           message.meta = GitMeta.decode(reader, reader.uint32());
           continue;
         }
+        case 3: {
+          if (tag !== 26) {
+            break;
+          }
+
+          message.observedCommits.push(ObservedCommit.decode(reader, reader.uint32()));
+          continue;
+        }
       }
       if ((tag & 7) === 4 || tag === 0) {
         break;
@@ -228,6 +248,9 @@ export const GitProperties: MessageFns<GitProperties> = {
     return {
       appInfo: isSet(object.appInfo) ? GitAppInfo.fromJSON(object.appInfo) : undefined,
       meta: isSet(object.meta) ? GitMeta.fromJSON(object.meta) : undefined,
+      observedCommits: gt.Array.isArray(object?.observedCommits)
+        ? object.observedCommits.map((e: any) => ObservedCommit.fromJSON(e))
+        : [],
     };
   },
 
@@ -239,6 +262,9 @@ export const GitProperties: MessageFns<GitProperties> = {
     if (message.meta !== undefined) {
       obj.meta = GitMeta.toJSON(message.meta);
     }
+    if (message.observedCommits?.length) {
+      obj.observedCommits = message.observedCommits.map((e) => ObservedCommit.toJSON(e));
+    }
     return obj;
   },
 
@@ -251,6 +277,99 @@ export const GitProperties: MessageFns<GitProperties> = {
       ? GitAppInfo.fromPartial(object.appInfo)
       : undefined;
     message.meta = (object.meta !== undefined && object.meta !== null) ? GitMeta.fromPartial(object.meta) : undefined;
+    message.observedCommits = object.observedCommits?.map((e) => ObservedCommit.fromPartial(e)) || [];
+    return message;
+  },
+};
+
+function createBaseObservedCommit(): ObservedCommit {
+  return { observationKey: "", commit: "", analyzerFingerprint: "" };
+}
+
+export const ObservedCommit: MessageFns<ObservedCommit> = {
+  encode(message: ObservedCommit, writer: BinaryWriter = new BinaryWriter()): BinaryWriter {
+    if (message.observationKey !== "") {
+      writer.uint32(10).string(message.observationKey);
+    }
+    if (message.commit !== "") {
+      writer.uint32(18).string(message.commit);
+    }
+    if (message.analyzerFingerprint !== "") {
+      writer.uint32(26).string(message.analyzerFingerprint);
+    }
+    return writer;
+  },
+
+  decode(input: BinaryReader | Uint8Array, length?: number): ObservedCommit {
+    const reader = input instanceof BinaryReader ? input : new BinaryReader(input);
+    const end = length === undefined ? reader.len : reader.pos + length;
+    const message = createBaseObservedCommit();
+    while (reader.pos < end) {
+      const tag = reader.uint32();
+      switch (tag >>> 3) {
+        case 1: {
+          if (tag !== 10) {
+            break;
+          }
+
+          message.observationKey = reader.string();
+          continue;
+        }
+        case 2: {
+          if (tag !== 18) {
+            break;
+          }
+
+          message.commit = reader.string();
+          continue;
+        }
+        case 3: {
+          if (tag !== 26) {
+            break;
+          }
+
+          message.analyzerFingerprint = reader.string();
+          continue;
+        }
+      }
+      if ((tag & 7) === 4 || tag === 0) {
+        break;
+      }
+      reader.skip(tag & 7);
+    }
+    return message;
+  },
+
+  fromJSON(object: any): ObservedCommit {
+    return {
+      observationKey: isSet(object.observationKey) ? gt.String(object.observationKey) : "",
+      commit: isSet(object.commit) ? gt.String(object.commit) : "",
+      analyzerFingerprint: isSet(object.analyzerFingerprint) ? gt.String(object.analyzerFingerprint) : "",
+    };
+  },
+
+  toJSON(message: ObservedCommit): unknown {
+    const obj: any = {};
+    if (message.observationKey !== "") {
+      obj.observationKey = message.observationKey;
+    }
+    if (message.commit !== "") {
+      obj.commit = message.commit;
+    }
+    if (message.analyzerFingerprint !== "") {
+      obj.analyzerFingerprint = message.analyzerFingerprint;
+    }
+    return obj;
+  },
+
+  create(base?: DeepPartial<ObservedCommit>): ObservedCommit {
+    return ObservedCommit.fromPartial(base ?? {});
+  },
+  fromPartial(object: DeepPartial<ObservedCommit>): ObservedCommit {
+    const message = createBaseObservedCommit();
+    message.observationKey = object.observationKey ?? "";
+    message.commit = object.commit ?? "";
+    message.analyzerFingerprint = object.analyzerFingerprint ?? "";
     return message;
   },
 };
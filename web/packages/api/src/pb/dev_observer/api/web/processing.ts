@@ -0,0 +1,134 @@
+// Code generated by protoc-gen-ts_proto. DO NOT EDIT.
+// versions:
+//   protoc-gen-ts_proto  v2.7.5
+//   protoc               v5.28.3
+// source: dev_observer/api/web/processing.proto
+
+/* eslint-disable */
+import { BinaryReader, BinaryWriter } from "@bufbuild/protobuf/wire";
+import { ProcessingLaneStatus } from "../types/processing";
+
+export const protobufPackage = "dev_observer.api.web.processing";
+
+export interface GetProcessingStatusResponse {
+  lanes: ProcessingLaneStatus[];
+  /** False when items are processed by standalone workers, lanes are not reported then. */
+  embedded: boolean;
+}
+
+function createBaseGetProcessingStatusResponse(): GetProcessingStatusResponse {
+  return { lanes: [], embedded: false };
+}
+
+export const GetProcessingStatusResponse: MessageFns<GetProcessingStatusResponse> = {
+  encode(message: GetProcessingStatusResponse, writer: BinaryWriter = new BinaryWriter()): BinaryWriter {
+    for (const v of message.lanes) {
+      ProcessingLaneStatus.encode(v!, writer.uint32(10).fork()).join();
+    }
+    if (message.embedded !== false) {
+      writer.uint32(16).bool(message.embedded);
+    }
+    return writer;
+  },
+
+  decode(input: BinaryReader | Uint8Array, length?: number): GetProcessingStatusResponse {
+    const reader = input instanceof BinaryReader ? input : new BinaryReader(input);
+    const end = length === undefined ? reader.len : reader.pos + length;
+    const message = createBaseGetProcessingStatusResponse();
+    while (reader.pos < end) {
+      const tag = reader.uint32();
+      switch (tag >>> 3) {
+        case 1: {
+          if (tag !== 10) {
+            break;
+          }
+
+          message.lanes.push(ProcessingLaneStatus.decode(reader, reader.uint32()));
+          continue;
+        }
+        case 2: {
+          if (tag !== 16) {
+            break;
+          }
+
+          message.embedded = reader.bool();
+          continue;
+        }
+      }
+      if ((tag & 7) === 4 || tag === 0) {
+        break;
+      }
+      reader.skip(tag & 7);
+    }
+    return message;
+  },
+
+  fromJSON(object: any): GetProcessingStatusResponse {
+    return {
+      lanes: gt.Array.isArray(object?.lanes) ? object.lanes.map((e: any) => ProcessingLaneStatus.fromJSON(e)) : [],
+      embedded: isSet(object.embedded) ? gt.Boolean(object.embedded) : false,
+    };
+  },
+
+  toJSON(message: GetProcessingStatusResponse): unknown {
+    const obj: any = {};
+    if (message.lanes?.length) {
+      obj.lanes = message.lanes.map((e) => ProcessingLaneStatus.toJSON(e));
+    }
+    if (message.embedded !== false) {
+      obj.embedded = message.embedded;
+    }
+    return obj;
+  },
+
+  create(base?: DeepPartial<GetProcessingStatusResponse>): GetProcessingStatusResponse {
+    return GetProcessingStatusResponse.fromPartial(base ?? {});
+  },
+  fromPartial(object: DeepPartial<GetProcessingStatusResponse>): GetProcessingStatusResponse {
+    const message = createBaseGetProcessingStatusResponse();
+    message.lanes = object.lanes?.map((e) => ProcessingLaneStatus.fromPartial(e)) || [];
+    message.embedded = object.embedded ?? false;
+    return message;
+  },
+};
+
+declare const self: any | undefined;
+declare const window: any | undefined;
+declare const global: any | undefined;
+const gt: any = (() => {
+  if (typeof globalThis !== "undefined") {
+    return globalThis;
+  }
+  if (typeof self !== "undefined") {
+    return self;
+  }
+  if (typeof window !== "undefined") {
+    return window;
+  }
+  if (typeof global !== "undefined") {
+    return global;
+  }
+  throw "Unable to locate global object";
+})();
+
+type Builtin = Date | Function | Uint8Array | string | number | boolean | undefined;
+
+export type DeepPartial<T> = T extends Builtin ? T
+  : T extends globalThis.Array<infer U> ? globalThis.Array<DeepPartial<U>>
+  : T extends ReadonlyArray<infer U> ? ReadonlyArray<DeepPartial<U>>
+  : T extends { $case: string; value: unknown } ? { $case: T["$case"]; value?: DeepPartial<T["value"]> }
+  : T extends {} ? { [K in keyof T]?: DeepPartial<T[K]> }
+  : Partial<T>;
+
+function isSet(value: any): boolean {
+  return value !== null && value !== undefined;
+}
+
+export interface MessageFns<T> {
+  encode(message: T, writer?: BinaryWriter): BinaryWriter;
+  decode(input: BinaryReader | Uint8Array, length?: number): T;
+  fromJSON(object: any): T;
+  toJSON(message: T): unknown;
+  create(base?: DeepPartial<T>): T;
+  fromPartial(object: DeepPartial<T>): T;
+}